@@ -1,13 +1,22 @@
 import pymssql
+import numpy as np
 import pandas as pd
 from datetime import datetime, time, timedelta
 import requests
 import logging
 import argparse
 import base64
+import json
 import os
 import warnings
 import platform
+import time as time_mod
+import sys
+import re
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
 from datetime import timezone
 
 try:
@@ -39,7 +48,9 @@ def parse_arguments():
     parser.add_argument('--insert-mcg', action='store_true', help='Flag to insert data into mcg_clocking_tbl')
     parser.add_argument('--insert-att', action='store_true', help='Flag to insert data into tblAttendanceReport')
     parser.add_argument('--force-replace', action='store_true', help='Force replace existing records in database tables')
+    parser.add_argument('--row-writer', action='store_true', help='Write tblAttendanceReport and mcg_clocking_tbl row by row instead of the staged bulk writers (for comparison)')
     parser.add_argument('--use-filo', action='store_true', help='Use First In Last Out logic (optional)')
+    parser.add_argument('--row-classifier', action='store_true', help='Classify scans row by row instead of with the vectorized engine (for comparison)')
     parser.add_argument('--dry-run', action='store_true', help='Generate report without writing to any DB tables')
     parser.add_argument('--incremental', action='store_true', help='Run incremental ingestion mode (no WhatsApp, no full backscan)')
     parser.add_argument('--push-mcg', action='store_true', help='Push pending Clock In/Out rows to mcg_clocking_tbl (idempotent)')
@@ -60,6 +71,19 @@ def parse_arguments():
     parser.add_argument('--end-date', help='End date for attendance report (YYYY-MM-DD)')
     parser.add_argument('--staff-no', help='Filter by specific staff number (e.g., MTI250034)')
     parser.add_argument('--no-report', action='store_true', help='Skip CSV export and WhatsApp report')
+    parser.add_argument('--daemon', action='store_true', help='Stay resident and run the --run-10min cycle every --interval seconds, reusing connections and caches')
+    parser.add_argument('--interval', type=int, default=600, help='Seconds between cycle starts in --daemon mode (default 600)')
+    parser.add_argument('--status-file', help='Where --daemon writes its last-run summary as JSON (default: ATTENDANCE_DAEMON_STATUS_FILE or attendance_daemon_status.json)')
+    parser.add_argument('--replay-csv', help='Offline replay: classify the transactions (or report export) in this CSV without any database connection and export the report')
+    parser.add_argument('--replay-schedule', help='Schedule snapshot CSV for --replay-csv (StaffNo, ShiftDate, TimeIn, TimeOut, NextDay; blank ShiftDate = MTIUsers fallback). Default: derived from the ScheduledClockIn/Out columns of the replayed export')
+    parser.add_argument('--replay-end', help="Job end 'YYYY-MM-DD HH:MM:SS' used for missing clock-outs in --replay-csv (default: end of the last scan day, as a --date run; use the InsertDate for a 24h export)")
+    parser.add_argument('--replay-output', help='Report CSV written by --replay-csv (default: replay_<input name>.csv)')
+    parser.add_argument('--retrieval-window-hours', type=int, help='Split the tblTransaction retrieval into windows of this many hours fetched concurrently (default ATTENDANCE_RETRIEVAL_WINDOW_HOURS; 0 = one query)')
+    parser.add_argument('--retrieval-workers', type=int, help='Concurrent DataDBEnt connections for windowed retrieval (default ATTENDANCE_RETRIEVAL_WORKERS or 4)')
+    parser.add_argument('--backfill', action='store_true', help='Split --start-date..--end-date into per-day runs on a process pool, recording each finished day in AttendanceBackfillProgress so a rerun only processes unfinished days')
+    parser.add_argument('--backfill-workers', type=int, help='Concurrent day runs (and so DB sessions) for --backfill (default ATTENDANCE_BACKFILL_WORKERS or 4, at most 8)')
+    parser.add_argument('--backfill-restart', action='store_true', help='Forget the recorded progress of this --backfill scope and process every day again')
+    parser.add_argument('--summary-json', action='store_true', help='Suppress progress output and print one JSON run summary (counters, watermarks, push results, phase durations, errors) at the end')
     return parser.parse_args()
 
 def _resolve_waid(cli_waid):
@@ -173,19 +197,157 @@ def get_config():
 # --------------------------------------------------------------------------
 # 3. DATABASE & RETRIEVAL
 # --------------------------------------------------------------------------
+# ----------------------------------------------------------------------
+# Run instrumentation: every connection handed out by connect_* counts its
+# queries, fetched rows and latency per SQL fingerprint into the metrics of
+# the run in progress (_ACTIVE_METRICS, None outside a run).
+# ----------------------------------------------------------------------
+_ACTIVE_METRICS = None
+_METRICS_LOCK = threading.Lock()
+_FINGERPRINT_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_FINGERPRINT_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def sql_fingerprint(sql):
+    text = " ".join(str(sql).split())
+    text = _FINGERPRINT_LITERALS.sub("?", text)
+    text = _FINGERPRINT_IN_LISTS.sub("(?)", text)
+    return text[:200]
+
+def new_run_metrics():
+    return {'queries': 0, 'rows': 0, 'db_ms': 0.0, 'by_sql': {}}
+
+def _metrics_add(fingerprint, queries, rows, elapsed):
+    metrics = _ACTIVE_METRICS
+    if metrics is None:
+        return
+    ms = elapsed * 1000.0
+    with _METRICS_LOCK:
+        metrics['queries'] += queries
+        metrics['rows'] += rows
+        metrics['db_ms'] += ms
+        entry = metrics['by_sql'].get(fingerprint)
+        if entry is None:
+            entry = metrics['by_sql'][fingerprint] = {'count': 0, 'rows': 0, 'ms': 0.0}
+        entry['count'] += queries
+        entry['rows'] += rows
+        entry['ms'] += ms
+
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._fingerprint = None
+
+    def execute(self, operation, params=None):
+        self._fingerprint = sql_fingerprint(operation)
+        started = time_mod.perf_counter()
+        try:
+            if params is None:
+                return self._cursor.execute(operation)
+            return self._cursor.execute(operation, params)
+        finally:
+            _metrics_add(self._fingerprint, 1, 0, time_mod.perf_counter() - started)
+
+    def executemany(self, operation, seq_of_params):
+        self._fingerprint = sql_fingerprint(operation)
+        seq_of_params = list(seq_of_params)
+        started = time_mod.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_of_params)
+        finally:
+            _metrics_add(self._fingerprint, len(seq_of_params), 0, time_mod.perf_counter() - started)
+
+    def _fetch(self, fetch, *args):
+        started = time_mod.perf_counter()
+        result = fetch(*args)
+        if result is None:
+            rows = 0
+        elif isinstance(result, list):
+            rows = len(result)
+        else:
+            rows = 1
+        _metrics_add(self._fingerprint or '(unknown)', 0, rows, time_mod.perf_counter() - started)
+        return result
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class InstrumentedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB, or None where unavailable."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1024.0 * 1024.0) if platform.system() == 'Darwin' else peak / 1024.0, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024.0 * 1024.0), 1)
+    except Exception:
+        return None
+
+def metrics_summary(metrics, top=15):
+    by_sql = sorted(metrics['by_sql'].items(), key=lambda kv: kv[1]['ms'], reverse=True)
+    return {
+        'queries': metrics['queries'],
+        'rowsFetched': metrics['rows'],
+        'dbMs': int(round(metrics['db_ms'])),
+        'peakMemoryMb': peak_memory_mb(),
+        'topSql': [
+            {'sql': fp, 'count': e['count'], 'rows': e['rows'], 'ms': int(round(e['ms']))}
+            for fp, e in by_sql[:top]
+        ],
+    }
+
 def connect_data_db(config):
-    return pymssql.connect(**config['conn_str_data_db'])
+    return InstrumentedConnection(pymssql.connect(**config['conn_str_data_db']))
 
 def connect_orange_temp(config):
-    return pymssql.connect(**config['conn_str_orange_temp'])
+    return InstrumentedConnection(pymssql.connect(**config['conn_str_orange_temp']))
 
 def connect_data_employee(config):
-    return pymssql.connect(**config['conn_str_data_employee'])
+    return InstrumentedConnection(pymssql.connect(**config['conn_str_data_employee']))
 
 def _sql_escape(value):
     return str(value).replace("'", "''")
 
+# Tables/columns already verified in this process; the DDL probes are idempotent,
+# so a resident worker only needs to run each of them once.
+_ENSURED_DDL = set()
+
 def ensure_attendance_job_state_table(conn):
+    if 'AttendanceJobState' in _ENSURED_DDL:
+        return
     cursor = conn.cursor()
     cursor.execute("""
         IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'AttendanceJobState')
@@ -201,8 +363,11 @@ def ensure_attendance_job_state_table(conn):
     """)
     conn.commit()
     cursor.close()
+    _ENSURED_DDL.add('AttendanceJobState')
 
 def ensure_tbl_attendance_report_pushed_at(conn):
+    if 'tblAttendanceReport.PushedAt' in _ENSURED_DDL:
+        return
     cursor = conn.cursor()
     cursor.execute("""
         IF COL_LENGTH('dbo.tblAttendanceReport', 'PushedAt') IS NULL
@@ -212,6 +377,39 @@ def ensure_tbl_attendance_report_pushed_at(conn):
     """)
     conn.commit()
     cursor.close()
+    _ENSURED_DDL.add('tblAttendanceReport.PushedAt')
+
+def ensure_attendance_run_history_table(conn):
+    if 'AttendanceRunHistory' in _ENSURED_DDL:
+        return
+    cursor = conn.cursor()
+    cursor.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'AttendanceRunHistory')
+        BEGIN
+            CREATE TABLE dbo.AttendanceRunHistory (
+                Id BIGINT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+                JobName NVARCHAR(100) NOT NULL,
+                StartedAt DATETIME NOT NULL,
+                FinishedAt DATETIME NULL,
+                DurationMs INT NULL,
+                Success BIT NOT NULL,
+                TotalRetrieved INT NULL,
+                NewInserted INT NULL,
+                Pushed INT NULL,
+                QueryCount INT NULL,
+                RowsFetched INT NULL,
+                DbMs INT NULL,
+                PeakMemoryMb DECIMAL(10,1) NULL,
+                PhasesJson NVARCHAR(MAX) NULL,
+                TopSqlJson NVARCHAR(MAX) NULL,
+                Errors NVARCHAR(MAX) NULL
+            );
+            CREATE INDEX IX_AttendanceRunHistory_Job_Started ON dbo.AttendanceRunHistory (JobName, StartedAt);
+        END
+    """)
+    conn.commit()
+    cursor.close()
+    _ENSURED_DDL.add('AttendanceRunHistory')
 
 def _parse_int_set(csv_value, default_values):
     if csv_value is None:
@@ -259,7 +457,7 @@ def _latest_due_push_slot(now_dt, push_hours):
     prev_day = (now_dt - timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
     return prev_day.replace(hour=max(push_hours))
 
-def should_auto_push_now(config, window_minutes, dry_run=False):
+def should_auto_push_now(config, window_minutes, dry_run=False, conn_state=None):
     push_hours = _parse_int_set(os.getenv("MCG_PUSH_HOURS"), {0, 12})
     now_dt = _push_now()
     slot_dt = _latest_due_push_slot(now_dt, push_hours)
@@ -269,7 +467,9 @@ def should_auto_push_now(config, window_minutes, dry_run=False):
     if dry_run:
         return True, slot
 
-    conn_state = connect_data_employee(config)
+    own_conn = conn_state is None
+    if own_conn:
+        conn_state = connect_data_employee(config)
     try:
         ensure_attendance_job_state_table(conn_state)
         state = load_attendance_job_state(conn_state, "mcg_push_v1")
@@ -278,13 +478,16 @@ def should_auto_push_now(config, window_minutes, dry_run=False):
             return False, slot
         return True, slot
     finally:
-        try:
-            conn_state.close()
-        except Exception:
-            pass
+        if own_conn:
+            try:
+                conn_state.close()
+            except Exception:
+                pass
 
-def save_auto_push_state(config, slot, error_message):
-    conn_state = connect_data_employee(config)
+def save_auto_push_state(config, slot, error_message, conn_state=None):
+    own_conn = conn_state is None
+    if own_conn:
+        conn_state = connect_data_employee(config)
     try:
         ensure_attendance_job_state_table(conn_state)
         prev = load_attendance_job_state(conn_state, "mcg_push_v1")
@@ -292,10 +495,81 @@ def save_auto_push_state(config, slot, error_message):
         next_slot = keep_slot if error_message else slot
         save_attendance_job_state(conn_state, "mcg_push_v1", None, next_slot, datetime.now(), error_message)
     finally:
-        try:
-            conn_state.close()
-        except Exception:
-            pass
+        if own_conn:
+            try:
+                conn_state.close()
+            except Exception:
+                pass
+
+def ensure_attendance_backfill_progress_table(conn):
+    if 'AttendanceBackfillProgress' in _ENSURED_DDL:
+        return
+    cursor = conn.cursor()
+    cursor.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'AttendanceBackfillProgress')
+        BEGIN
+            CREATE TABLE dbo.AttendanceBackfillProgress (
+                BackfillKey NVARCHAR(200) NOT NULL,
+                WorkDate DATE NOT NULL,
+                Status NVARCHAR(20) NOT NULL,
+                Attempts INT NOT NULL DEFAULT(0),
+                StartedAt DATETIME NULL,
+                FinishedAt DATETIME NULL,
+                TotalRetrieved INT NULL,
+                NewInserted INT NULL,
+                InsertSkipped INT NULL,
+                LastError NVARCHAR(MAX) NULL,
+                CONSTRAINT PK_AttendanceBackfillProgress PRIMARY KEY (BackfillKey, WorkDate)
+            );
+        END
+    """)
+    conn.commit()
+    cursor.close()
+    _ENSURED_DDL.add('AttendanceBackfillProgress')
+
+def load_backfill_done_days(conn, backfill_key):
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT CONVERT(varchar(10), WorkDate, 23) FROM dbo.AttendanceBackfillProgress WHERE BackfillKey = %s AND Status = 'done'",
+        (str(backfill_key),)
+    )
+    done = {str(r[0]) for r in cursor.fetchall()}
+    cursor.close()
+    return done
+
+def reset_backfill_progress(conn, backfill_key):
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM dbo.AttendanceBackfillProgress WHERE BackfillKey = %s", (str(backfill_key),))
+    conn.commit()
+    cursor.close()
+
+def save_backfill_day(conn, backfill_key, work_date, status, summary):
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        MERGE dbo.AttendanceBackfillProgress AS t
+        USING (SELECT %s AS BackfillKey, CAST(%s AS DATE) AS WorkDate) AS s
+        ON t.BackfillKey = s.BackfillKey AND t.WorkDate = s.WorkDate
+        WHEN MATCHED THEN UPDATE SET
+            Status = %s, Attempts = t.Attempts + 1, StartedAt = %s, FinishedAt = %s,
+            TotalRetrieved = %s, NewInserted = %s, InsertSkipped = %s, LastError = %s
+        WHEN NOT MATCHED THEN INSERT (
+            BackfillKey, WorkDate, Status, Attempts, StartedAt, FinishedAt, TotalRetrieved, NewInserted, InsertSkipped, LastError
+        ) VALUES (s.BackfillKey, s.WorkDate, %s, 1, %s, %s, %s, %s, %s, %s);
+        """,
+        (str(backfill_key), work_date)
+        + (
+            status,
+            summary.get('startedAt'),
+            summary.get('finishedAt'),
+            summary.get('totalRetrieved'),
+            summary.get('newInserted'),
+            summary.get('insertSkipped'),
+            "; ".join(summary.get('errors') or []) or None,
+        ) * 2
+    )
+    conn.commit()
+    cursor.close()
 
 def load_attendance_job_state(conn, job_name):
     cursor = conn.cursor(as_dict=True)
@@ -340,6 +614,38 @@ def save_attendance_job_state(conn, job_name, last_dt, last_card_no, last_run_at
     conn.commit()
     cursor.close()
 
+def save_attendance_run_history(conn, job_name, summary):
+    instr = summary.get('instrumentation') or {}
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT INTO dbo.AttendanceRunHistory (
+            JobName, StartedAt, FinishedAt, DurationMs, Success, TotalRetrieved, NewInserted, Pushed,
+            QueryCount, RowsFetched, DbMs, PeakMemoryMb, PhasesJson, TopSqlJson, Errors
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        (
+            str(job_name),
+            summary.get('startedAt'),
+            summary.get('finishedAt'),
+            summary.get('durationMs'),
+            1 if summary.get('success') else 0,
+            summary.get('totalRetrieved'),
+            summary.get('newInserted'),
+            summary.get('pushed'),
+            instr.get('queries'),
+            instr.get('rowsFetched'),
+            instr.get('dbMs'),
+            instr.get('peakMemoryMb'),
+            json.dumps(summary.get('phases') or {}),
+            json.dumps(instr.get('topSql') or []),
+            "; ".join(summary.get('errors') or []) or None,
+        )
+    )
+    conn.commit()
+    cursor.close()
+
 def _staff_prefix_list():
     """
     Staff-number prefixes the bulk ingest covers.
@@ -367,21 +673,12 @@ def _staff_prefix_clause(column="Cdb.StaffNo"):
     return " OR ".join(f"{column} LIKE '{p}%'" for p in prefixes)
 
 
-def retrieve_attendance_transactions(conn_data_db, tr_controller_list, start_dt, end_dt, staff_no=None, watermark_dt=None, watermark_card_no=None):
+def _transaction_query(date_clause, tr_controller_list, staff_no=None, narrow=False):
     """
-    Retrieves rows from tblTransaction where Lt.TrDateTime is between start_dt and end_dt,
-    plus a join to CardDB for staff details. Optionally filters by staff_no if provided.
+    The tblTransaction/CardDB query for date_clause. narrow=True returns only the
+    scan columns, with CardDB used as a semi-join filter on StaffNo, for
+    _join_card_dimension to add the card attributes in memory.
     """
-    start_str = start_dt.strftime('%Y-%m-%d %H:%M:%S')
-    end_str   = end_dt.strftime('%Y-%m-%d %H:%M:%S')
-
-    if watermark_dt is not None:
-        w_dt_str = watermark_dt.strftime('%Y-%m-%d %H:%M:%S')
-        w_card = "" if watermark_card_no is None else _sql_escape(watermark_card_no)
-        date_clause = f"((Lt.TrDateTime > '{w_dt_str}') OR (Lt.TrDateTime = '{w_dt_str}' AND Lt.CardNo > '{w_card}')) AND Lt.TrDateTime <= '{end_str}'"
-    else:
-        date_clause = f"Lt.TrDateTime BETWEEN '{start_str}' AND '{end_str}'"
-    
     if tr_controller_list:
         tr_controller_str = ', '.join(f"'{item}'" for item in tr_controller_list)
         tr_controller_clause = f"AND Lt.TrController IN ({tr_controller_str})"
@@ -394,7 +691,28 @@ def retrieve_attendance_transactions(conn_data_db, tr_controller_list, start_dt,
     else:
         staff_no_clause = f"AND ({_staff_prefix_clause()})"
     
-    query_transactions = f"""
+    if narrow:
+        return f"""
+    SELECT 
+        Lt.CardNo,
+        Lt.TrDateTime,
+        Lt.TrDate,
+        Lt.TrController,
+        Lt.UnitNo
+    FROM 
+        [DataDBEnt].[dbo].[tblTransaction] Lt
+    WHERE 
+        {date_clause}
+      AND EXISTS (
+        SELECT 1 FROM [DataDBEnt].[dbo].[CardDB] Cdb
+        WHERE Cdb.CardNo = Lt.CardNo {staff_no_clause}
+      )
+      AND
+        Lt.[Transaction] = 'Valid Entry Access'
+        {tr_controller_clause}
+    """
+
+    return f"""
     SELECT 
         Cdb.CardNo, 
         Cdb.Name, 
@@ -420,7 +738,184 @@ def retrieve_attendance_transactions(conn_data_db, tr_controller_list, start_dt,
         Lt.[Transaction] = 'Valid Entry Access'
         {tr_controller_clause}
     """
-    df = pd.read_sql(query_transactions, conn_data_db)
+
+def _env_positive_int(name, default_val):
+    raw = os.getenv(name)
+    try:
+        return max(0, int(str(raw).strip())) if raw is not None and str(raw).strip() != "" else default_val
+    except ValueError:
+        return default_val
+
+def _retrieval_window_clauses(start_dt, end_dt, window_hours, watermark_dt=None, watermark_card_no=None):
+    """
+    Splits the retrieval range into consecutive [lo, hi) windows of window_hours,
+    the last one closed at end_dt like the single query. With a watermark the
+    range starts at watermark_dt and only the first window carries the
+    (TrDateTime, CardNo) > watermark condition, so the union of the windows is
+    exactly the rows the single query returns.
+    """
+    fmt = '%Y-%m-%d %H:%M:%S'
+    end_str = end_dt.strftime(fmt)
+    if watermark_dt is not None:
+        w_dt_str = watermark_dt.strftime(fmt)
+        w_card = "" if watermark_card_no is None else _sql_escape(watermark_card_no)
+        lo = datetime.strptime(w_dt_str, fmt)
+        lower = f"((Lt.TrDateTime > '{w_dt_str}') OR (Lt.TrDateTime = '{w_dt_str}' AND Lt.CardNo > '{w_card}'))"
+    else:
+        lo = datetime.strptime(start_dt.strftime(fmt), fmt)
+        lower = f"Lt.TrDateTime >= '{lo.strftime(fmt)}'"
+
+    clauses = []
+    step = timedelta(hours=window_hours)
+    while True:
+        hi = lo + step
+        if hi.strftime(fmt) > end_str:
+            clauses.append(f"{lower} AND Lt.TrDateTime <= '{end_str}'")
+            return clauses
+        clauses.append(f"{lower} AND Lt.TrDateTime < '{hi.strftime(fmt)}'")
+        lo = hi
+        lower = f"Lt.TrDateTime >= '{lo.strftime(fmt)}'"
+
+def _read_transaction_windows(queries, conn_data_db, connect, workers):
+    """
+    Runs the window queries on up to workers connections: conn_data_db plus
+    workers - 1 opened with connect() and closed afterwards. Each connection
+    is drained by one thread taking the next window from a shared list, so no
+    connection is used by two threads. Returns the frames in window order.
+    """
+    frames = [None] * len(queries)
+    pending = list(range(len(queries)))
+    pending_lock = threading.Lock()
+    extra = []
+    try:
+        for _ in range(max(0, min(workers, len(queries)) - 1)):
+            extra.append(connect())
+    except Exception as e:
+        print(f"Windowed retrieval continues on {len(extra) + 1} connection(s): {e}")
+
+    def _drain(conn):
+        while True:
+            with pending_lock:
+                if not pending:
+                    return
+                i = pending.pop(0)
+            frames[i] = pd.read_sql(queries[i], conn)
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(extra) + 1) as pool:
+            for future in [pool.submit(_drain, conn) for conn in [conn_data_db] + extra]:
+                future.result()
+    finally:
+        for conn in extra:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    return frames
+
+CARD_DIMENSION_COLUMNS = ['CardNo', 'Name', 'Title', 'Position', 'Department', 'CardType', 'Company', 'StaffNo']
+TRANSACTION_COLUMNS = CARD_DIMENSION_COLUMNS + ['TrDateTime', 'TrDate', 'dtTransaction', 'TrController', 'UnitNo']
+
+def _card_dimension_ttl_seconds():
+    """ATTENDANCE_CARDDB_TTL_SECONDS (default 3600); 0 turns the narrow query off and ships CardDB columns with every scan."""
+    return _env_positive_int('ATTENDANCE_CARDDB_TTL_SECONDS', 3600)
+
+def _card_key(card_nos):
+    """CardNo as the SQL join compares it: trailing spaces and case ignored (leading spaces trimmed too, as the Node side does)."""
+    return card_nos.astype(str).str.strip().str.upper()
+
+def _read_card_dimension(conn_data_db, card_nos=None):
+    query = "SELECT CardNo, Name, Title, Position, Department, CardType, Company, StaffNo FROM [DataDBEnt].[dbo].[CardDB]"
+    if card_nos is None:
+        return pd.read_sql(query, conn_data_db)
+    if len(card_nos) == 0:
+        return pd.DataFrame(columns=CARD_DIMENSION_COLUMNS)
+    return pd.read_sql(
+        query + " WHERE CardNo IN (SELECT LTRIM(RTRIM(value)) FROM STRING_SPLIT(%s, ','))",
+        conn_data_db,
+        params=[",".join(sorted(card_nos))]
+    )
+
+def card_dimension(conn_data_db, card_nos, cache=None):
+    """
+    CardDB rows for the scanned card_nos (normalized with _card_key).
+
+    One-shot runs (cache=None) read just those cards. The resident worker passes
+    its runtime cache: a full CardDB snapshot reloaded once the TTL has passed
+    and topped up with just the missing rows when a scan carries a CardNo it has
+    not seen (a card issued since the last load).
+    """
+    if cache is None:
+        return _read_card_dimension(conn_data_db, set(card_nos))
+    loaded_at = cache.get('loadedAt')
+    if cache.get('frame') is None or loaded_at is None or time_mod.monotonic() - loaded_at > _card_dimension_ttl_seconds():
+        cache.update(frame=_read_card_dimension(conn_data_db), loadedAt=time_mod.monotonic())
+    frame = cache['frame']
+    missing = set(card_nos) - set(_card_key(frame['CardNo']))
+    if missing:
+        added = _read_card_dimension(conn_data_db, missing)
+        if len(added) > 0:
+            frame = pd.concat([frame, added], ignore_index=True)
+            cache['frame'] = frame
+    return frame
+
+def _staff_filter_mask(staff, staff_no=None):
+    """In-memory twin of the Cdb.StaffNo filter of _transaction_query (case-insensitive, like the SQL collation)."""
+    folded = staff.astype(str).str.upper()
+    if staff_no:
+        return folded.str.rstrip() == str(staff_no).upper().rstrip()
+    return folded.str.startswith(tuple(p.upper() for p in _staff_prefix_list()))
+
+def _join_card_dimension(df_scans, conn_data_db, staff_no=None, card_cache=None):
+    """
+    Joins narrow scan rows to the CardDB dimension on the normalized CardNo,
+    keeping the CardDB rows the SQL join would have matched (CardNo comes from
+    CardDB, as before), and returns the TRANSACTION_COLUMNS.
+    """
+    scan_keys = _card_key(df_scans['CardNo'])
+    dimension = card_dimension(conn_data_db, scan_keys[df_scans['CardNo'].notna()].unique(), cache=card_cache)
+    dimension = dimension[_staff_filter_mask(dimension['StaffNo'], staff_no)]
+    df = df_scans.drop(columns=['CardNo']).assign(CardKey=scan_keys.to_numpy()).merge(
+        dimension.assign(CardKey=_card_key(dimension['CardNo']).to_numpy()), on='CardKey', how='inner', sort=False
+    )
+    df['dtTransaction'] = 'Valid Entry Access'
+    return df[TRANSACTION_COLUMNS]
+
+def retrieve_attendance_transactions(conn_data_db, tr_controller_list, start_dt, end_dt, staff_no=None, watermark_dt=None, watermark_card_no=None, window_hours=0, workers=1, connect=None, card_cache=None):
+    """
+    Retrieves rows from tblTransaction where Lt.TrDateTime is between start_dt and end_dt,
+    plus a join to CardDB for staff details. Optionally filters by staff_no if provided.
+
+    With window_hours, a range longer than one window is fetched as consecutive
+    windows over up to workers connections (the extra ones opened with connect())
+    and concatenated in TrDateTime/CardNo order.
+
+    Unless ATTENDANCE_CARDDB_TTL_SECONDS is 0, the query returns only the scan
+    columns and the card/staff attributes come from card_dimension (the scanned
+    cards, or the resident worker's card_cache snapshot); the output columns
+    are the same either way.
+    """
+    narrow = _card_dimension_ttl_seconds() > 0
+    start_str = start_dt.strftime('%Y-%m-%d %H:%M:%S')
+    end_str   = end_dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    clauses = _retrieval_window_clauses(start_dt, end_dt, window_hours, watermark_dt, watermark_card_no) if window_hours and window_hours > 0 else []
+    if len(clauses) > 1:
+        queries = [_transaction_query(c, tr_controller_list, staff_no, narrow=narrow) for c in clauses]
+        frames = _read_transaction_windows(queries, conn_data_db, connect, workers if connect is not None else 1)
+        non_empty = [f for f in frames if len(f) > 0]
+        df = pd.concat(non_empty, ignore_index=True) if non_empty else frames[0]
+        df = df.sort_values(by=['TrDateTime', 'CardNo'], kind='stable').reset_index(drop=True)
+    else:
+        if watermark_dt is not None:
+            w_dt_str = watermark_dt.strftime('%Y-%m-%d %H:%M:%S')
+            w_card = "" if watermark_card_no is None else _sql_escape(watermark_card_no)
+            date_clause = f"((Lt.TrDateTime > '{w_dt_str}') OR (Lt.TrDateTime = '{w_dt_str}' AND Lt.CardNo > '{w_card}')) AND Lt.TrDateTime <= '{end_str}'"
+        else:
+            date_clause = f"Lt.TrDateTime BETWEEN '{start_str}' AND '{end_str}'"
+        df = pd.read_sql(_transaction_query(date_clause, tr_controller_list, staff_no, narrow=narrow), conn_data_db)
+    if narrow:
+        df = _join_card_dimension(df, conn_data_db, staff_no, card_cache=card_cache)
     # Add the current timestamp as InsertDate (this will be used when storing locally)
     df['InsertDate'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     return df
@@ -458,9 +953,9 @@ def _parse_time_str(v):
     return None
 
 def _to_bool_next_day(v):
-    if isinstance(v, bool):
-        return v
-    if isinstance(v, (int, float)):
+    if isinstance(v, (bool, np.bool_)):
+        return bool(v)
+    if isinstance(v, (int, float, np.integer, np.floating)):
         return int(v) == 1
     if isinstance(v, str):
         x = v.strip().lower()
@@ -474,10 +969,12 @@ def _next_occurrence(time_of_day, after_dt):
     return candidate
 
 def _read_schedule_lock(conn_data_db, staff_no, shift_date, lock_cache=None):
-    if lock_cache is not None:
-        cached = lock_cache.get((staff_no, shift_date))
-        if cached is not None:
-            return cached
+    # A cached None is a known miss (filled by prefetch_schedule_locks), so the
+    # membership test matters: it keeps misses from going back to the database.
+    if lock_cache is not None and (staff_no, shift_date) in lock_cache:
+        return lock_cache[(staff_no, shift_date)]
+    if conn_data_db is None:
+        return None
     df = pd.read_sql(
         "SELECT CONVERT(varchar(8), TimeIn, 108) AS TimeIn, CONVERT(varchar(8), TimeOut, 108) AS TimeOut, NextDay FROM dbo.OrangeScheduleDaily WHERE StaffNo = %s AND ShiftDate = %s",
         conn_data_db,
@@ -495,20 +992,203 @@ def _read_schedule_lock(conn_data_db, staff_no, shift_date, lock_cache=None):
         lock_cache[(staff_no, shift_date)] = lock
     return lock
 
-def _read_mtiusers_schedule(conn_data_db, staff_no):
+def _read_mtiusers_schedule(conn_data_db, staff_no, lock_cache=None):
+    # The undated MTIUsers fallback shares lock_cache under (staff_no, None).
+    if lock_cache is not None and (staff_no, None) in lock_cache:
+        return lock_cache[(staff_no, None)]
+    if _MTIUSERS_SNAPSHOT['frame'] is not None:
+        schedule = _MTIUSERS_SNAPSHOT['by_staff'].get(str(staff_no))
+        if lock_cache is not None:
+            lock_cache[(staff_no, None)] = schedule
+        return schedule
+    if conn_data_db is None:
+        return None
     df = pd.read_sql(
         "SELECT CONVERT(varchar(8), time_in, 108) AS time_in, CONVERT(varchar(8), time_out, 108) AS time_out, next_day FROM dbo.MTIUsers WHERE employee_id = %s",
         conn_data_db,
         params=[staff_no]
     )
-    if df.empty:
+    schedule = None
+    if not df.empty:
+        ti = _parse_time_str(df['time_in'][0])
+        to_time = _parse_time_str(df['time_out'][0])
+        nd = _to_bool_next_day(df['next_day'][0])
+        if ti is not None and to_time is not None:
+            schedule = {'time_in': ti, 'time_out': to_time, 'next_day': nd}
+    if lock_cache is not None:
+        lock_cache[(staff_no, None)] = schedule
+    return schedule
+
+_MTIUSERS_SNAPSHOT = {'version': None, 'frame': None, 'by_staff': {}}
+_MTIUSERS_SNAPSHOT_COLUMNS = ['employee_id', 'time_in', 'time_out', 'next_day']
+
+def _mtiusers_snapshot_file():
+    raw = os.getenv("ATTENDANCE_MTIUSERS_SNAPSHOT_FILE")
+    return str(raw).strip() if raw is not None and str(raw).strip() != "" else None
+
+def _mtiusers_version(conn_data_db):
+    """
+    Cheap change probe for dbo.MTIUsers: row count, MAX(updated_at) (kept current
+    by TR_MTIUsers_SetUpdatedAt) and the last MTIUsersLastUpdate id/runId written
+    by the sync. None when the probe columns are missing.
+    """
+    cursor = conn_data_db.cursor()
+    try:
+        cursor.execute("""
+            SELECT COUNT_BIG(*), CONVERT(varchar(27), MAX(updated_at), 126),
+                   (SELECT TOP 1 CONCAT(id, ':', CONVERT(varchar(36), runId)) FROM dbo.MTIUsersLastUpdate ORDER BY id DESC)
+            FROM dbo.MTIUsers
+        """)
+        row = cursor.fetchone()
+    except Exception as e:
+        logging.warning(f"MTIUsers version probe failed, snapshot disabled: {str(e)}")
         return None
-    ti = _parse_time_str(df['time_in'][0])
-    to_time = _parse_time_str(df['time_out'][0])
-    nd = _to_bool_next_day(df['next_day'][0])
-    if ti is None or to_time is None:
+    finally:
+        cursor.close()
+    return [int(row[0]), row[1], row[2]] if row else None
+
+def _set_mtiusers_snapshot(version, frame):
+    by_staff = {}
+    for r in frame.itertuples(index=False):
+        ti = _parse_time_str(r.time_in)
+        to_time = _parse_time_str(r.time_out)
+        by_staff[str(r.employee_id)] = None if ti is None or to_time is None else {'time_in': ti, 'time_out': to_time, 'next_day': _to_bool_next_day(r.next_day)}
+    _MTIUSERS_SNAPSHOT.update(version=version, frame=frame, by_staff=by_staff)
+
+def _read_mtiusers_snapshot_file(path, version):
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            document = json.load(fh)
+    except (OSError, ValueError):
         return None
-    return {'time_in': ti, 'time_out': to_time, 'next_day': nd}
+    if document.get('version') != version:
+        return None
+    return pd.DataFrame(document.get('rows') or [], columns=_MTIUSERS_SNAPSHOT_COLUMNS)
+
+def _write_mtiusers_snapshot_file(path, version, frame):
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump({'version': version, 'rows': frame.to_dict('records')}, fh, default=str)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write MTIUsers snapshot {path}: {str(e)}")
+
+def refresh_mtiusers_snapshot(conn_data_db, snapshot_file=None):
+    """
+    Makes the process-wide MTIUsers time_in/time_out/next_day snapshot current
+    and returns its frame. A version probe decides whether the in-process copy,
+    the on-disk copy (snapshot_file, default ATTENDANCE_MTIUSERS_SNAPSHOT_FILE)
+    or a fresh full read is used, so unchanged runs read no MTIUsers rows.
+    Returns None when the probe is unavailable; callers then query directly.
+    """
+    if conn_data_db is None:
+        return None
+    version = _mtiusers_version(conn_data_db)
+    if version is None:
+        _MTIUSERS_SNAPSHOT.update(version=None, frame=None, by_staff={})
+        return None
+    if _MTIUSERS_SNAPSHOT['frame'] is not None and _MTIUSERS_SNAPSHOT['version'] == version:
+        return _MTIUSERS_SNAPSHOT['frame']
+
+    snapshot_file = snapshot_file or _mtiusers_snapshot_file()
+    frame = _read_mtiusers_snapshot_file(snapshot_file, version) if snapshot_file else None
+    if frame is None:
+        frame = pd.read_sql(
+            """
+            SELECT employee_id, CONVERT(varchar(8), time_in, 108) AS time_in, CONVERT(varchar(8), time_out, 108) AS time_out, next_day
+            FROM dbo.MTIUsers
+            """,
+            conn_data_db
+        )
+        frame['employee_id'] = frame['employee_id'].astype(str)
+        if snapshot_file:
+            _write_mtiusers_snapshot_file(snapshot_file, version, frame)
+    _set_mtiusers_snapshot(version, frame)
+    return frame
+
+def prefetch_schedule_locks(conn_data_db, df_transactions, lock_cache):
+    """
+    Loads every OrangeScheduleDaily lock for the staff in df_transactions over the
+    D-1..D+1 span of their scans, plus their MTIUsers fallback schedules, into
+    lock_cache with two set-based queries. Pairs without a row are cached as None
+    so classification afterwards runs without any per-row DB access.
+
+    Returns the number of (StaffNo, ShiftDate) pairs cached.
+    """
+    if lock_cache is None or conn_data_db is None:
+        return 0
+    if df_transactions is None or len(df_transactions) == 0:
+        return 0
+
+    staff_nos, span_start, span_end = _lock_span(df_transactions)
+    if not staff_nos:
+        return 0
+    staff_csv = ",".join(staff_nos)
+
+    df_locks = pd.read_sql(
+        """
+        SELECT StaffNo, CONVERT(varchar(10), ShiftDate, 23) AS ShiftDate,
+               CONVERT(varchar(8), TimeIn, 108) AS TimeIn, CONVERT(varchar(8), TimeOut, 108) AS TimeOut, NextDay
+        FROM dbo.OrangeScheduleDaily
+        WHERE ShiftDate BETWEEN %s AND %s
+          AND StaffNo IN (SELECT LTRIM(RTRIM(value)) FROM STRING_SPLIT(%s, ','))
+        """,
+        conn_data_db,
+        params=[span_start.strftime('%Y-%m-%d'), span_end.strftime('%Y-%m-%d'), staff_csv]
+    )
+    df_mti = refresh_mtiusers_snapshot(conn_data_db)
+    if df_mti is not None:
+        df_mti = df_mti[df_mti['employee_id'].isin(staff_nos)]
+    else:
+        df_mti = pd.read_sql(
+            """
+            SELECT employee_id, CONVERT(varchar(8), time_in, 108) AS time_in, CONVERT(varchar(8), time_out, 108) AS time_out, next_day
+            FROM dbo.MTIUsers
+            WHERE employee_id IN (SELECT LTRIM(RTRIM(value)) FROM STRING_SPLIT(%s, ','))
+            """,
+            conn_data_db,
+            params=[staff_csv]
+        )
+    return _fill_lock_cache(lock_cache, staff_nos, span_start, span_end, df_locks, df_mti)
+
+def _lock_span(df_transactions):
+    staff_nos = sorted({str(s) for s in df_transactions['StaffNo'].dropna().unique()})
+    if not staff_nos:
+        return staff_nos, None, None
+    scan_dates = pd.to_datetime(df_transactions['TrDateTime']).dt.date
+    return staff_nos, scan_dates.min() - timedelta(days=1), scan_dates.max() + timedelta(days=1)
+
+def _fill_lock_cache(lock_cache, staff_nos, span_start, span_end, df_locks, df_mti):
+    """
+    Caches every (staff, date) in the span: the OrangeScheduleDaily-shaped rows of
+    df_locks where present, None otherwise, plus the undated MTIUsers-shaped
+    fallbacks of df_mti under (staff, None).
+    """
+    span_days = (span_end - span_start).days + 1
+    for staff in staff_nos:
+        lock_cache[(staff, None)] = None
+        for i in range(span_days):
+            lock_cache[(staff, span_start + timedelta(days=i))] = None
+
+    for r in df_locks.itertuples(index=False):
+        ti = _parse_time_str(r.TimeIn)
+        to_time = _parse_time_str(r.TimeOut)
+        if ti is None or to_time is None:
+            continue
+        shift_date = datetime.strptime(str(r.ShiftDate), '%Y-%m-%d').date()
+        lock_cache[(str(r.StaffNo), shift_date)] = {'time_in': ti, 'time_out': to_time, 'next_day': _to_bool_next_day(r.NextDay)}
+
+    for r in df_mti.itertuples(index=False):
+        if lock_cache.get((str(r.employee_id), None)) is not None:
+            continue
+        ti = _parse_time_str(r.time_in)
+        to_time = _parse_time_str(r.time_out)
+        if ti is None or to_time is None:
+            continue
+        lock_cache[(str(r.employee_id), None)] = {'time_in': ti, 'time_out': to_time, 'next_day': _to_bool_next_day(r.next_day)}
+
+    return len(staff_nos) * span_days
 
 def _read_schedule_change_at(conn_data_db, staff_no, at_dt):
     df = pd.read_sql(
@@ -555,7 +1235,7 @@ def _resolve_schedule_for_lock(conn_data_db, staff_no, shift_date, ref_dt, polic
         change_at = _read_schedule_change_at(conn_data_db, staff_no, ref_dt)
         if change_at is not None:
             return {'time_in': change_at['time_in'], 'time_out': change_at['time_out'], 'next_day': change_at['next_day']}
-        mti = _read_mtiusers_schedule(conn_data_db, staff_no)
+        mti = _read_mtiusers_schedule(conn_data_db, staff_no, lock_cache=lock_cache)
         return mti
 
     _, prev_out_dt = _schedule_datetimes(prev_date, prev_lock)
@@ -620,11 +1300,8 @@ def get_working_hours(staff_no, date_val, conn_data_db, manual_time_in, manual_t
             to += timedelta(days=1)
         return ti, to
 
-    if conn_data_db is None:
-        return None, None
-
     lock = _read_schedule_lock(conn_data_db, staff_no, date_val, lock_cache=lock_cache)
-    schedule = lock if lock is not None else _read_mtiusers_schedule(conn_data_db, staff_no)
+    schedule = lock if lock is not None else _read_mtiusers_schedule(conn_data_db, staff_no, lock_cache=lock_cache)
     if schedule is None:
         return None, None
     return _schedule_datetimes(date_val, schedule)
@@ -686,7 +1363,93 @@ def filo_clock_events(group):
         group.iloc[-1, group.columns.get_loc('ClockEvent')] = 'Clock Out'
     return group
 
-def apply_clock_event_logic(df, conn_data_db, manual_time_in, manual_time_out, policy, lock_cache=None, dry_run=False, use_filo=False):
+def _schedule_lookup(pairs, conn_data_db, manual_time_in, manual_time_out, lock_cache=None):
+    """
+    Resolves the scheduled in/out datetimes once per distinct (StaffNo, ShiftDate)
+    pair. Returns a frame indexed by (StaffNo, ShiftDate) with datetime64
+    SchedIn/SchedOut columns (NaT where no schedule is known).
+    """
+    records = []
+    for staff_no, shift_date in pairs:
+        try:
+            sched_in, sched_out = get_working_hours(staff_no, shift_date, conn_data_db, manual_time_in, manual_time_out, lock_cache=lock_cache)
+        except Exception:
+            sched_in, sched_out = None, None
+        records.append((staff_no, shift_date, sched_in, sched_out))
+    lookup = pd.DataFrame(records, columns=['StaffNo', 'ShiftDate', 'SchedIn', 'SchedOut'])
+    lookup['SchedIn'] = pd.to_datetime(lookup['SchedIn'])
+    lookup['SchedOut'] = pd.to_datetime(lookup['SchedOut'])
+    return lookup.set_index(['StaffNo', 'ShiftDate'])
+
+def _lookup_schedules(lookup, staff, dates):
+    found = lookup.reindex(pd.MultiIndex.from_arrays([staff, dates]))
+    return found['SchedIn'].to_numpy(), found['SchedOut'].to_numpy()
+
+def classify_clock_events_vectorized(df, conn_data_db, manual_time_in, manual_time_out, policy, lock_cache=None):
+    """
+    Vectorized equivalent of determine_clock_event over a whole frame.
+
+    Schedules are resolved once per distinct (StaffNo, date) pair for the scan
+    date and the day before; the windows and the ClockEvent/ShiftDate choice are
+    then computed with boolean masks over datetime64 columns, following the same
+    precedence as the row-wise path. Returns (clock_events, shift_dates) arrays.
+    """
+    manual = bool(manual_time_in and manual_time_out)
+    staff = df['StaffNo'].to_numpy()
+    tr = pd.to_datetime(df['TrDateTime']).to_numpy()
+    curr_dates = pd.to_datetime(df['TrDateTime']).dt.date.to_numpy()
+    prev_dates = np.array([d - timedelta(days=1) for d in curr_dates], dtype=object)
+
+    pairs = set(zip(staff, curr_dates))
+    if not manual:
+        pairs.update(zip(staff, prev_dates))
+    lookup = _schedule_lookup(sorted(pairs, key=lambda p: (str(p[0]), p[1])), conn_data_db, manual_time_in, manual_time_out, lock_cache=lock_cache)
+
+    in_early = np.timedelta64(int(policy['clock_in_early_hours']), 'h')
+    in_late = np.timedelta64(int(policy['clock_in_late_minutes']), 'm')
+    out_early = np.timedelta64(int(policy['clock_out_early_minutes']), 'm')
+    out_late = np.timedelta64(int(policy['clock_out_late_hours']), 'h')
+
+    if manual:
+        prev_out_hit = np.zeros(len(df), dtype=bool)
+    else:
+        prev_in, prev_out = _lookup_schedules(lookup, staff, prev_dates)
+        overnight = (
+            ~np.isnat(prev_in) & ~np.isnat(prev_out)
+            & (prev_in.astype('datetime64[D]') != prev_out.astype('datetime64[D]'))
+        )
+        prev_out_hit = overnight & (tr >= prev_out - out_early) & (tr <= prev_out + out_late)
+
+    curr_in, curr_out = _lookup_schedules(lookup, staff, curr_dates)
+    has_curr = ~np.isnat(curr_in) & ~np.isnat(curr_out)
+    in_hit = has_curr & (tr >= curr_in - in_early) & (tr <= curr_in + in_late)
+    out_hit = has_curr & (tr >= curr_out - out_early) & (tr <= curr_out + out_late)
+
+    clock_events = np.select(
+        [prev_out_hit, ~has_curr, in_hit, out_hit],
+        ['Clock Out', 'No Shift Data', 'Clock In', 'Clock Out'],
+        default='Outside Range'
+    ).astype(object)
+    shift_dates = np.where(prev_out_hit, prev_dates, curr_dates)
+    return clock_events, shift_dates
+
+def _attach_schedule_columns(df, conn_data_db, manual_time_in, manual_time_out, lock_cache=None):
+    staff = df['StaffNo'].to_numpy()
+    dates = df['TrDate'].to_numpy()
+    lookup = _schedule_lookup(sorted(set(zip(staff, dates)), key=lambda p: (str(p[0]), p[1])), conn_data_db, manual_time_in, manual_time_out, lock_cache=lock_cache)
+    sched_in, sched_out = _lookup_schedules(lookup, staff, dates)
+    df['ScheduledClockIn'] = sched_in
+    df['ScheduledClockOut'] = sched_out
+    return df
+
+def apply_clock_event_logic(df, conn_data_db, manual_time_in, manual_time_out, policy, lock_cache=None, dry_run=False, use_filo=False, vectorized=True):
+    """
+    Assigns ClockEvent (and the shift date into TrDate) to every scan and adds the
+    ScheduledClockIn/ScheduledClockOut reporting columns.
+
+    vectorized=False keeps the original row-by-row determine_clock_event path,
+    which produces the same output and is kept for comparison.
+    """
     if len(df) == 0:
         print("WARNING: DataFrame is empty! Adding ClockEvent column and returning.")
         df['ClockEvent'] = pd.Series(dtype='object')
@@ -694,6 +1457,10 @@ def apply_clock_event_logic(df, conn_data_db, manual_time_in, manual_time_out, p
     
     if use_filo:
         df = df.groupby(['StaffNo', 'TrDate'], group_keys=False).apply(filo_clock_events)
+    elif vectorized:
+        clock_events, shift_dates = classify_clock_events_vectorized(df, conn_data_db, manual_time_in, manual_time_out, policy, lock_cache=lock_cache)
+        df['ClockEvent'] = pd.Series(clock_events, index=df.index, dtype='object')
+        df['TrDate'] = pd.Series(shift_dates, index=df.index, dtype='object')
     else:
         computed = df.apply(
             lambda row: pd.Series(
@@ -712,6 +1479,9 @@ def apply_clock_event_logic(df, conn_data_db, manual_time_in, manual_time_out, p
         )
         df['ClockEvent'] = computed['ClockEvent']
         df['TrDate'] = computed['ShiftDate']
+
+    if vectorized:
+        return _attach_schedule_columns(df, conn_data_db, manual_time_in, manual_time_out, lock_cache=lock_cache)
     
     # Add schedule columns for reporting purposes
     def add_schedule_info(row):
@@ -895,6 +1665,196 @@ def insert_data_to_tbl_attendance_report(row, cursor, conn_data_db=None, force_r
         return "error"
 
 
+def _bulk_chunk_rows():
+    raw = os.getenv("ATTENDANCE_BULK_CHUNK_ROWS")
+    try:
+        return max(1, int(str(raw).strip())) if raw is not None and str(raw).strip() != "" else 2000
+    except ValueError:
+        return 2000
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _to_json_records(df):
+    return json.dumps(df.astype(object).where(df.notna(), None).to_dict('records'), default=str)
+
+def _attendance_report_stage_rows(df):
+    """
+    Builds the staging frame for tblAttendanceReport from a renamed report frame,
+    one row per scan, with the same string conversions the per-row writer applies.
+    ScheduledClockIn/Out come from the columns apply_clock_event_logic attached.
+    """
+    def _text(col):
+        return df[col].map(str) if col in df.columns else pd.Series('None', index=df.index)
+
+    def _key(col):
+        return df[col].map(lambda v: str(v or '')) if col in df.columns else pd.Series('', index=df.index)
+
+    def _time_of(col):
+        if col not in df.columns:
+            return pd.Series(None, index=df.index, dtype='object')
+        return pd.to_datetime(df[col]).dt.strftime('%H:%M:%S')
+
+    clock_event = _key('ClockEvent')
+    stage = pd.DataFrame({
+        'Seq': np.arange(len(df)),
+        'CardNo': _text('CardNo'),
+        'Name': _text('Name'),
+        'Title': _text('Title'),
+        'Position': _text('Position'),
+        'Department': _text('Department'),
+        'CardType': _text('CardType'),
+        'Company': _text('Company'),
+        'StaffNo': df['StaffNo'].map(str),
+        'TrDateTime': pd.to_datetime(df['Transaction Date Time']).dt.strftime('%Y-%m-%dT%H:%M:%S'),
+        'TrDate': pd.to_datetime(df['Transaction Date']).dt.strftime('%Y-%m-%d'),
+        'dtTransaction': _text('Transaction Status'),
+        'TrController': _key('TrController'),
+        'ClockEvent': clock_event,
+        'UnitNo': _text('UnitNo'),
+        'Processed': np.where(clock_event.isin(['Clock In', 'Clock Out']), 0, 1),
+        'ScheduledClockIn': _time_of('ScheduledClockIn'),
+        'ScheduledClockOut': _time_of('ScheduledClockOut'),
+    })
+    return stage
+
+def bulk_insert_tbl_attendance_report(df, conn_data_db, force_replace=False, chunk_rows=None):
+    """
+    Set-based writer for tblAttendanceReport.
+
+    Stages the whole frame into a temp table in chunks, clears the matching
+    'No Shift Data' placeholders, then applies one MERGE on the
+    UX_tblAttendanceReport_Idempotency key (StaffNo, TrDateTime, TrController,
+    ClockEvent): new rows are inserted, existing rows are skipped, or replaced in
+    place when force_replace is set. Duplicate keys inside the frame count as
+    skipped, as they would in the per-row writer.
+
+    Runs in the caller's transaction; the caller commits or rolls back.
+    Returns (inserted, replaced, skipped).
+    """
+    if df is None or len(df) == 0:
+        return 0, 0, 0
+    stage = _attendance_report_stage_rows(df)
+    chunk_rows = chunk_rows or _bulk_chunk_rows()
+    inserted_date = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+
+    cursor = conn_data_db.cursor()
+    try:
+        cursor.execute("""
+            IF OBJECT_ID('tempdb..#AttendanceReportStage') IS NOT NULL DROP TABLE #AttendanceReportStage;
+            CREATE TABLE #AttendanceReportStage (
+                Seq INT NOT NULL,
+                CardNo NVARCHAR(255) NULL,
+                Name NVARCHAR(255) NULL,
+                Title NVARCHAR(255) NULL,
+                Position NVARCHAR(255) NULL,
+                Department NVARCHAR(255) NULL,
+                CardType NVARCHAR(255) NULL,
+                Company NVARCHAR(255) NULL,
+                StaffNo NVARCHAR(50) NOT NULL,
+                TrDateTime DATETIME NOT NULL,
+                TrDate DATE NULL,
+                dtTransaction NVARCHAR(255) NULL,
+                TrController NVARCHAR(255) NOT NULL,
+                ClockEvent NVARCHAR(50) NOT NULL,
+                UnitNo NVARCHAR(50) NULL,
+                Processed BIT NOT NULL,
+                ScheduledClockIn NVARCHAR(8) NULL,
+                ScheduledClockOut NVARCHAR(8) NULL
+            );
+        """)
+        for start in range(0, len(stage), chunk_rows):
+            cursor.execute("""
+                INSERT INTO #AttendanceReportStage
+                SELECT Seq, CardNo, Name, Title, Position, Department, CardType, Company, StaffNo,
+                       TrDateTime, TrDate, dtTransaction, TrController, ClockEvent, UnitNo, Processed,
+                       ScheduledClockIn, ScheduledClockOut
+                FROM OPENJSON(%s)
+                WITH (
+                    Seq INT '$.Seq',
+                    CardNo NVARCHAR(255) '$.CardNo',
+                    Name NVARCHAR(255) '$.Name',
+                    Title NVARCHAR(255) '$.Title',
+                    Position NVARCHAR(255) '$.Position',
+                    Department NVARCHAR(255) '$.Department',
+                    CardType NVARCHAR(255) '$.CardType',
+                    Company NVARCHAR(255) '$.Company',
+                    StaffNo NVARCHAR(50) '$.StaffNo',
+                    TrDateTime DATETIME '$.TrDateTime',
+                    TrDate DATE '$.TrDate',
+                    dtTransaction NVARCHAR(255) '$.dtTransaction',
+                    TrController NVARCHAR(255) '$.TrController',
+                    ClockEvent NVARCHAR(50) '$.ClockEvent',
+                    UnitNo NVARCHAR(50) '$.UnitNo',
+                    Processed BIT '$.Processed',
+                    ScheduledClockIn NVARCHAR(8) '$.ScheduledClockIn',
+                    ScheduledClockOut NVARCHAR(8) '$.ScheduledClockOut'
+                );
+            """, (_to_json_records(stage.iloc[start:start + chunk_rows]),))
+
+        cursor.execute("""
+            SET NOCOUNT ON;
+            DECLARE @staged INT = (SELECT COUNT(*) FROM #AttendanceReportStage);
+            DECLARE @out TABLE (action NVARCHAR(10) NOT NULL);
+
+            WITH dup AS (
+                SELECT ROW_NUMBER() OVER (PARTITION BY StaffNo, TrDateTime, TrController, ClockEvent ORDER BY Seq) AS rn
+                FROM #AttendanceReportStage
+            )
+            DELETE FROM dup WHERE rn > 1;
+
+            DELETE t
+            FROM dbo.tblAttendanceReport t
+            INNER JOIN #AttendanceReportStage s
+                ON t.StaffNo = s.StaffNo AND t.TrDateTime = s.TrDateTime AND t.TrController = s.TrController
+            WHERE t.ClockEvent = 'No Shift Data'
+              AND s.ClockEvent <> ''
+              AND s.ClockEvent <> 'No Shift Data';
+
+            MERGE dbo.tblAttendanceReport AS t
+            USING #AttendanceReportStage AS s
+                ON t.StaffNo = s.StaffNo AND t.TrDateTime = s.TrDateTime
+               AND t.TrController = s.TrController AND t.ClockEvent = s.ClockEvent
+            WHEN MATCHED AND %s = 1 THEN
+                UPDATE SET
+                    CardNo = s.CardNo, Name = s.Name, Title = s.Title, Position = s.Position,
+                    Department = s.Department, CardType = s.CardType, Company = s.Company,
+                    TrDate = s.TrDate, dtTransaction = s.dtTransaction, UnitNo = s.UnitNo,
+                    InsertedDate = %s, Processed = s.Processed,
+                    ScheduledClockIn = s.ScheduledClockIn, ScheduledClockOut = s.ScheduledClockOut
+            WHEN NOT MATCHED BY TARGET THEN
+                INSERT (
+                    CardNo, Name, Title, Position, Department, CardType,
+                    Company, StaffNo, TrDateTime, TrDate,
+                    dtTransaction, TrController, ClockEvent, UnitNo, InsertedDate, Processed,
+                    ScheduledClockIn, ScheduledClockOut
+                )
+                VALUES (
+                    s.CardNo, s.Name, s.Title, s.Position, s.Department, s.CardType,
+                    s.Company, s.StaffNo, s.TrDateTime, s.TrDate,
+                    s.dtTransaction, s.TrController, s.ClockEvent, s.UnitNo, %s, s.Processed,
+                    s.ScheduledClockIn, s.ScheduledClockOut
+                )
+            OUTPUT $action INTO @out;
+
+            SELECT
+                @staged AS staged,
+                SUM(CASE WHEN action = 'INSERT' THEN 1 ELSE 0 END) AS inserted,
+                SUM(CASE WHEN action = 'UPDATE' THEN 1 ELSE 0 END) AS replaced
+            FROM @out;
+
+            DROP TABLE #AttendanceReportStage;
+        """, (1 if force_replace else 0, inserted_date, inserted_date))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    inserted = int(row[1] or 0) if row else 0
+    replaced = int(row[2] or 0) if row else 0
+    skipped = len(stage) - inserted - replaced
+    return inserted, replaced, skipped
+
 def insert_data_to_mcg_clocking_tbl(row, cursor, update_cursor):
     """
     Insert a record into mcg_clocking_tbl (if function_key is 0 or 1) 
@@ -970,7 +1930,145 @@ def insert_data_to_mcg_clocking_tbl(row, cursor, update_cursor):
         return False
 
 
-def insert_data(df, conn_data_db, conn_orange_temp, insert_att, insert_mcg, force_replace=False):
+def _mcg_stage_rows(rows):
+    """
+    Maps pending tblAttendanceReport rows (dicts shaped like insert_data_to_mcg_clocking_tbl
+    expects) to mcg_clocking_tbl values, using the same conversions.
+    Returns (staged, handled, skipped): staged payload dicts, the source rows they
+    came from, and the number of rows that are neither Clock In nor Clock Out or
+    have no TrDate/TrDateTime (the per-row writer skips those as failures too).
+    """
+    staged = []
+    handled = []
+    skipped = 0
+    for row in rows:
+        if row['ClockEvent'] == 'Clock In':
+            function_key = 0
+        elif row['ClockEvent'] == 'Clock Out':
+            function_key = 1
+        else:
+            skipped += 1
+            continue
+        tr_dt = row['Transaction Date Time']
+        if pd.isna(tr_dt) or pd.isna(row['Transaction Date']):
+            skipped += 1
+            continue
+        staged.append({
+            'Seq': len(staged),
+            'terminal_id': row['UnitNo'],
+            'finger_print_id': str(row['StaffNo']),
+            'date_log': row['Transaction Date'].strftime('%Y-%m-%d 00:00:00'),
+            'time_log': tr_dt.strftime('%H:%M'),
+            'function_key': function_key,
+            'date_time': tr_dt.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        handled.append(row)
+    return staged, handled, skipped
+
+def bulk_push_to_mcg_clocking_tbl(rows, conn_orange, conn_data_emp, batch_rows=None):
+    """
+    Batched equivalent of insert_data_to_mcg_clocking_tbl over a page of pending rows.
+
+    Per batch: the keys are staged on ORANGE and checked for existence in one
+    statement, only the missing (finger_print_id, date_time, function_key)
+    tuples are inserted, and every handled row is marked Processed/PushedAt
+    with a single UPDATE ... WHERE ID IN (...) in EmployeeWorkflow. Each batch
+    commits on its own; a batch whose ORANGE insert or Processed UPDATE fails is
+    rolled back on that connection and counted as skipped.
+
+    Returns (pushed_rows, skipped_count, inserted_count).
+    """
+    batch_rows = batch_rows or _bulk_chunk_rows()
+    pushed_rows = []
+    skipped = 0
+    inserted = 0
+    for batch in _chunks(list(rows), batch_rows):
+        staged, handled, not_staged = _mcg_stage_rows(batch)
+        skipped += not_staged
+        if not staged:
+            continue
+        try:
+            cursor_orange = conn_orange.cursor()
+            try:
+                cursor_orange.execute("""
+                    SET NOCOUNT ON;
+                    IF OBJECT_ID('tempdb..#McgPushStage') IS NOT NULL DROP TABLE #McgPushStage;
+                    SELECT Seq, terminal_id, finger_print_id, date_log, time_log, function_key, date_time
+                    INTO #McgPushStage
+                    FROM OPENJSON(%s)
+                    WITH (
+                        Seq INT '$.Seq',
+                        terminal_id NVARCHAR(50) '$.terminal_id',
+                        finger_print_id NVARCHAR(50) '$.finger_print_id',
+                        date_log NVARCHAR(19) '$.date_log',
+                        time_log NVARCHAR(5) '$.time_log',
+                        function_key INT '$.function_key',
+                        date_time NVARCHAR(19) '$.date_time'
+                    );
+
+                    WITH first_key AS (
+                        SELECT *, ROW_NUMBER() OVER (PARTITION BY finger_print_id, date_time, function_key ORDER BY Seq) AS rn
+                        FROM #McgPushStage
+                    )
+                    DELETE FROM first_key WHERE rn > 1;
+
+                    DELETE s
+                    FROM #McgPushStage s
+                    WHERE EXISTS (
+                        SELECT 1 FROM dbo.mcg_clocking_tbl m
+                        WHERE m.finger_print_id = s.finger_print_id AND m.date_time = s.date_time AND m.function_key = s.function_key
+                    );
+
+                    INSERT INTO dbo.mcg_clocking_tbl (
+                        terminal_id, finger_print_id, date_log, time_log, function_key,
+                        date_time, status_clock, insert_date
+                    )
+                    SELECT terminal_id, finger_print_id, date_log, time_log, function_key, date_time, 'NEW', %s
+                    FROM #McgPushStage
+                    ORDER BY Seq;
+
+                    SELECT @@ROWCOUNT AS inserted;
+                    DROP TABLE #McgPushStage;
+                """, (json.dumps(staged, default=str), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                row = cursor_orange.fetchone()
+            finally:
+                cursor_orange.close()
+            conn_orange.commit()
+        except Exception as e:
+            try:
+                conn_orange.rollback()
+            except Exception:
+                pass
+            logging.error(f"Failed to push batch of {len(staged)} rows to mcg_clocking_tbl. Error: {str(e)}")
+            skipped += len(staged)
+            continue
+
+        inserted += int(row[0] or 0) if row else 0
+        ids = [int(r['ID']) for r in handled if r.get('ID') is not None]
+        if ids:
+            try:
+                update_cursor = conn_data_emp.cursor()
+                try:
+                    update_cursor.execute(
+                        f"UPDATE dbo.tblAttendanceReport SET Processed = 1, PushedAt = GETDATE() WHERE ID IN ({', '.join(str(i) for i in ids)})"
+                    )
+                finally:
+                    update_cursor.close()
+                conn_data_emp.commit()
+            except Exception as e:
+                try:
+                    conn_data_emp.rollback()
+                except Exception:
+                    pass
+                # The rows stay Processed=0; the next push finds them already in mcg_clocking_tbl.
+                logging.error(f"Failed to mark batch of {len(ids)} rows (IDs {ids[0]}..{ids[-1]}) as processed after pushing to mcg_clocking_tbl. Error: {str(e)}")
+                skipped += len(handled)
+                continue
+        pushed_rows.extend(handled)
+        logging.info(f"Pushed batch to mcg_clocking_tbl: {len(handled)} rows handled, {int(row[0] or 0) if row else 0} inserted.")
+    return pushed_rows, skipped, inserted
+
+def insert_data(df, conn_data_db, conn_orange_temp, insert_att, insert_mcg, force_replace=False, row_writer=False):
     inserted_count = 0
     skipped_count = 0
     mcg_success_count = 0
@@ -979,7 +2077,29 @@ def insert_data(df, conn_data_db, conn_orange_temp, insert_att, insert_mcg, forc
     last_ok_card = None
 
     # Insert into tblAttendanceReport first, if requested.
-    if insert_att:
+    if insert_att and not row_writer:
+        df_sorted = df.sort_values(by=['Transaction Date Time', 'CardNo'], ascending=[True, True]) if df is not None and len(df) > 0 else df
+        try:
+            inserted, replaced, skipped = bulk_insert_tbl_attendance_report(df_sorted, conn_data_db, force_replace)
+            conn_data_db.commit()
+            inserted_count += inserted + replaced
+            skipped_count += skipped
+            if df_sorted is not None and len(df_sorted) > 0:
+                last_row = df_sorted.iloc[-1]
+                last_ok_dt = pd.to_datetime(last_row['Transaction Date Time']).to_pydatetime()
+                last_ok_card = str(last_row['CardNo'])
+        except Exception as e:
+            try:
+                conn_data_db.rollback()
+            except Exception:
+                pass
+            logging.error(f"Bulk insert into tblAttendanceReport failed: {str(e)}")
+            error_count += 1
+
+        print(f"Data insertion to tblAttendanceReport completed: "
+              f"{inserted_count} new, {skipped_count} skipped (already exist), {error_count} errors.")
+
+    elif insert_att:
         cursor_data_db = conn_data_db.cursor()
         
         if df is not None and len(df) > 0:
@@ -1016,13 +2136,33 @@ def insert_data(df, conn_data_db, conn_orange_temp, insert_att, insert_mcg, forc
         cursor_data_db.execute(f"""
             SELECT CardNo, Name, Title, Position, Department, CardType,
                    Company, StaffNo, TrDateTime, TrDate,
-                   dtTransaction, TrController, ClockEvent, UnitNo
+                   dtTransaction, TrController, ClockEvent, UnitNo, ID
             FROM dbo.tblAttendanceReport
             WHERE Processed = 0 AND ({_staff_prefix_clause('StaffNo')})
         """)
         rows_to_process = cursor_data_db.fetchall()
+        cursor_data_db.close()
         
-        if rows_to_process:
+        if rows_to_process and not row_writer:
+            row_dicts = [
+                {
+                    'CardNo': row[0],
+                    'StaffNo': row[7],
+                    'Transaction Date Time': row[8],
+                    'Transaction Date': row[9],
+                    'TrController': row[11],
+                    'ClockEvent': row[12],
+                    'UnitNo': row[13],
+                    'ID': row[14],
+                }
+                for row in rows_to_process
+            ]
+            pushed_rows, _, _ = bulk_push_to_mcg_clocking_tbl(row_dicts, conn_orange_temp, conn_data_db)
+            mcg_success_count = len(pushed_rows)
+
+            print(f"Data inserted into mcg_clocking_tbl successfully. "
+                  f"{mcg_success_count} rows inserted.")
+        elif rows_to_process:
             cursor_orange = conn_orange_temp.cursor()
             update_cursor = conn_data_db.cursor()
 
@@ -1059,9 +2199,13 @@ def insert_data(df, conn_data_db, conn_orange_temp, insert_att, insert_mcg, forc
             print("No records with Processed = 0 found for mcg_clocking_tbl insertion.")
     return inserted_count, skipped_count, mcg_success_count, error_count, last_ok_dt, last_ok_card
 
-def push_pending_to_mcg_clocking_tbl(config, limit_rows, dry_run=False, start_date=None, end_date=None, staff_no=None, repush=False):
-    conn_data_emp = connect_data_employee(config)
-    conn_orange = connect_orange_temp(config)
+def push_pending_to_mcg_clocking_tbl(config, limit_rows, dry_run=False, start_date=None, end_date=None, staff_no=None, repush=False, row_writer=False, conn_data_emp=None, conn_orange=None):
+    own_emp = conn_data_emp is None
+    own_orange = conn_orange is None
+    if own_emp:
+        conn_data_emp = connect_data_employee(config)
+    if own_orange:
+        conn_orange = connect_orange_temp(config)
     try:
         ensure_tbl_attendance_report_pushed_at(conn_data_emp)
 
@@ -1111,6 +2255,24 @@ def push_pending_to_mcg_clocking_tbl(config, limit_rows, dry_run=False, start_da
             print("No pending rows to push (Processed=0).")
             return 0, 0, 0, []
 
+        if not dry_run and not row_writer:
+            row_dicts = [
+                {
+                    'ID': r.get('ID'),
+                    'StaffNo': r.get('StaffNo'),
+                    'Transaction Date Time': r.get('TrDateTime'),
+                    'Transaction Date': r.get('TrDate'),
+                    'TrController': r.get('TrController'),
+                    'ClockEvent': r.get('ClockEvent'),
+                    'UnitNo': r.get('UnitNo')
+                }
+                for r in rows
+            ]
+            pushed_rows, skipped, _ = bulk_push_to_mcg_clocking_tbl(row_dicts, conn_orange, conn_data_emp)
+            pushed = len(pushed_rows)
+            print(f"Pushed to mcg_clocking_tbl: {pushed} rows, skipped: {skipped}.")
+            return pushed, skipped, len(rows), pushed_rows
+
         cursor_orange = conn_orange.cursor()
         update_cursor = conn_data_emp.cursor()
 
@@ -1146,14 +2308,16 @@ def push_pending_to_mcg_clocking_tbl(config, limit_rows, dry_run=False, start_da
         print(f"Pushed to mcg_clocking_tbl: {pushed} rows, skipped: {skipped}.")
         return pushed, skipped, len(rows), pushed_rows
     finally:
-        try:
-            conn_data_emp.close()
-        except Exception:
-            pass
-        try:
-            conn_orange.close()
-        except Exception:
-            pass
+        if own_emp:
+            try:
+                conn_data_emp.close()
+            except Exception:
+                pass
+        if own_orange:
+            try:
+                conn_orange.close()
+            except Exception:
+                pass
 
 
 # --------------------------------------------------------------------------
@@ -1284,55 +2448,309 @@ def send_whatsapp_push_report(config, waid, title, total_transactions, valid_tra
 # --------------------------------------------------------------------------
 # 7.1 MISSING CLOCK OUT GENERATOR
 # --------------------------------------------------------------------------
+_MISSING_CLOCK_OUT_COLUMNS = ['CardNo', 'Name', 'Title', 'Position', 'Department', 'CardType', 'Company', 'StaffNo', 'Transaction Date Time', 'Transaction Date', 'Transaction Status', 'TrController', 'ClockEvent', 'UnitNo']
+
 def generate_missing_clock_outs(df_processed, job_end_datetime, policy):
-    rows = []
-    in_rows = df_processed[df_processed['ClockEvent'] == 'Clock In']
-    for _, r in in_rows.iterrows():
-        staff = r['StaffNo']
-        d = r['TrDate']
-        scheduled_out = r.get('ScheduledClockOut')
-        if scheduled_out is None or pd.isna(scheduled_out):
-            continue
-        out_start = scheduled_out - timedelta(minutes=policy['clock_out_early_minutes'])
-        out_end = scheduled_out + timedelta(hours=policy['clock_out_late_hours'])
-        if job_end_datetime < out_end:
-            continue
-        out_rows = df_processed[(df_processed['StaffNo'] == staff) & (df_processed['TrDate'] == d) & (df_processed['ClockEvent'] == 'Clock Out')]
-        found = False
-        for _, ro in out_rows.iterrows():
-            ts = ro['TrDateTime']
-            if out_start <= ts <= out_end:
-                found = True
-                break
-        if found:
-            continue
-        rows.append({
-            'CardNo': r['CardNo'],
-            'Name': r['Name'],
-            'Title': r['Title'],
-            'Position': r['Position'],
-            'Department': r['Department'],
-            'CardType': r['CardType'],
-            'Company': r['Company'],
-            'StaffNo': staff,
-            'Transaction Date Time': out_end,
-            'Transaction Date': d,
-            'Transaction Status': 'System Generated',
-            'TrController': r['TrController'],
-            'ClockEvent': 'Missing Clock Out',
-            'UnitNo': r['UnitNo']
+    """
+    One 'Missing Clock Out' row per Clock In whose clock-out window
+    [ScheduledClockOut - early, ScheduledClockOut + late] has closed by
+    job_end_datetime without a Clock Out for the same staff and shift date.
+    The row is stamped at the end of that window.
+
+    The Clock Ins are matched to the Clock Outs with one merge on
+    (StaffNo, TrDate) instead of scanning the frame per Clock In; the output
+    (rows and order) is the same as the original loop.
+    """
+    if 'ScheduledClockOut' not in df_processed.columns:
+        return pd.DataFrame(columns=_MISSING_CLOCK_OUT_COLUMNS)
+    ins = df_processed[(df_processed['ClockEvent'] == 'Clock In') & df_processed['ScheduledClockOut'].notna()]
+    if len(ins) == 0:
+        return pd.DataFrame(columns=_MISSING_CLOCK_OUT_COLUMNS)
+    scheduled_out = pd.to_datetime(ins['ScheduledClockOut'])
+    out_start = scheduled_out - timedelta(minutes=policy['clock_out_early_minutes'])
+    out_end = scheduled_out + timedelta(hours=policy['clock_out_late_hours'])
+    closed = (out_end <= job_end_datetime).to_numpy()
+    ins = ins[closed]
+    if len(ins) == 0:
+        return pd.DataFrame(columns=_MISSING_CLOCK_OUT_COLUMNS)
+    out_start = out_start[closed]
+    out_end = out_end[closed]
+
+    candidates = pd.DataFrame({
+        'Pos': np.arange(len(ins)),
+        'StaffNo': ins['StaffNo'].to_numpy(),
+        'TrDate': ins['TrDate'].to_numpy(),
+        'OutStart': out_start.to_numpy(),
+        'OutEnd': out_end.to_numpy(),
+    })
+    outs = df_processed.loc[df_processed['ClockEvent'] == 'Clock Out', ['StaffNo', 'TrDate', 'TrDateTime']]
+    pairs = candidates.merge(outs, on=['StaffNo', 'TrDate'], how='inner')
+    in_window = (pairs['TrDateTime'] >= pairs['OutStart']) & (pairs['TrDateTime'] <= pairs['OutEnd'])
+    found = np.zeros(len(ins), dtype=bool)
+    found[pairs.loc[in_window, 'Pos'].to_numpy()] = True
+    if found.all():
+        return pd.DataFrame(columns=_MISSING_CLOCK_OUT_COLUMNS)
+
+    missing = ins[~found]
+    return pd.DataFrame({
+        'CardNo': missing['CardNo'].tolist(),
+        'Name': missing['Name'].tolist(),
+        'Title': missing['Title'].tolist(),
+        'Position': missing['Position'].tolist(),
+        'Department': missing['Department'].tolist(),
+        'CardType': missing['CardType'].tolist(),
+        'Company': missing['Company'].tolist(),
+        'StaffNo': missing['StaffNo'].tolist(),
+        'Transaction Date Time': out_end[~found].tolist(),
+        'Transaction Date': missing['TrDate'].tolist(),
+        'Transaction Status': 'System Generated',
+        'TrController': missing['TrController'].tolist(),
+        'ClockEvent': 'Missing Clock Out',
+        'UnitNo': missing['UnitNo'].tolist(),
+    })
+
+# --------------------------------------------------------------------------
+# 7b. OFFLINE REPLAY (--replay-csv)
+# --------------------------------------------------------------------------
+_REPORT_TO_TRANSACTION_COLUMNS = {
+    'Transaction Date Time': 'TrDateTime',
+    'Transaction Date': 'TrDate',
+    'Transaction Status': 'dtTransaction',
+}
+
+def load_replay_transactions(path):
+    """
+    Reads a tblTransaction-shaped CSV or one of our own report exports. For an
+    export the system-generated Missing Clock Out rows are dropped and the
+    classification columns are returned separately as the expected result.
+
+    Returns (df_transactions, df_expected or None).
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df = df.rename(columns=_REPORT_TO_TRANSACTION_COLUMNS)
+    df_expected = None
+    if 'ClockEvent' in df.columns:
+        df_expected = df[['StaffNo', 'TrDateTime', 'ClockEvent']].copy()
+        generated = df['ClockEvent'] == 'Missing Clock Out'
+        if 'dtTransaction' in df.columns:
+            generated |= df['dtTransaction'] == 'System Generated'
+        df = df[~generated]
+    df = df.drop(columns=[c for c in ('ClockEvent', 'ScheduledClockIn', 'ScheduledClockOut') if c in df.columns])
+    df = df.copy()
+    df['TrDateTime'] = pd.to_datetime(df['TrDateTime'])
+    # An export's Transaction Date is the shift date; classification starts from the scan date.
+    df['TrDate'] = df['TrDateTime'].dt.date
+    df.sort_values(by=['TrDateTime', 'CardNo'], inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    return df, df_expected
+
+def load_schedule_snapshot(path):
+    """Schedule snapshot CSV: StaffNo, ShiftDate (blank = undated fallback), TimeIn, TimeOut, NextDay."""
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    missing = {'StaffNo', 'ShiftDate', 'TimeIn', 'TimeOut', 'NextDay'} - set(df.columns)
+    if missing:
+        raise ValueError(f"Schedule snapshot {path} is missing columns: {', '.join(sorted(missing))}")
+    return df
+
+def schedule_snapshot_from_report(path):
+    """
+    Derives a dated snapshot from the ScheduledClockIn/Out columns of a report
+    export. Days the export has no rows for (e.g. a D-1 overnight shift outside
+    the file) stay unknown; pass --replay-schedule for those.
+    """
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    if 'ScheduledClockIn' not in df.columns or 'ScheduledClockOut' not in df.columns:
+        raise ValueError(f"{path} has no ScheduledClockIn/ScheduledClockOut columns; pass --replay-schedule")
+    df = df[(df['ScheduledClockIn'] != '') & (df['ScheduledClockOut'] != '')]
+    sched_in = pd.to_datetime(df['ScheduledClockIn'])
+    sched_out = pd.to_datetime(df['ScheduledClockOut'])
+    snapshot = pd.DataFrame({
+        'StaffNo': df['StaffNo'].values,
+        'ShiftDate': sched_in.dt.strftime('%Y-%m-%d').values,
+        'TimeIn': sched_in.dt.strftime('%H:%M:%S').values,
+        'TimeOut': sched_out.dt.strftime('%H:%M:%S').values,
+        'NextDay': (sched_out.dt.normalize() > sched_in.dt.normalize()).astype(int).values,
+    })
+    return snapshot.drop_duplicates(subset=['StaffNo', 'ShiftDate'], keep='first')
+
+def schedule_locks_from_snapshot(df_snapshot, df_transactions, lock_cache):
+    """The offline counterpart of prefetch_schedule_locks."""
+    staff_nos, span_start, span_end = _lock_span(df_transactions)
+    if not staff_nos:
+        return 0
+    dated = df_snapshot['ShiftDate'].astype(str).str.strip() != ''
+    df_locks = df_snapshot[dated]
+    df_mti = df_snapshot[~dated].rename(columns={
+        'StaffNo': 'employee_id', 'TimeIn': 'time_in', 'TimeOut': 'time_out', 'NextDay': 'next_day'
+    })
+    return _fill_lock_cache(lock_cache, staff_nos, span_start, span_end, df_locks, df_mti)
+
+def _replay_end_datetime(df_transactions, replay_end=None):
+    # A --date/--start-date run ends at the end of its last day; an incremental
+    # or 24h run ends when it ran, which has to be passed as --replay-end.
+    if replay_end:
+        return datetime.strptime(str(replay_end).strip(), '%Y-%m-%d %H:%M:%S')
+    last_day = df_transactions['TrDateTime'].max().normalize().to_pydatetime()
+    return last_day + timedelta(days=1) - timedelta(seconds=1)
+
+def _replay_diff(df_expected, df_report):
+    """Multiset comparison of (StaffNo, TrDateTime, ClockEvent) against the replayed export."""
+    def _counts(staff, ts, events):
+        keys = pd.DataFrame({
+            'StaffNo': staff.astype(str).values,
+            'TrDateTime': pd.to_datetime(ts).dt.strftime('%Y-%m-%d %H:%M:%S').values,
+            'ClockEvent': events.astype(str).values,
         })
-    if not rows:
-        return pd.DataFrame(columns=['CardNo','Name','Title','Position','Department','CardType','Company','StaffNo','Transaction Date Time','Transaction Date','Transaction Status','TrController','ClockEvent','UnitNo'])
-    return pd.DataFrame(rows)
+        return keys.value_counts()
+    expected = _counts(df_expected['StaffNo'], df_expected['TrDateTime'], df_expected['ClockEvent'])
+    actual = _counts(df_report['StaffNo'], df_report['Transaction Date Time'], df_report['ClockEvent'])
+    joined = pd.concat([expected.rename('expected'), actual.rename('actual')], axis=1).fillna(0)
+    return {
+        'expected': int(joined['expected'].sum()),
+        'matched': int(joined[['expected', 'actual']].min(axis=1).sum()),
+        'missing': int((joined['expected'] - joined['actual']).clip(lower=0).sum()),
+        'extra': int((joined['actual'] - joined['expected']).clip(lower=0).sum()),
+    }
+
+def _run_replay(args, config, summary, run_started):
+    phase_started = time_mod.perf_counter()
+    df_transactions, df_expected = load_replay_transactions(args.replay_csv)
+    lock_cache = {}
+    manual = bool(config['MANUAL_TIME_IN'] and config['MANUAL_TIME_OUT'])
+    if not manual:
+        if args.replay_schedule:
+            df_snapshot = load_schedule_snapshot(args.replay_schedule)
+        else:
+            df_snapshot = schedule_snapshot_from_report(args.replay_csv)
+        cached_pairs = schedule_locks_from_snapshot(df_snapshot, df_transactions, lock_cache)
+        print(f"Schedule locks loaded from snapshot: {cached_pairs} staff/date pairs.")
+    _record_phase(summary, 'load', phase_started)
+
+    phase_started = time_mod.perf_counter()
+    df_processed_all = apply_clock_event_logic(
+        df_transactions,
+        None,
+        config['MANUAL_TIME_IN'],
+        config['MANUAL_TIME_OUT'],
+        config['POLICY'],
+        lock_cache=lock_cache,
+        dry_run=True,
+        use_filo=args.use_filo,
+        vectorized=not args.row_classifier
+    )
+    df_processed = df_processed_all[df_processed_all['ClockEvent'] != 'No Shift Data']
+    _record_phase(summary, 'classification', phase_started)
+
+    phase_started = time_mod.perf_counter()
+    end_datetime = _replay_end_datetime(df_transactions, args.replay_end)
+    df_report = df_processed.rename(columns={
+        'TrDateTime': 'Transaction Date Time',
+        'TrDate': 'Transaction Date',
+        'dtTransaction': 'Transaction Status'
+    })
+    df_missing = generate_missing_clock_outs(df_processed, end_datetime, config['POLICY'])
+    if len(df_missing) > 0:
+        df_report = pd.concat([df_report, df_missing], ignore_index=True)
+    output_filename = args.replay_output or f"replay_{os.path.splitext(os.path.basename(args.replay_csv))[0]}.csv"
+    export_to_csv(df_report, output_filename)
+    _record_phase(summary, 'report', phase_started)
+    print(f"Data exported to {output_filename} successfully.")
+
+    total_processed = len(df_processed)
+    valid_transactions = int(df_processed['ClockEvent'].isin(['Clock In', 'Clock Out']).sum())
+    summary.update({
+        'mode': 'replay',
+        'totalRetrieved': len(df_transactions),
+        'totalProcessed': total_processed,
+        'noShift': len(df_processed_all) - total_processed,
+        'valid': valid_transactions,
+        'invalid': total_processed - valid_transactions,
+        'missingClockOut': len(df_missing),
+        'replayEnd': end_datetime.strftime('%Y-%m-%d %H:%M:%S'),
+        'exportedCsv': output_filename,
+    })
+    if df_expected is not None:
+        summary['replayDiff'] = _replay_diff(df_expected, df_report)
+    print(f"Replay: {summary['totalRetrieved']} transactions, {valid_transactions} Clock In/Out, {len(df_missing)} missing clock-outs.")
+    if 'replayDiff' in summary:
+        print(f"Replay diff vs input: {summary['replayDiff']}")
+    return _finish_summary(summary, run_started)
 
 # --------------------------------------------------------------------------
 # 8. MAIN FUNCTION
 # --------------------------------------------------------------------------
-def main():
-    args = parse_arguments()
-    config = get_config()
+def _runtime_connection(runtime, key, connect, config):
+    """
+    Connections for one run. One-shot runs (runtime=None) always open a fresh
+    connection and close it at the end; the resident worker keeps them in its
+    runtime dict and reuses them across cycles.
+    """
+    if runtime is None:
+        return connect(config)
+    if runtime.get(key) is None:
+        runtime[key] = connect(config)
+    return runtime[key]
+
+def close_runtime(runtime):
+    for key in ('conn_data_db', 'conn_data_emp', 'conn_orange_temp'):
+        conn = runtime.get(key)
+        runtime[key] = None
+        if conn is None:
+            continue
+        try:
+            conn.close()
+        except Exception:
+            pass
 
+def run_attendance_job(args, config, runtime=None, summary=None):
+    """
+    One run of the attendance pipeline for the parsed arguments: retrieval,
+    classification, report/insert and (for --run-10min) the auto push.
+
+    runtime is the resident worker's state (open connections and the schedule
+    lock_cache); leave it None for a one-shot run. The run summary is filled
+    into summary (pass a dict to keep it when the run raises) and returned.
+    Query/row/latency counters and peak memory are attached under
+    'instrumentation' and, outside dry runs, saved to AttendanceRunHistory.
+    """
+    global _ACTIVE_METRICS
+    if summary is None:
+        summary = {}
+    summary.update({'startedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'phases': {}, 'errors': []})
+    run_started = time_mod.perf_counter()
+    metrics = _ACTIVE_METRICS = new_run_metrics()
+    try:
+        return _run_attendance_job(args, config, runtime, summary, run_started)
+    except Exception as e:
+        summary['errors'].append(f"{type(e).__name__}: {e}")
+        _finish_summary(summary, run_started)
+        raise
+    finally:
+        _ACTIVE_METRICS = None
+        summary['instrumentation'] = metrics_summary(metrics)
+        _emit_run_metrics(args, config, runtime, summary)
+
+def _emit_run_metrics(args, config, runtime, summary):
+    instr = summary['instrumentation']
+    phases = ", ".join(f"{k}={v}" for k, v in summary.get('phases', {}).items())
+    print(f"Run metrics: queries={instr['queries']} rowsFetched={instr['rowsFetched']} dbMs={instr['dbMs']} peakMemoryMb={instr['peakMemoryMb']}")
+    print(f"Phase durations (ms): {phases or '-'}")
+    if args.dry_run or args.replay_csv:
+        return
+    conn = None
+    try:
+        conn = _runtime_connection(runtime, 'conn_data_emp', connect_data_employee, config)
+        ensure_attendance_run_history_table(conn)
+        save_attendance_run_history(conn, args.job_name, summary)
+    except Exception as e:
+        print(f"Failed to save attendance run history: {e}")
+    finally:
+        if runtime is None and conn is not None:
+            conn.close()
+
+def _run_attendance_job(args, config, runtime, summary, run_started):
+    if args.replay_csv:
+        return _run_replay(args, config, summary, run_started)
     if args.run_10min:
         args.incremental = True
 
@@ -1358,7 +2776,10 @@ def main():
     if args.push_now_report:
         slot = str(args.slot_override).strip() if args.slot_override else _auto_push_slot(_push_now())
         try:
-            pushed, skipped, total, pushed_rows = push_pending_to_mcg_clocking_tbl(config, int(args.push_limit), dry_run=DRY_RUN)
+            phase_started = time_mod.perf_counter()
+            pushed, skipped, total, pushed_rows = push_pending_to_mcg_clocking_tbl(config, int(args.push_limit), dry_run=DRY_RUN, row_writer=args.row_writer)
+            _record_phase(summary, 'push', phase_started)
+            phase_started = time_mod.perf_counter()
             title = "📊 Attendance (Manual Push)"
             send_whatsapp_push_report(
                 config,
@@ -1374,22 +2795,28 @@ def main():
                 total,
                 dry_run=DRY_RUN
             )
+            _record_phase(summary, 'whatsapp', phase_started)
             if not DRY_RUN:
                 save_auto_push_state(config, slot, None)
             print(f"Manual push completed: pushed={pushed}, skipped={skipped}, total={total}, slot={slot}")
-            return
+            summary.update({'pushed': pushed, 'pushSkipped': skipped, 'pushTotal': total, 'slot': slot})
+            return _finish_summary(summary, run_started)
         except Exception as e:
             if not DRY_RUN:
                 save_auto_push_state(config, slot, str(e))
             raise
 
     if args.push_mcg and (not args.run_10min):
-        push_pending_to_mcg_clocking_tbl(
+        phase_started = time_mod.perf_counter()
+        pushed, skipped, total, _ = push_pending_to_mcg_clocking_tbl(
             config, int(args.push_limit), dry_run=DRY_RUN,
             start_date=args.push_start_date, end_date=args.push_end_date,
-            staff_no=args.push_staff_no, repush=bool(args.repush)
+            staff_no=args.push_staff_no, repush=bool(args.repush),
+            row_writer=args.row_writer
         )
-        return
+        _record_phase(summary, 'push', phase_started)
+        summary.update({'pushed': pushed, 'pushSkipped': skipped, 'pushTotal': total})
+        return _finish_summary(summary, run_started)
 
     if args.incremental:
         if not args.run_10min:
@@ -1397,7 +2824,7 @@ def main():
         if not DRY_RUN:
             INSERT_TO_TBL_ATTENDANCE_REPORT = True
         now = datetime.now()
-        conn_state = connect_data_employee(config)
+        conn_state = _runtime_connection(runtime, 'conn_data_emp', connect_data_employee, config)
         try:
             ensure_attendance_job_state_table(conn_state)
             job_state_prev = load_attendance_job_state(conn_state, job_name)
@@ -1416,7 +2843,8 @@ def main():
                 watermark_dt = None
                 watermark_card_no = None
         finally:
-            conn_state.close()
+            if runtime is None:
+                conn_state.close()
 
     print("Arguments parsed and configuration loaded.")
 
@@ -1439,7 +2867,8 @@ def main():
             single_date = datetime.strptime(args.date, '%Y-%m-%d')
         except ValueError:
             print("Invalid date format for --date. Please use YYYY-MM-DD.")
-            return
+            summary['errors'].append("Invalid date format for --date")
+            return _finish_summary(summary, run_started)
         
         start_datetime = single_date  # e.g. 2025-03-10 00:00:00
         end_datetime   = single_date + timedelta(days=1) - timedelta(seconds=1)  # e.g. 2025-03-10 23:59:59
@@ -1463,7 +2892,8 @@ def main():
                 print("WARNING: start date is after end date. Double-check inputs.")
         except ValueError:
             print("Invalid date format for --start-date or --end-date. Please use YYYY-MM-DD.")
-            return
+            summary['errors'].append("Invalid date format for --start-date or --end-date")
+            return _finish_summary(summary, run_started)
 
     else:
         # No date arguments => last 24 hours
@@ -1486,20 +2916,21 @@ def main():
     # ----------------------------------------------------------------------
     # Database Connections
     # ----------------------------------------------------------------------
-    conn_data_db = connect_data_db(config)
+    conn_data_db = _runtime_connection(runtime, 'conn_data_db', connect_data_db, config)
     print("Connected to DataDBEnt.")
 
-    conn_data_emp = connect_data_employee(config)
+    conn_data_emp = _runtime_connection(runtime, 'conn_data_emp', connect_data_employee, config)
     print("Connected to EmployeeWorkflow.")
 
     conn_orange_temp = None
     if (not DRY_RUN) and INSERT_TO_MCG_CLOCKING_TBL:
-        conn_orange_temp = connect_orange_temp(config)
+        conn_orange_temp = _runtime_connection(runtime, 'conn_orange_temp', connect_orange_temp, config)
         print("Connected to ORANGE-TEMP.")
 
     # ----------------------------------------------------------------------
     # Retrieve and Process Attendance Data
     # ----------------------------------------------------------------------
+    phase_started = time_mod.perf_counter()
     df_transactions = retrieve_attendance_transactions(
         conn_data_db,
         config['tr_controller_list'],
@@ -1507,7 +2938,11 @@ def main():
         end_datetime,
         staff_no,
         watermark_dt=watermark_dt,
-        watermark_card_no=watermark_card_no
+        watermark_card_no=watermark_card_no,
+        window_hours=args.retrieval_window_hours if args.retrieval_window_hours is not None else _env_positive_int('ATTENDANCE_RETRIEVAL_WINDOW_HOURS', 0),
+        workers=max(1, args.retrieval_workers if args.retrieval_workers is not None else _env_positive_int('ATTENDANCE_RETRIEVAL_WORKERS', 4)),
+        connect=lambda: connect_data_db(config),
+        card_cache=runtime.setdefault('card_dimension', {}) if runtime is not None else None
     )
     if staff_no:
         print(f"Attendance transactions retrieved for staff {staff_no}.")
@@ -1526,8 +2961,13 @@ def main():
         last_row = df_transactions.sort_values(by=['TrDateTime', 'CardNo']).iloc[-1]
         last_seen_dt = pd.to_datetime(last_row['TrDateTime']).to_pydatetime()
         last_seen_card = str(last_row['CardNo'])
+    _record_phase(summary, 'retrieval', phase_started)
 
-    lock_cache = {}
+    phase_started = time_mod.perf_counter()
+    lock_cache = runtime.setdefault('lock_cache', {}) if runtime is not None else {}
+    if not (config['MANUAL_TIME_IN'] and config['MANUAL_TIME_OUT']):
+        cached_pairs = prefetch_schedule_locks(conn_data_emp, df_transactions, lock_cache)
+        print(f"Schedule locks prefetched: {cached_pairs} staff/date pairs.")
 
     df_processed = apply_clock_event_logic(
         df_transactions,
@@ -1537,7 +2977,8 @@ def main():
         config['POLICY'],
         lock_cache=lock_cache,
         dry_run=DRY_RUN,
-        use_filo=USE_FILO
+        use_filo=USE_FILO,
+        vectorized=not args.row_classifier
     )
     df_processed_all = df_processed
     no_shift_count = 0
@@ -1545,6 +2986,7 @@ def main():
         no_shift_count = int((df_processed_all['ClockEvent'] == 'No Shift Data').sum())
 
     df_processed = df_processed_all[df_processed_all['ClockEvent'] != 'No Shift Data']
+    _record_phase(summary, 'classification', phase_started)
     print("Clock event logic applied.")
 
     # Rename for clarity
@@ -1585,10 +3027,12 @@ def main():
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             output_filename = f'attreport_{staff_prefix}24h_{timestamp}.csv'
 
+        phase_started = time_mod.perf_counter()
         df_missing = generate_missing_clock_outs(df_processed, end_datetime, config['POLICY'])
         if len(df_missing) > 0:
             df_report = pd.concat([df_report, df_missing], ignore_index=True)
         export_to_csv(df_report, output_filename)
+        _record_phase(summary, 'report', phase_started)
         print(f"Data exported to {output_filename} successfully.")
 
     # ----------------------------------------------------------------------
@@ -1599,25 +3043,47 @@ def main():
     mcg_success_count = 0
     if INSERT_TO_TBL_ATTENDANCE_REPORT or INSERT_TO_MCG_CLOCKING_TBL:
         if INSERT_TO_MCG_CLOCKING_TBL and conn_orange_temp is None:
-            conn_orange_temp = connect_orange_temp(config)
+            conn_orange_temp = _runtime_connection(runtime, 'conn_orange_temp', connect_orange_temp, config)
         
         # Use existing EmployeeWorkflow connection for tblAttendanceReport (has ScheduledClockIn/Out columns)
         df_db = df_report_for_db[df_report_for_db['ClockEvent'] != 'Missing Clock Out'] if 'ClockEvent' in df_report_for_db.columns else df_report_for_db
+        phase_started = time_mod.perf_counter()
         inserted_count, skipped_count, mcg_success_count, insert_error_count, insert_last_ok_dt, insert_last_ok_card = insert_data(
             df_db,
             conn_data_emp,
             conn_orange_temp,
             INSERT_TO_TBL_ATTENDANCE_REPORT,
             INSERT_TO_MCG_CLOCKING_TBL,
-            args.force_replace
+            args.force_replace,
+            row_writer=args.row_writer
         )
+        _record_phase(summary, 'insert_data', phase_started)
+        if insert_error_count > 0:
+            summary['errors'].append(f"insert_errors={insert_error_count}")
         print("Data inserted into the respective tables successfully.")
 
+    pushed = 0
+    push_skipped = 0
+    push_total = 0
+    push_slot = None
+    last_dt_next = None
+    last_card_next = None
     if args.run_10min:
-        should_push, slot = should_auto_push_now(config, int(args.push_window_minutes), dry_run=DRY_RUN)
+        should_push, slot = should_auto_push_now(config, int(args.push_window_minutes), dry_run=DRY_RUN, conn_state=conn_data_emp)
         if should_push and slot is not None:
+            push_slot = slot
             try:
-                pushed, skipped, total, pushed_rows = push_pending_to_mcg_clocking_tbl(config, int(args.push_limit), dry_run=DRY_RUN)
+                phase_started = time_mod.perf_counter()
+                conn_orange_push = None
+                if runtime is not None and not DRY_RUN:
+                    conn_orange_push = _runtime_connection(runtime, 'conn_orange_temp', connect_orange_temp, config)
+                pushed, skipped, total, pushed_rows = push_pending_to_mcg_clocking_tbl(
+                    config, int(args.push_limit), dry_run=DRY_RUN, row_writer=args.row_writer,
+                    conn_data_emp=conn_data_emp, conn_orange=conn_orange_push
+                )
+                push_skipped, push_total = skipped, total
+                _record_phase(summary, 'push', phase_started)
+                phase_started = time_mod.perf_counter()
                 title = f"📊 Attendance (Incremental)"
                 send_whatsapp_push_report(
                     config,
@@ -1633,11 +3099,13 @@ def main():
                     total,
                     dry_run=DRY_RUN
                 )
+                _record_phase(summary, 'whatsapp', phase_started)
                 if not DRY_RUN:
-                    save_auto_push_state(config, slot, None)
+                    save_auto_push_state(config, slot, None, conn_state=conn_data_emp)
             except Exception as e:
+                summary['errors'].append(f"push: {e}")
                 if not DRY_RUN:
-                    save_auto_push_state(config, slot, str(e))
+                    save_auto_push_state(config, slot, str(e), conn_state=conn_data_emp)
 
     if args.incremental and (not DRY_RUN):
         try:
@@ -1667,6 +3135,7 @@ def main():
                         last_card_next = str(job_state_prev.get('LastProcessedCardNo'))
                 save_attendance_job_state(conn_data_emp, job_name, last_dt_next, last_card_next, datetime.now(), None)
         except Exception as e:
+            summary['errors'].append(f"job_state: {e}")
             try:
                 ensure_attendance_job_state_table(conn_data_emp)
                 save_attendance_job_state(conn_data_emp, job_name, watermark_dt, watermark_card_no, datetime.now(), str(e))
@@ -1674,24 +3143,275 @@ def main():
                 pass
 
     # ----------------------------------------------------------------------
-    # Close database connections
+    # Close database connections (the resident worker keeps its own open)
     # ----------------------------------------------------------------------
-    if conn_data_db:
-        conn_data_db.close()
-        print("DataDBEnt connection closed.")
-    if conn_data_emp:
-        conn_data_emp.close()
-        print("EmployeeWorkflow connection closed.")
-    if conn_orange_temp:
-        conn_orange_temp.close()
-        print("ORANGE-TEMP connection closed.")
+    if runtime is None:
+        if conn_data_db:
+            conn_data_db.close()
+            print("DataDBEnt connection closed.")
+        if conn_data_emp:
+            conn_data_emp.close()
+            print("EmployeeWorkflow connection closed.")
+        if conn_orange_temp:
+            conn_orange_temp.close()
+            print("ORANGE-TEMP connection closed.")
 
     # ----------------------------------------------------------------------
     # Send Report to WhatsApp (if WAID is provided)
     # ----------------------------------------------------------------------
     if not args.incremental and not args.no_report and output_filename:
+        phase_started = time_mod.perf_counter()
         send_media_group(WAID, WHATSAPP_MESSAGE, output_filename, 'document', config['whatsapp_api_url'], config)
+        _record_phase(summary, 'whatsapp', phase_started)
         print("Report sent to WhatsApp group (if --waid was provided).")
 
+    prev_dt = job_state_prev.get('LastProcessedTrDateTime') if job_state_prev else None
+    prev_card = job_state_prev.get('LastProcessedCardNo') if job_state_prev else None
+    summary.update({
+        'totalRetrieved': total_transactions,
+        'totalProcessed': total_processed,
+        'noShift': no_shift_count,
+        'valid': valid_transactions,
+        'invalid': invalid_transactions,
+        'newInserted': inserted_count,
+        'insertSkipped': skipped_count,
+        'insertErrors': insert_error_count,
+        'mcgInserted': mcg_success_count,
+        'pushed': pushed,
+        'pushSkipped': push_skipped,
+        'pushTotal': push_total,
+        'slot': push_slot,
+        'watermarkBefore': {'trDateTime': _format_watermark(prev_dt), 'cardNo': None if prev_card is None else str(prev_card)},
+        'watermarkAfter': {'trDateTime': _format_watermark(last_dt_next), 'cardNo': last_card_next},
+        'exportedCsv': output_filename,
+    })
+    return _finish_summary(summary, run_started)
+
+def _record_phase(summary, phase, started):
+    summary['phases'][phase] = summary['phases'].get(phase, 0) + int(round((time_mod.perf_counter() - started) * 1000))
+
+def _finish_summary(summary, run_started):
+    summary['finishedAt'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    summary['durationMs'] = int(round((time_mod.perf_counter() - run_started) * 1000))
+    summary['success'] = not summary['errors']
+    return summary
+
+def _format_watermark(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+def _prune_lock_cache(lock_cache, keep_days=3):
+    """
+    Drop dated schedule locks older than keep_days so the resident worker's
+    cache stays bounded. MTIUsers fallbacks (ShiftDate None) are kept.
+    """
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime('%Y-%m-%d')
+    stale = [k for k in lock_cache if k[1] is not None and str(k[1]) < cutoff]
+    for k in stale:
+        del lock_cache[k]
+    return len(stale)
+
+def _write_daemon_status(path, status):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(status, fh, default=str, indent=2)
+    os.replace(tmp_path, path)
+
+def run_daemon(args, config):
+    """
+    Resident worker: run the --run-10min cycle every --interval seconds in one
+    process, reusing the DB connections, the MTIUsers snapshot and the CardDB
+    dimension between cycles and skipping the DDL checks after the first one.
+    Schedule locks are not carried over usefully: prefetch_schedule_locks
+    re-reads the D-1..D+1 span of each cycle's scans, and the lock cache is
+    only pruned to keep it bounded. The last-run summary is written to the
+    status file after each cycle. A failed cycle drops the connections so the
+    next one reconnects.
+    """
+    args.run_10min = True
+    interval = max(60, int(args.interval))
+    status_file = args.status_file or os.getenv('ATTENDANCE_DAEMON_STATUS_FILE') or 'attendance_daemon_status.json'
+    runtime = {'lock_cache': {}}
+    cycles = 0
+    print(f"Attendance daemon started: interval={interval}s, status_file={status_file}")
+    try:
+        while True:
+            cycle_start = time_mod.monotonic()
+            cycles += 1
+            _prune_lock_cache(runtime['lock_cache'])
+            summary = {}
+            try:
+                run_attendance_job(args, config, runtime=runtime, summary=summary)
+            except Exception:
+                close_runtime(runtime)
+            summary['cycle'] = cycles
+            summary['durationMs'] = int((time_mod.monotonic() - cycle_start) * 1000)
+            summary['lockCacheSize'] = len(runtime['lock_cache'])
+            summary['nextRunInSec'] = max(0, int(interval - (time_mod.monotonic() - cycle_start)))
+            try:
+                _write_daemon_status(status_file, summary)
+            except Exception as e:
+                print(f"Failed to write daemon status file {status_file}: {e}")
+            print(
+                f"Daemon cycle {cycles}: success={summary['success']} total={summary.get('totalRetrieved', 0)} "
+                f"inserted={summary.get('newInserted', 0)} pushed={summary.get('pushed', 0)} "
+                f"durationMs={summary['durationMs']}"
+                + (f" errors={'; '.join(summary['errors'])}" if summary.get('errors') else "")
+            )
+            time_mod.sleep(max(0.0, interval - (time_mod.monotonic() - cycle_start)))
+    except KeyboardInterrupt:
+        print("Attendance daemon stopped.")
+    finally:
+        close_runtime(runtime)
+
+BACKFILL_MAX_WORKERS = 8
+
+def _backfill_days(args):
+    start = datetime.strptime(args.start_date or args.end_date, '%Y-%m-%d').date()
+    end = datetime.strptime(args.end_date or args.start_date, '%Y-%m-%d').date()
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - start).days + 1)]
+
+def _backfill_key(args):
+    """Progress scope: which tables are written, for whom, and whether existing rows are replaced."""
+    tables = '+'.join(t for t, on in (('att', args.insert_att), ('mcg', args.insert_mcg)) if on) or 'none'
+    return f"{tables}|{args.staff_no or 'all'}|{'replace' if args.force_replace else 'keep'}"
+
+def _backfill_workers(args):
+    raw = args.backfill_workers if args.backfill_workers is not None else os.getenv('ATTENDANCE_BACKFILL_WORKERS')
+    try:
+        workers = int(str(raw).strip()) if raw is not None and str(raw).strip() != '' else 4
+    except ValueError:
+        workers = 4
+    return max(1, min(BACKFILL_MAX_WORKERS, workers))
+
+def _run_backfill_day(args, work_date):
+    """
+    Process-pool task: one --date run for work_date with its progress output
+    discarded. Returns the run summary; a raised error is reported in it.
+    """
+    day_args = argparse.Namespace(**vars(args))
+    day_args.date = work_date
+    day_args.start_date = None
+    day_args.end_date = None
+    day_args.backfill = False
+    day_args.incremental = False
+    day_args.run_10min = False
+    day_args.no_report = True
+    summary = {}
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        try:
+            run_attendance_job(day_args, get_config(), summary=summary)
+        except Exception:
+            traceback.print_exc()
+            summary['success'] = False
+    return summary
+
+def run_backfill(args, config):
+    """
+    --backfill: run --start-date..--end-date as one --date run per day on a
+    process pool of --backfill-workers processes, which also bounds the number
+    of concurrent DB sessions. Each finished day is recorded in
+    AttendanceBackfillProgress under the scope key; a rerun of the same scope
+    skips the days already done, so a range that died on day 20 resumes there.
+
+    Days are independent even for overnight shifts: a day's run reads its own
+    scans only, and prefetch_schedule_locks loads the D-1 schedule locks with
+    them, so a 06:00 Clock Out on D is still classified against the D-1 shift
+    (and written with ShiftDate D-1) without waiting for D-1's run. Writes are
+    keyed on the scan, so concurrent days never touch the same rows.
+    """
+    if not (args.start_date or args.end_date):
+        raise ValueError("--backfill needs --start-date and/or --end-date")
+    days = _backfill_days(args)
+    backfill_key = _backfill_key(args)
+    workers = _backfill_workers(args)
+    started = time_mod.perf_counter()
+    summary = {
+        'startedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'backfillKey': backfill_key,
+        'days': len(days),
+        'workers': workers,
+        'alreadyDone': 0,
+        'succeeded': 0,
+        'failedDays': [],
+        'totalRetrieved': 0,
+        'newInserted': 0,
+        'insertSkipped': 0,
+        'errors': [],
+    }
+    conn = connect_data_employee(config)
+    try:
+        ensure_attendance_backfill_progress_table(conn)
+        if args.backfill_restart:
+            reset_backfill_progress(conn, backfill_key)
+        done = load_backfill_done_days(conn, backfill_key)
+        pending = [d for d in days if d not in done]
+        summary['alreadyDone'] = len(days) - len(pending)
+        print(f"Backfill {backfill_key}: {len(pending)} of {len(days)} days pending, workers={workers}")
+        if pending:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                futures = {pool.submit(_run_backfill_day, args, d): d for d in pending}
+                for future in as_completed(futures):
+                    work_date = futures[future]
+                    try:
+                        day_summary = future.result()
+                    except Exception as e:
+                        day_summary = {'errors': [f"{type(e).__name__}: {e}"]}
+                    ok = bool(day_summary.get('success')) and not day_summary.get('errors')
+                    save_backfill_day(conn, backfill_key, work_date, 'done' if ok else 'failed', day_summary)
+                    if ok:
+                        summary['succeeded'] += 1
+                    else:
+                        summary['failedDays'].append(work_date)
+                        summary['errors'].extend(f"{work_date}: {e}" for e in day_summary.get('errors') or ['failed'])
+                    for key in ('totalRetrieved', 'newInserted', 'insertSkipped'):
+                        summary[key] += int(day_summary.get(key) or 0)
+                    print(
+                        f"Backfill day {work_date}: {'done' if ok else 'failed'} total={day_summary.get('totalRetrieved', 0)} "
+                        f"inserted={day_summary.get('newInserted', 0)} skipped={day_summary.get('insertSkipped', 0)}"
+                    )
+    finally:
+        conn.close()
+    summary['failedDays'].sort()
+    return _finish_summary(summary, started)
+
+def run_summary_json(args, config):
+    """
+    --summary-json: run one job with progress output discarded and print a
+    single JSON summary line for the Node runner. An unhandled error is
+    reported in the summary (traceback on stderr) and gives exit code 1.
+    """
+    exit_code = 0
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        summary = {}
+        try:
+            run_attendance_job(args, config, summary=summary)
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+    print(json.dumps(summary, default=str))
+    return exit_code
+
+def main():
+    args = parse_arguments()
+    config = get_config()
+    if args.daemon:
+        run_daemon(args, config)
+    elif args.backfill:
+        if args.summary_json:
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                summary = run_backfill(args, config)
+            print(json.dumps(summary, default=str))
+        else:
+            summary = run_backfill(args, config)
+        sys.exit(0 if summary['success'] else 1)
+    elif args.summary_json:
+        sys.exit(run_summary_json(args, config))
+    else:
+        run_attendance_job(args, config)
+
 if __name__ == '__main__':
     main()
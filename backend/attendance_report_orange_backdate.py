@@ -1,5 +1,7 @@
 import argparse
+import json
 from datetime import datetime, timedelta, time as dtime
+import numpy as np
 import pandas as pd
 import os
 import re
@@ -20,6 +22,12 @@ def parse_arguments():
     g.add_argument("--force-replace", action="store_true", help="Replace existing records in DB for the selected scope (default).")
     g.add_argument("--skip-existing", action="store_true", help="Skip rows that already exist in DB.")
     p.add_argument("--output", required=False, help="Output CSV filename (optional)")
+    p.add_argument("--local-schedules", action="store_true", help="Read schedules from EmployeeWorkflow dbo.OrangeScheduleDaily first; only missing or stale pairs go to ORANGE.")
+    p.add_argument("--local-max-age-hours", type=int, default=24, help="With --local-schedules, a row fetched before its shift day ended is stale after this many hours (default 24).")
+    p.add_argument("--row-writer", action="store_true", help="Write tblAttendanceReport and mcg_clocking_tbl row by row instead of the staged bulk writers (for comparison).")
+    p.add_argument("--row-classifier", action="store_true", help="Classify scans row by row with determine_clock_event_orange instead of the columnar classifier (for comparison).")
+    p.add_argument("--chunk-rows", type=int, default=_env_int("ATTENDANCE_BULK_CHUNK_ROWS", 2000), help="Rows per staged chunk; each chunk is committed on its own (default ATTENDANCE_BULK_CHUNK_ROWS or 2000).")
+    p.add_argument("--write-back", action="store_true", help="With --local-schedules, upsert the schedules fetched from ORANGE into dbo.OrangeScheduleDaily.")
     return p.parse_args()
 
 
@@ -288,6 +296,182 @@ def _get_orange_schedule_cache(conn_orange, staff_no, date_str, cache):
     return schedule
 
 
+def schedule_pairs_for_scans(df):
+    """Distinct (StaffNo, date) pairs the classifier will look up: every scan date and the day before it."""
+    scan_dates = pd.to_datetime(df["TrDateTime"]).dt.normalize()
+    staff = df["StaffNo"].astype(str).str.strip()
+    pairs = pd.concat([
+        pd.DataFrame({"StaffNo": staff, "ShiftDate": scan_dates}),
+        pd.DataFrame({"StaffNo": staff, "ShiftDate": scan_dates - pd.Timedelta(days=1)}),
+    ]).drop_duplicates()
+    pairs["ShiftDate"] = pairs["ShiftDate"].dt.strftime("%Y-%m-%d")
+    return pairs.sort_values(["ShiftDate", "StaffNo"]).reset_index(drop=True)
+
+
+def read_orange_day_types_batch(conn_orange, staff_nos, date_str):
+    """
+    sp_it_get_day_type for many staff on one date in a single query. Returns
+    {staff_no: (cols, rows)} shaped like read_orange_day_type, where rows is
+    empty when ORANGE has nothing for that staff.
+    """
+    cursor = conn_orange.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT ids.employee_id AS BackdateStaffNo, dt.*
+            FROM (
+                SELECT DISTINCT LTRIM(RTRIM(value)) AS employee_id
+                FROM STRING_SPLIT(%s, ',')
+                WHERE LTRIM(RTRIM(value)) <> ''
+            ) AS ids
+            OUTER APPLY (
+                SELECT TOP 1 *
+                FROM dbo.sp_it_get_day_type('MTI', ids.employee_id, %s)
+            ) AS dt
+            """,
+            (",".join(staff_nos), date_str),
+        )
+        cols = [d[0] for d in cursor.description][1:] if cursor.description else []
+        out = {str(s): (cols, []) for s in staff_nos}
+        for row in cursor.fetchall():
+            values = list(row[1:])
+            # OUTER APPLY yields an all-NULL row when the function returned nothing.
+            if any(v is not None for v in values):
+                out[str(row[0])] = (cols, [values])
+        return out
+    finally:
+        cursor.close()
+
+
+def _local_schedule(r):
+    ti = _parse_time_any(r[2])
+    to_time = _parse_time_any(r[3])
+    if ti is None or to_time is None:
+        return None
+    # OrangeScheduleDaily does not keep the ORANGE tolerance columns; report the
+    # 0 that _extract_orange_schedule_with_tolerance uses for missing ones.
+    return {
+        "time_in": ti,
+        "time_out": to_time,
+        "next_day": _to_bool_next_day(r[4]),
+        "tol_in_before_min": 0,
+        "tol_in_after_min": 0,
+        "tol_out_before_min": 0,
+        "tol_out_after_min": 0,
+        "day_type": r[5],
+        "description": r[6],
+    }
+
+
+def load_local_schedules(conn_emp, pairs, schedule_cache, max_age_hours):
+    """
+    Fills schedule_cache from dbo.OrangeScheduleDaily for the pairs it holds, in
+    one query over the date range. A row fetched before its shift day ended can
+    still change in ORANGE, so it is used only while younger than max_age_hours.
+    Returns the number of pairs served locally.
+    """
+    if pairs is None or len(pairs) == 0:
+        return 0
+    wanted = set(zip(pairs["StaffNo"], pairs["ShiftDate"]))
+    cursor = conn_emp.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT StaffNo, CONVERT(varchar(10), ShiftDate, 23), CONVERT(varchar(8), TimeIn, 108),
+                   CONVERT(varchar(8), TimeOut, 108), NextDay, DayType, Description, FetchedAt
+            FROM dbo.OrangeScheduleDaily
+            WHERE ShiftDate BETWEEN %s AND %s
+              AND StaffNo IN (SELECT LTRIM(RTRIM(value)) FROM STRING_SPLIT(%s, ','))
+            """,
+            (pairs["ShiftDate"].min(), pairs["ShiftDate"].max(), ",".join(sorted(set(pairs["StaffNo"])))),
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    now = datetime.now()
+    hits = 0
+    for r in rows:
+        k = (str(r[0]).strip(), str(r[1]))
+        if k not in wanted:
+            continue
+        fetched_at = r[7]
+        day_ended = datetime.strptime(k[1], "%Y-%m-%d") + timedelta(days=1)
+        if fetched_at is None or (fetched_at < day_ended and now - fetched_at > timedelta(hours=max_age_hours)):
+            continue
+        schedule_cache[k] = _local_schedule(r)
+        hits += 1
+    return hits
+
+
+def write_back_schedules(conn_emp, date_str, results):
+    """
+    Upserts the batched ORANGE results for one date whose SourceHash differs
+    from the stored one into dbo.OrangeScheduleDaily, as the materializer does.
+    Unchanged rows only get FetchedAt refreshed, so they stop counting as stale.
+    """
+    from materialize_schedule_daily import fetch_stored_hashes, schedule_row, upsert_schedule_daily
+
+    shift_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    stored = fetch_stored_hashes(conn_emp, shift_date)
+    changed = []
+    unchanged = []
+    for staff, (cols, values) in results.items():
+        raw = {str(c).strip().lower(): v for c, v in zip(cols, values[0])} if values else {}
+        row = schedule_row(staff, shift_date, raw)
+        if stored.get(row["staffNo"]) == row["sourceHash"]:
+            unchanged.append(row["staffNo"])
+            continue
+        changed.append(row)
+    inserted, updated = upsert_schedule_daily(conn_emp, changed)
+    if unchanged:
+        cursor = conn_emp.cursor()
+        try:
+            cursor.execute(
+                """
+                UPDATE dbo.OrangeScheduleDaily
+                SET FetchedAt = GETDATE()
+                WHERE ShiftDate = %s
+                  AND StaffNo IN (SELECT LTRIM(RTRIM(value)) FROM STRING_SPLIT(%s, ','))
+                """,
+                (shift_date.isoformat(), ",".join(unchanged)),
+            )
+        finally:
+            cursor.close()
+    conn_emp.commit()
+    return inserted, updated
+
+
+def prefetch_orange_schedules(conn_orange, pairs, schedule_cache, chunk_size=500, conn_write_back=None):
+    """
+    Fills schedule_cache for every (StaffNo, ShiftDate) in pairs with a few
+    batched sp_it_get_day_type queries per date instead of one call per pair.
+    Pairs already in schedule_cache are not fetched. A chunk whose batched query
+    fails is left to the per-pair lookup. With conn_write_back the fetched
+    schedules are also upserted into dbo.OrangeScheduleDaily.
+    Returns the number of pairs cached.
+    """
+    cached = 0
+    for date_str, group in pairs.groupby("ShiftDate", sort=True):
+        staff_nos = [s for s in group["StaffNo"] if (s, date_str) not in schedule_cache]
+        for i in range(0, len(staff_nos), chunk_size):
+            chunk = staff_nos[i:i + chunk_size]
+            try:
+                results = read_orange_day_types_batch(conn_orange, chunk, date_str)
+            except Exception as e:
+                print(f"Batched ORANGE day type lookup failed for {date_str} ({len(chunk)} staff), falling back per staff: {type(e).__name__}: {e}")
+                continue
+            for staff, (cols, rows) in results.items():
+                schedule_cache[(staff, date_str)] = _extract_orange_schedule_with_tolerance(cols, rows)
+                cached += 1
+            if conn_write_back is not None:
+                try:
+                    write_back_schedules(conn_write_back, date_str, results)
+                except Exception as e:
+                    conn_write_back.rollback()
+                    print(f"OrangeScheduleDaily write-back failed for {date_str}: {type(e).__name__}: {e}")
+    return cached
+
+
 def determine_clock_event_orange(tr_dt, conn_orange, staff_no, schedule_cache, policy):
     curr_date = tr_dt.date()
     prev_date = curr_date - timedelta(days=1)
@@ -312,6 +496,109 @@ def determine_clock_event_orange(tr_dt, conn_orange, staff_no, schedule_cache, p
     return "Outside Range", curr_date, None, None
 
 
+SCHEDULE_FIELDS = [
+    ("ORANGE_DayType", "day_type"),
+    ("ORANGE_Desc", "description"),
+    ("ScheduledClockIn", None),
+    ("ScheduledClockOut", None),
+    ("NextDay", "next_day"),
+    ("TolInBeforeMin", "tol_in_before_min"),
+    ("TolInAfterMin", "tol_in_after_min"),
+    ("TolOutBeforeMin", "tol_out_before_min"),
+    ("TolOutAfterMin", "tol_out_after_min"),
+]
+
+
+def build_schedule_frame(pairs, conn_orange, schedule_cache, policy):
+    """
+    One row per (StaffNo, ShiftDate) pair with a schedule, indexed on
+    (StaffNo, ShiftDate as datetime64), carrying the SCHEDULE_FIELDS columns
+    and the policy clock windows. Pairs not yet in schedule_cache are read
+    from ORANGE one by one.
+    """
+    records = []
+    for staff, date_str in zip(pairs["StaffNo"], pairs["ShiftDate"]):
+        sched = _get_orange_schedule_cache(conn_orange, staff, date_str, schedule_cache)
+        if sched is None:
+            continue
+        w = _clock_windows_policy(datetime.strptime(date_str, "%Y-%m-%d").date(), sched, policy)
+        records.append(
+            [staff, date_str]
+            + [w["scheduled_in"] if col == "ScheduledClockIn" else w["scheduled_out"] if col == "ScheduledClockOut" else sched.get(key) for col, key in SCHEDULE_FIELDS]
+            + [w["in_start"], w["in_end"], w["out_start"], w["out_end"]]
+        )
+    columns = ["StaffNo", "ShiftDate"] + [col for col, _ in SCHEDULE_FIELDS] + ["InStart", "InEnd", "OutStart", "OutEnd"]
+    frame = pd.DataFrame(records, columns=columns)
+    for col in ("ScheduledClockIn", "ScheduledClockOut", "InStart", "InEnd", "OutStart", "OutEnd"):
+        frame[col] = pd.to_datetime(frame[col])
+    frame["ShiftDate"] = pd.to_datetime(frame["ShiftDate"])
+    return frame.set_index(["StaffNo", "ShiftDate"])
+
+
+def classify_scans_orange(df, schedule_frame):
+    """
+    Columnar determine_clock_event_orange over every scan in df: looks up the
+    previous and current day's schedule by (StaffNo, date) and applies the same
+    precedence (overnight Clock Out of D-1, Clock In, Clock Out, Outside Range).
+    Returns df with ClockEvent, ShiftDate and the SCHEDULE_FIELDS columns added.
+    """
+    staff = df["StaffNo"].astype(str).str.strip().to_numpy()
+    tr = pd.to_datetime(df["TrDateTime"]).to_numpy()
+    curr_date = pd.to_datetime(df["TrDateTime"]).dt.normalize().to_numpy()
+    prev_date = curr_date - np.timedelta64(1, "D")
+    prev = schedule_frame.reindex(pd.MultiIndex.from_arrays([staff, prev_date]))
+    curr = schedule_frame.reindex(pd.MultiIndex.from_arrays([staff, curr_date]))
+
+    def _within(frame, start, end):
+        return ((frame[start].to_numpy() <= tr) & (tr <= frame[end].to_numpy()))
+
+    prev_has = prev["ScheduledClockIn"].notna().to_numpy()
+    curr_has = curr["ScheduledClockIn"].notna().to_numpy()
+    prev_out = prev_has & (prev["NextDay"].to_numpy() == True) & _within(prev, "OutStart", "OutEnd")  # noqa: E712
+    curr_in = curr_has & _within(curr, "InStart", "InEnd")
+    curr_out = curr_has & _within(curr, "OutStart", "OutEnd")
+    use_prev = prev_out | (prev_has & ~curr_has)
+
+    out = df.reset_index(drop=True)
+    out["ClockEvent"] = np.select([prev_out, curr_in, curr_out], ["Clock Out", "Clock In", "Clock Out"], "Outside Range")
+    out["ShiftDate"] = pd.Series(np.where(use_prev, prev_date, curr_date)).dt.date
+    for col, _ in SCHEDULE_FIELDS:
+        values = np.where(use_prev, prev[col].to_numpy(), curr[col].to_numpy())
+        if values.dtype == object:
+            values = np.where(pd.isna(values), None, values)
+        out[col] = values
+    for col in ("NextDay", "TolInBeforeMin", "TolInAfterMin", "TolOutBeforeMin", "TolOutAfterMin"):
+        out[col] = out[col].infer_objects()
+    return out
+
+
+def classify_scans_orange_rowwise(df, conn_orange, schedule_cache, policy):
+    """Row-by-row counterpart of classify_scans_orange, calling determine_clock_event_orange per scan."""
+    results = []
+    for _, r in df.iterrows():
+        row_staff_no = str(r["StaffNo"]).strip()
+        tr_dt = r["TrDateTime"].to_pydatetime() if hasattr(r["TrDateTime"], "to_pydatetime") else r["TrDateTime"]
+        ce, shift_date, sched, w = determine_clock_event_orange(tr_dt, conn_orange, row_staff_no, schedule_cache, policy)
+        row_out = dict(r)
+        row_out["ClockEvent"] = ce
+        row_out["ShiftDate"] = shift_date
+        if sched is not None and w is not None:
+            row_out["ORANGE_DayType"] = sched.get("day_type")
+            row_out["ORANGE_Desc"] = sched.get("description")
+            row_out["ScheduledClockIn"] = w["scheduled_in"]
+            row_out["ScheduledClockOut"] = w["scheduled_out"]
+            row_out["NextDay"] = sched.get("next_day")
+            row_out["TolInBeforeMin"] = sched.get("tol_in_before_min")
+            row_out["TolInAfterMin"] = sched.get("tol_in_after_min")
+            row_out["TolOutBeforeMin"] = sched.get("tol_out_before_min")
+            row_out["TolOutAfterMin"] = sched.get("tol_out_after_min")
+        else:
+            for col, _ in SCHEDULE_FIELDS:
+                row_out[col] = None
+        results.append(row_out)
+    return pd.DataFrame(results)
+
+
 def _print_summary(df_out, staff_label, start_date, end_date, top_n):
     total_rows = int(len(df_out))
     unique_staff = int(df_out["StaffNo"].nunique()) if "StaffNo" in df_out.columns else 0
@@ -425,7 +712,186 @@ def _date_to_str(d_val):
         return None
 
 
-def insert_tbl_attendance_report(conn_emp, df_out, force_replace, start_dt, end_dt, staff_no=None):
+def _attendance_report_stage(df_scope, start_dt, end_dt):
+    """
+    Staging frame for tblAttendanceReport with the per-row writer's string
+    conversions, limited to scans inside [start_dt, end_dt]. Also returns how
+    many rows had no usable Transaction Date Time.
+    """
+    tr_dt = pd.to_datetime(df_scope["Transaction Date Time"], errors="coerce").dt.floor("s")
+    unparsed = int(tr_dt.isna().sum())
+    keep = tr_dt.notna() & (tr_dt >= start_dt) & (tr_dt <= end_dt)
+    df = df_scope[keep]
+    tr_dt = tr_dt[keep]
+
+    def _text(col):
+        return df[col].map(str) if col in df.columns else pd.Series("None", index=df.index)
+
+    def _fmt(col, fmt):
+        if col not in df.columns:
+            return pd.Series(None, index=df.index, dtype="object")
+        return pd.to_datetime(df[col], errors="coerce").dt.strftime(fmt)
+
+    clock_event = _text("ClockEvent")
+    stage = pd.DataFrame({
+        "Seq": np.arange(len(df)),
+        "CardNo": _text("CardNo"),
+        "Name": _text("Name"),
+        "Title": _text("Title"),
+        "Position": _text("Position"),
+        "Department": _text("Department"),
+        "CardType": _text("CardType"),
+        "Company": _text("Company"),
+        "StaffNo": df["StaffNo"].map(str),
+        "TrDateTime": tr_dt.dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        "TrDate": _fmt("Transaction Date", "%Y-%m-%d"),
+        "dtTransaction": _text("Transaction Status"),
+        "TrController": _text("TrController"),
+        "ClockEvent": clock_event,
+        "UnitNo": _text("UnitNo"),
+        "Processed": np.where(clock_event.isin(["Clock In", "Clock Out"]), 0, 1),
+        "ScheduledClockIn": _fmt("ScheduledClockIn", "%H:%M:%S"),
+        "ScheduledClockOut": _fmt("ScheduledClockOut", "%H:%M:%S"),
+    })
+    return stage, unparsed
+
+
+def _stage_json(stage):
+    return json.dumps(stage.astype(object).where(stage.notna(), None).to_dict("records"), default=str)
+
+
+def insert_tbl_attendance_report(conn_emp, df_out, force_replace, start_dt, end_dt, staff_no=None, chunk_rows=2000):
+    """
+    Staged writer for tblAttendanceReport keyed on (StaffNo, TrDateTime).
+    Each chunk goes through #BackdateAttendanceStage: existing rows are replaced
+    when force_replace is set and skipped otherwise, then the chunk is committed.
+    A chunk that fails is rolled back and counted as failed. Duplicate keys
+    inside one chunk count as skipped; as with the per-row writer, the last of
+    them is kept when force_replace is set and the first otherwise.
+    """
+    df_scope = df_out
+    if staff_no:
+        df_scope = df_scope[df_scope["StaffNo"].astype(str) == str(staff_no)]
+    stage, failed = _attendance_report_stage(df_scope, start_dt, end_dt)
+    inserted = 0
+    skipped = 0
+    error_samples = []
+    if len(stage) == 0:
+        return {"inserted": inserted, "skipped": skipped, "failed": failed, "error_samples": error_samples}
+
+    cursor = conn_emp.cursor()
+    cursor.execute(
+        """
+        IF OBJECT_ID('tempdb..#BackdateAttendanceStage') IS NOT NULL DROP TABLE #BackdateAttendanceStage;
+        CREATE TABLE #BackdateAttendanceStage (
+            Seq INT NOT NULL,
+            CardNo NVARCHAR(255) NULL,
+            Name NVARCHAR(255) NULL,
+            Title NVARCHAR(255) NULL,
+            Position NVARCHAR(255) NULL,
+            Department NVARCHAR(255) NULL,
+            CardType NVARCHAR(255) NULL,
+            Company NVARCHAR(255) NULL,
+            StaffNo NVARCHAR(50) NOT NULL,
+            TrDateTime DATETIME NOT NULL,
+            TrDate DATE NULL,
+            dtTransaction NVARCHAR(255) NULL,
+            TrController NVARCHAR(255) NULL,
+            ClockEvent NVARCHAR(50) NULL,
+            UnitNo NVARCHAR(50) NULL,
+            Processed BIT NOT NULL,
+            ScheduledClockIn NVARCHAR(8) NULL,
+            ScheduledClockOut NVARCHAR(8) NULL
+        );
+        """
+    )
+    conn_emp.commit()
+
+    for start in range(0, len(stage), chunk_rows):
+        chunk = stage.iloc[start:start + chunk_rows]
+        inserted_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+        try:
+            cursor.execute(
+                """
+                SET NOCOUNT ON;
+                TRUNCATE TABLE #BackdateAttendanceStage;
+                INSERT INTO #BackdateAttendanceStage
+                SELECT Seq, CardNo, Name, Title, Position, Department, CardType, Company, StaffNo,
+                       TrDateTime, TrDate, dtTransaction, TrController, ClockEvent, UnitNo, Processed,
+                       ScheduledClockIn, ScheduledClockOut
+                FROM OPENJSON(%s)
+                WITH (
+                    Seq INT '$.Seq',
+                    CardNo NVARCHAR(255) '$.CardNo',
+                    Name NVARCHAR(255) '$.Name',
+                    Title NVARCHAR(255) '$.Title',
+                    Position NVARCHAR(255) '$.Position',
+                    Department NVARCHAR(255) '$.Department',
+                    CardType NVARCHAR(255) '$.CardType',
+                    Company NVARCHAR(255) '$.Company',
+                    StaffNo NVARCHAR(50) '$.StaffNo',
+                    TrDateTime DATETIME '$.TrDateTime',
+                    TrDate DATE '$.TrDate',
+                    dtTransaction NVARCHAR(255) '$.dtTransaction',
+                    TrController NVARCHAR(255) '$.TrController',
+                    ClockEvent NVARCHAR(50) '$.ClockEvent',
+                    UnitNo NVARCHAR(50) '$.UnitNo',
+                    Processed BIT '$.Processed',
+                    ScheduledClockIn NVARCHAR(8) '$.ScheduledClockIn',
+                    ScheduledClockOut NVARCHAR(8) '$.ScheduledClockOut'
+                );
+
+                -- Like the per-row writer: the last duplicate wins when replacing, the first otherwise.
+                WITH dup AS (
+                    SELECT ROW_NUMBER() OVER (PARTITION BY StaffNo, TrDateTime ORDER BY CASE WHEN %s = 1 THEN -Seq ELSE Seq END) AS rn
+                    FROM #BackdateAttendanceStage
+                )
+                DELETE FROM dup WHERE rn > 1;
+
+                IF %s = 1
+                    DELETE t
+                    FROM dbo.tblAttendanceReport t
+                    INNER JOIN #BackdateAttendanceStage s ON t.StaffNo = s.StaffNo AND t.TrDateTime = s.TrDateTime;
+
+                INSERT INTO dbo.tblAttendanceReport (
+                    CardNo, Name, Title, Position, Department, CardType,
+                    Company, StaffNo, TrDateTime, TrDate,
+                    dtTransaction, TrController, ClockEvent, UnitNo, InsertedDate, Processed,
+                    ScheduledClockIn, ScheduledClockOut
+                )
+                SELECT s.CardNo, s.Name, s.Title, s.Position, s.Department, s.CardType,
+                       s.Company, s.StaffNo, s.TrDateTime, s.TrDate,
+                       s.dtTransaction, s.TrController, s.ClockEvent, s.UnitNo, %s, s.Processed,
+                       s.ScheduledClockIn, s.ScheduledClockOut
+                FROM #BackdateAttendanceStage s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM dbo.tblAttendanceReport t
+                    WHERE t.StaffNo = s.StaffNo AND t.TrDateTime = s.TrDateTime
+                );
+
+                SELECT @@ROWCOUNT;
+                """,
+                (_stage_json(chunk), 1 if force_replace else 0, 1 if force_replace else 0, inserted_date),
+            )
+            row = cursor.fetchone()
+            conn_emp.commit()
+        except Exception as e:
+            conn_emp.rollback()
+            failed += len(chunk)
+            if len(error_samples) < 5:
+                error_samples.append(f"{type(e).__name__}: {str(e)}")
+            continue
+        chunk_inserted = int(row[0] or 0) if row else 0
+        inserted += chunk_inserted
+        skipped += len(chunk) - chunk_inserted
+
+    cursor.execute("DROP TABLE #BackdateAttendanceStage")
+    conn_emp.commit()
+    cursor.close()
+    return {"inserted": inserted, "skipped": skipped, "failed": failed, "error_samples": error_samples}
+
+
+def insert_tbl_attendance_report_rowwise(conn_emp, df_out, force_replace, start_dt, end_dt, staff_no=None):
     cursor = conn_emp.cursor()
     inserted = 0
     skipped = 0
@@ -556,29 +1022,169 @@ def _is_duplicate_insert_error(e):
     )
 
 
-def insert_mcg_from_tbl_attendance_report(conn_emp, conn_orange, force_replace, start_dt, end_dt, staff_no=None):
-    cursor_emp = conn_emp.cursor()
-    cursor_orange = conn_orange.cursor()
-    cursor_update = conn_emp.cursor()
-
-    start_str = start_dt.strftime("%Y-%m-%d %H:%M:%S")
-    end_str = end_dt.strftime("%Y-%m-%d %H:%M:%S")
-
+def _pending_mcg_rows(cursor_emp, start_dt, end_dt, staff_no=None):
     q = """
         SELECT StaffNo, TrDateTime, TrDate, ClockEvent, UnitNo
         FROM dbo.tblAttendanceReport
         WHERE Processed = 0
           AND TrDateTime >= %s AND TrDateTime <= %s
     """
-    params = [start_str, end_str]
+    params = [start_dt.strftime("%Y-%m-%d %H:%M:%S"), end_dt.strftime("%Y-%m-%d %H:%M:%S")]
     if staff_no:
         q += " AND StaffNo = %s"
         params.append(str(staff_no))
     else:
         q += " AND StaffNo LIKE 'MTI%'"
-
     cursor_emp.execute(q, tuple(params))
-    rows = cursor_emp.fetchall()
+    return cursor_emp.fetchall()
+
+
+def insert_mcg_from_tbl_attendance_report(conn_emp, conn_orange, force_replace, start_dt, end_dt, staff_no=None, chunk_rows=2000):
+    """
+    Batched push of pending Clock In/Out rows to mcg_clocking_tbl. Per chunk the
+    keys are staged on ORANGE, anti-joined against existing
+    (finger_print_id, date_time, function_key) rows in one statement, the rest
+    inserted, and every handled row marked Processed with one UPDATE. Keys that
+    already exist (or repeat inside the chunk) count as skipped_duplicate; a
+    chunk whose insert or Processed UPDATE fails is rolled back and counted as
+    failed.
+    """
+    cursor_emp = conn_emp.cursor()
+    rows = _pending_mcg_rows(cursor_emp, start_dt, end_dt, staff_no=staff_no)
+    cursor_emp.close()
+
+    inserted = 0
+    skipped = 0
+    skipped_duplicate = 0
+    failed = 0
+    updated = 0
+    error_samples = []
+
+    staged = []
+    for r in rows:
+        clock_event = str(r[3])
+        if clock_event == "Clock In":
+            function_key = 0
+        elif clock_event == "Clock Out":
+            function_key = 1
+        else:
+            skipped += 1
+            continue
+        tr_dt_py = r[1].to_pydatetime() if hasattr(r[1], "to_pydatetime") else r[1]
+        staged.append({
+            "Seq": len(staged),
+            "terminal_id": r[4],
+            "finger_print_id": str(r[0]),
+            "date_log": tr_dt_py.strftime("%Y-%m-%d 00:00:00"),
+            "time_log": tr_dt_py.strftime("%H:%M"),
+            "function_key": function_key,
+            "date_time": tr_dt_py.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+    for start in range(0, len(staged), chunk_rows):
+        chunk = staged[start:start + chunk_rows]
+        cursor_orange = conn_orange.cursor()
+        try:
+            cursor_orange.execute(
+                """
+                SET NOCOUNT ON;
+                IF OBJECT_ID('tempdb..#BackdateMcgStage') IS NOT NULL DROP TABLE #BackdateMcgStage;
+                SELECT Seq, terminal_id, finger_print_id, date_log, time_log, function_key, date_time
+                INTO #BackdateMcgStage
+                FROM OPENJSON(%s)
+                WITH (
+                    Seq INT '$.Seq',
+                    terminal_id NVARCHAR(50) '$.terminal_id',
+                    finger_print_id NVARCHAR(50) '$.finger_print_id',
+                    date_log NVARCHAR(19) '$.date_log',
+                    time_log NVARCHAR(5) '$.time_log',
+                    function_key INT '$.function_key',
+                    date_time NVARCHAR(19) '$.date_time'
+                );
+
+                WITH first_key AS (
+                    SELECT ROW_NUMBER() OVER (PARTITION BY finger_print_id, date_time, function_key ORDER BY Seq) AS rn
+                    FROM #BackdateMcgStage
+                )
+                DELETE FROM first_key WHERE rn > 1;
+
+                INSERT INTO dbo.mcg_clocking_tbl (
+                    terminal_id, finger_print_id, date_log, time_log, function_key,
+                    date_time, status_clock, insert_date
+                )
+                SELECT s.terminal_id, s.finger_print_id, s.date_log, s.time_log, s.function_key, s.date_time, 'NEW', %s
+                FROM #BackdateMcgStage s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM dbo.mcg_clocking_tbl m
+                    WHERE m.finger_print_id = s.finger_print_id AND m.date_time = s.date_time AND m.function_key = s.function_key
+                )
+                ORDER BY s.Seq;
+
+                SELECT @@ROWCOUNT AS inserted;
+                DROP TABLE #BackdateMcgStage;
+                """,
+                (json.dumps(chunk, default=str), datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            row = cursor_orange.fetchone()
+            conn_orange.commit()
+        except Exception as e:
+            conn_orange.rollback()
+            failed += len(chunk)
+            if len(error_samples) < 5:
+                error_samples.append(f"{type(e).__name__}: {str(e)} | chunk of {len(chunk)} from staff={chunk[0]['finger_print_id']} dt={chunk[0]['date_time']}")
+            continue
+        finally:
+            cursor_orange.close()
+
+        chunk_inserted = int(row[0] or 0) if row else 0
+        inserted += chunk_inserted
+        skipped_duplicate += len(chunk) - chunk_inserted
+
+        keys = json.dumps([{"StaffNo": x["finger_print_id"], "TrDateTime": x["date_time"]} for x in chunk])
+        cursor_update = conn_emp.cursor()
+        try:
+            cursor_update.execute(
+                """
+                UPDATE t
+                SET Processed = 1
+                FROM dbo.tblAttendanceReport t
+                INNER JOIN (
+                    SELECT DISTINCT StaffNo, TrDateTime
+                    FROM OPENJSON(%s) WITH (StaffNo NVARCHAR(50) '$.StaffNo', TrDateTime DATETIME '$.TrDateTime')
+                ) k ON t.StaffNo = k.StaffNo AND t.TrDateTime = k.TrDateTime
+                """,
+                (keys,),
+            )
+            chunk_updated = cursor_update.rowcount if cursor_update.rowcount is not None else len(chunk)
+            conn_emp.commit()
+        except Exception as e:
+            # The chunk is already in mcg_clocking_tbl; its rows stay Processed = 0 and a rerun skips them as duplicates.
+            conn_emp.rollback()
+            failed += len(chunk)
+            if len(error_samples) < 5:
+                error_samples.append(f"{type(e).__name__}: {str(e)} | Processed update of chunk of {len(chunk)} from staff={chunk[0]['finger_print_id']} dt={chunk[0]['date_time']}")
+            continue
+        finally:
+            cursor_update.close()
+        updated += chunk_updated
+
+    return {
+        "inserted": inserted,
+        "skipped": skipped,
+        "skipped_duplicate": skipped_duplicate,
+        "failed": failed,
+        "updated": updated,
+        "rows_scanned": len(rows),
+        "error_samples": error_samples,
+    }
+
+
+def insert_mcg_from_tbl_attendance_report_rowwise(conn_emp, conn_orange, force_replace, start_dt, end_dt, staff_no=None):
+    cursor_emp = conn_emp.cursor()
+    cursor_orange = conn_orange.cursor()
+    cursor_update = conn_emp.cursor()
+
+    rows = _pending_mcg_rows(cursor_emp, start_dt, end_dt, staff_no=staff_no)
 
     inserted = 0
     skipped = 0
@@ -672,7 +1278,6 @@ def insert_mcg_from_tbl_attendance_report(conn_emp, conn_orange, force_replace,
     }
 
 
-
 def main():
     args = parse_arguments()
     staff_no = args.staff_no.strip() if args.staff_no else None
@@ -708,37 +1313,24 @@ def main():
         df.sort_values(by=["StaffNo", "TrDateTime"], inplace=True)
 
         schedule_cache = {}
-        results = []
-        for _, r in df.iterrows():
-            row_staff_no = str(r["StaffNo"]).strip()
-            tr_dt = r["TrDateTime"].to_pydatetime() if hasattr(r["TrDateTime"], "to_pydatetime") else r["TrDateTime"]
-            ce, shift_date, sched, w = determine_clock_event_orange(tr_dt, conn_orange, row_staff_no, schedule_cache, policy)
-            row_out = dict(r)
-            row_out["ClockEvent"] = ce
-            row_out["ShiftDate"] = shift_date
-            if sched is not None and w is not None:
-                row_out["ORANGE_DayType"] = sched.get("day_type")
-                row_out["ORANGE_Desc"] = sched.get("description")
-                row_out["ScheduledClockIn"] = w["scheduled_in"]
-                row_out["ScheduledClockOut"] = w["scheduled_out"]
-                row_out["NextDay"] = sched.get("next_day")
-                row_out["TolInBeforeMin"] = sched.get("tol_in_before_min")
-                row_out["TolInAfterMin"] = sched.get("tol_in_after_min")
-                row_out["TolOutBeforeMin"] = sched.get("tol_out_before_min")
-                row_out["TolOutAfterMin"] = sched.get("tol_out_after_min")
-            else:
-                row_out["ORANGE_DayType"] = None
-                row_out["ORANGE_Desc"] = None
-                row_out["ScheduledClockIn"] = None
-                row_out["ScheduledClockOut"] = None
-                row_out["NextDay"] = None
-                row_out["TolInBeforeMin"] = None
-                row_out["TolInAfterMin"] = None
-                row_out["TolOutBeforeMin"] = None
-                row_out["TolOutAfterMin"] = None
-            results.append(row_out)
-
-        df_out = pd.DataFrame(results)
+        pairs = schedule_pairs_for_scans(df)
+        conn_write_back = None
+        if args.local_schedules:
+            from materialize_schedule_daily import ensure_orange_schedule_daily_table
+
+            conn_emp = connect_employee_db(config)
+            ensure_orange_schedule_daily_table(conn_emp)
+            local_hits = load_local_schedules(conn_emp, pairs, schedule_cache, args.local_max_age_hours)
+            print(f"OrangeScheduleDaily served {local_hits}/{len(pairs)} staff/date pairs.")
+            if args.write_back:
+                conn_write_back = conn_emp
+        cached = prefetch_orange_schedules(conn_orange, pairs, schedule_cache, conn_write_back=conn_write_back)
+        print(f"ORANGE schedules prefetched: {cached}/{len(pairs)} staff/date pairs.")
+        if args.row_classifier:
+            df_out = classify_scans_orange_rowwise(df, conn_orange, schedule_cache, policy)
+        else:
+            schedule_frame = build_schedule_frame(pairs, conn_orange, schedule_cache, policy)
+            df_out = classify_scans_orange(df, schedule_frame)
         df_out = df_out.rename(
             columns={
                 "TrDateTime": "Transaction Date Time",
@@ -754,11 +1346,14 @@ def main():
         print(f"Clock In/Out: {len(df_out[df_out['ClockEvent'].isin(['Clock In','Clock Out'])])}")
         _print_summary(df_out, staff_label, start_date, end_date, args.report_top)
 
-        if insert_att or insert_mcg:
+        if (insert_att or insert_mcg) and conn_emp is None:
             conn_emp = connect_employee_db(config)
 
         if insert_att:
-            res = insert_tbl_attendance_report(conn_emp, df_out, force_replace=force_replace, start_dt=start_dt, end_dt=end_dt, staff_no=staff_no)
+            if args.row_writer:
+                res = insert_tbl_attendance_report_rowwise(conn_emp, df_out, force_replace=force_replace, start_dt=start_dt, end_dt=end_dt, staff_no=staff_no)
+            else:
+                res = insert_tbl_attendance_report(conn_emp, df_out, force_replace=force_replace, start_dt=start_dt, end_dt=end_dt, staff_no=staff_no, chunk_rows=max(1, args.chunk_rows))
             print("Insert tblAttendanceReport")
             print(f"  inserted: {res['inserted']}")
             print(f"  skipped: {res['skipped']}")
@@ -769,7 +1364,10 @@ def main():
                     print(f"    {s}")
 
         if insert_mcg:
-            res = insert_mcg_from_tbl_attendance_report(conn_emp, conn_orange, force_replace=force_replace, start_dt=start_dt, end_dt=end_dt, staff_no=staff_no)
+            if args.row_writer:
+                res = insert_mcg_from_tbl_attendance_report_rowwise(conn_emp, conn_orange, force_replace=force_replace, start_dt=start_dt, end_dt=end_dt, staff_no=staff_no)
+            else:
+                res = insert_mcg_from_tbl_attendance_report(conn_emp, conn_orange, force_replace=force_replace, start_dt=start_dt, end_dt=end_dt, staff_no=staff_no, chunk_rows=max(1, args.chunk_rows))
             print("Insert mcg_clocking_tbl")
             print(f"  rows_scanned: {res['rows_scanned']}")
             print(f"  inserted: {res['inserted']}")
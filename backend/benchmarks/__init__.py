@@ -0,0 +1,12 @@
+"""
+Benchmarks for the attendance pipeline hot paths.
+
+synthetic.py generates employees, daily schedules (including overnight
+next_day shifts), ScheduleChangeLog entries and scan streams at any headcount;
+run_benchmarks.py times the classification, missing clock-out, FILO, schedule
+hash and writer row-building code against them with no database.
+
+    cd backend
+    python -m benchmarks.run_benchmarks --scales 1,10,50 --save-baseline bench_baseline.json
+    python -m benchmarks.run_benchmarks --scales 1,10,50 --compare bench_baseline.json
+"""
@@ -0,0 +1,228 @@
+"""
+Times the attendance pipeline hot paths on synthetic data at several multiples
+of the current headcount and saves or compares a JSON baseline.
+
+Run from backend/:
+
+    python -m benchmarks.run_benchmarks --scales 1,10,50 --save-baseline bench_baseline.json
+    python -m benchmarks.run_benchmarks --compare bench_baseline.json
+
+Row-wise benchmarks (the per-row classifier and writers) grow with per-row
+Python/DB-call overhead and are skipped above --max-rowwise-rows.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import attendance_report_modv8_1 as att  # noqa: E402
+import sync_schedule  # noqa: E402
+from benchmarks.synthetic import generate_dataset  # noqa: E402
+
+POLICY = {
+    'clock_in_early_hours': 5,
+    'clock_in_late_minutes': 60,
+    'clock_out_early_minutes': 60,
+    'clock_out_late_hours': 8,
+}
+REPORT_COLUMNS = {'TrDateTime': 'Transaction Date Time', 'TrDate': 'Transaction Date', 'dtTransaction': 'Transaction Status'}
+
+
+class StandInCursor:
+    """Accepts the writers' statements without a database: COUNT probes see no rows."""
+
+    def __init__(self):
+        self.statements = 0
+        self._next = None
+
+    def execute(self, sql, params=None):
+        self.statements += 1
+        self._next = (0,) if 'COUNT(' in sql else None
+
+    def fetchone(self):
+        return self._next
+
+
+def lock_cache_for(dataset):
+    lock_cache = {}
+    staff_nos, span_start, span_end = att._lock_span(dataset['transactions'])
+    att._fill_lock_cache(lock_cache, staff_nos, span_start, span_end, dataset['schedules'], dataset['employees'])
+    return lock_cache
+
+
+def _classify(dataset, lock_cache, vectorized):
+    return att.apply_clock_event_logic(
+        dataset['transactions'].copy(), None, None, None, POLICY,
+        lock_cache=dict(lock_cache), dry_run=True, vectorized=vectorized
+    )
+
+
+def _filo(df):
+    for _, group in df.groupby(['StaffNo', 'TrDate'], sort=False):
+        att.filo_clock_events(group)
+
+
+def _schedule_hashes(employees):
+    for r in employees.itertuples(index=False):
+        sync_schedule.compute_schedule_hash(
+            r.employee_name, r.gender, r.division, r.department, r.section,
+            r.supervisor_id, r.supervisor_name, r.position_title, r.grade_interval, r.phone,
+            r.day_type, r.description, r.time_in, r.time_out, r.next_day,
+        )
+
+
+def _attendance_report_rowwise(df_report):
+    cursor = StandInCursor()
+    for _, row in df_report.iterrows():
+        att.insert_data_to_tbl_attendance_report(row, cursor)
+
+
+def _mcg_rowwise(rows):
+    cursor = StandInCursor()
+    update_cursor = StandInCursor()
+    for row in rows:
+        att.insert_data_to_mcg_clocking_tbl(row, cursor, update_cursor)
+
+
+def build_benchmarks(dataset):
+    """(name, rows, callable, rowwise) for every benchmark, with shared inputs prepared untimed."""
+    lock_cache = lock_cache_for(dataset)
+    df_processed_all = _classify(dataset, lock_cache, vectorized=True)
+    df_processed = df_processed_all[df_processed_all['ClockEvent'] != 'No Shift Data']
+    df_report = df_processed_all.rename(columns=REPORT_COLUMNS)
+    pending = df_report[df_report['ClockEvent'].isin(['Clock In', 'Clock Out'])]
+    pending_rows = pending.assign(ID=np.arange(len(pending))).to_dict('records')
+    n_tx = len(dataset['transactions'])
+    staff_nos, span_start, span_end = att._lock_span(dataset['transactions'])
+
+    return [
+        ('prefetch.fill_lock_cache', n_tx,
+         lambda: att._fill_lock_cache({}, staff_nos, span_start, span_end, dataset['schedules'], dataset['employees']), False),
+        ('apply_clock_event_logic.vectorized', n_tx, lambda: _classify(dataset, lock_cache, vectorized=True), False),
+        ('apply_clock_event_logic.row', n_tx, lambda: _classify(dataset, lock_cache, vectorized=False), True),
+        ('generate_missing_clock_outs', len(df_processed),
+         lambda: att.generate_missing_clock_outs(df_processed, dataset['end_datetime'], POLICY), False),
+        ('filo_clock_events', n_tx, lambda: _filo(dataset['transactions']), False),
+        ('sync_schedule.compute_schedule_hash', len(dataset['employees']), lambda: _schedule_hashes(dataset['employees']), False),
+        ('writer.attendance_report_stage_rows', len(df_report),
+         lambda: att._to_json_records(att._attendance_report_stage_rows(df_report)), False),
+        ('writer.attendance_report_rowwise', len(df_report), lambda: _attendance_report_rowwise(df_report), True),
+        ('writer.mcg_stage_rows', len(pending_rows), lambda: att._mcg_stage_rows(pending_rows), False),
+        ('writer.mcg_rowwise', len(pending_rows), lambda: _mcg_rowwise(pending_rows), True),
+    ]
+
+
+def time_call(fn, repeat):
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(scales, base_headcount, days, repeat, max_rowwise_rows, only=None, seed=42):
+    results = {}
+    for scale in scales:
+        label = f'{scale:g}x'
+        headcount = max(1, int(round(base_headcount * scale)))
+        dataset = generate_dataset(headcount, days=days, seed=seed)
+        print(f"[{label}] headcount={headcount} transactions={len(dataset['transactions'])} "
+              f"schedules={len(dataset['schedules'])} changelog={len(dataset['changelog'])}")
+        results[label] = {}
+        for name, rows, fn, rowwise in build_benchmarks(dataset):
+            if only and not any(name.startswith(o) for o in only):
+                continue
+            if rowwise and rows > max_rowwise_rows:
+                results[label][name] = {'rows': rows, 'skipped': f'rows > {max_rowwise_rows}'}
+                print(f"  {name:<40} skipped ({rows} rows)")
+                continue
+            seconds = time_call(fn, repeat)
+            results[label][name] = {
+                'rows': rows,
+                'seconds': round(seconds, 6),
+                'rowsPerSec': int(rows / seconds) if seconds > 0 else None,
+            }
+            print(f"  {name:<40} {seconds * 1000:10.1f} ms  {rows:>8} rows")
+    return results
+
+
+def compare(results, baseline, tolerance, noise_floor):
+    """Prints current vs baseline per benchmark; returns the regressions."""
+    regressions = []
+    base_results = baseline.get('results', {})
+    for label, benches in results.items():
+        for name, cur in benches.items():
+            base = base_results.get(label, {}).get(name)
+            if not base or 'seconds' not in base or 'seconds' not in cur:
+                continue
+            ratio = cur['seconds'] / base['seconds'] if base['seconds'] > 0 else float('inf')
+            regressed = ratio > 1.0 + tolerance and cur['seconds'] - base['seconds'] > noise_floor
+            flag = 'REGRESSION' if regressed else ''
+            print(f"[{label}] {name:<40} {base['seconds'] * 1000:10.1f} -> {cur['seconds'] * 1000:10.1f} ms  x{ratio:5.2f} {flag}")
+            if regressed:
+                regressions.append({'scale': label, 'name': name, 'baseline': base['seconds'], 'current': cur['seconds'], 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark the attendance pipeline hot paths on synthetic data.')
+    parser.add_argument('--scales', default='1,10,50', help='Comma-separated multiples of --base-headcount (default 1,10,50)')
+    parser.add_argument('--base-headcount', type=int, default=int(os.getenv('ATTENDANCE_BENCH_HEADCOUNT') or 400),
+                        help='Headcount at 1x (default ATTENDANCE_BENCH_HEADCOUNT or 400)')
+    parser.add_argument('--days', type=int, default=2, help='Scan days per dataset (default 2)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the fastest is kept (default 3)')
+    parser.add_argument('--max-rowwise-rows', type=int, default=50000, help='Skip row-wise benchmarks above this many rows (default 50000)')
+    parser.add_argument('--only', help='Comma-separated benchmark name prefixes to run')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save-baseline', help='Write the results to this JSON baseline file')
+    parser.add_argument('--compare', help='Compare the results against this JSON baseline file; exits 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown ratio before flagging a regression (default 0.25)')
+    parser.add_argument('--noise-floor-ms', type=float, default=5.0, help='Ignore slowdowns smaller than this (default 5ms)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    scales = [float(s) for s in args.scales.split(',') if s.strip()]
+    only = [o.strip() for o in args.only.split(',')] if args.only else None
+    results = run(scales, args.base_headcount, args.days, args.repeat, args.max_rowwise_rows, only=only, seed=args.seed)
+    document = {
+        'meta': {
+            'createdAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'baseHeadcount': args.base_headcount,
+            'days': args.days,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as fh:
+            json.dump(document, fh, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.tolerance, args.noise_floor_ms / 1000.0)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.compare}")
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
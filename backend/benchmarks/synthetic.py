@@ -0,0 +1,182 @@
+"""
+Synthetic data for the attendance benchmarks.
+
+generate_dataset() returns frames shaped like the tables the pipeline reads:
+MTIUsers (employees), OrangeScheduleDaily (schedules), ScheduleChangeLog
+(changelog) and the tblTransaction/CardDB join (transactions). Everything is
+derived from one seed, so a given headcount always produces the same data.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# (TimeIn, TimeOut, NextDay, DayType, Description); None times are days off.
+SHIFT_PATTERNS = [
+    ('07:00:00', '15:00:00', 0, 'WD', 'Shift 1'),
+    ('07:00:00', '17:00:00', 0, 'WD', 'Day Shift'),
+    ('08:00:00', '17:00:00', 0, 'WD', 'Office Hour'),
+    ('15:00:00', '23:00:00', 0, 'WD', 'Shift 2'),
+    ('23:00:00', '07:00:00', 1, 'WD', 'Shift 3'),
+    ('19:00:00', '07:00:00', 1, 'WD', 'Night 12H'),
+    (None, None, 0, 'OFF', 'Day Off'),
+]
+PATTERN_WEIGHTS = [0.25, 0.2, 0.15, 0.12, 0.12, 0.08, 0.08]
+OFF_PATTERN = len(SHIFT_PATTERNS) - 1
+
+DEPARTMENTS = ['PYRITE PLANT', 'CHLORIDE PLANT', 'OCCUPATIONAL HEALTH & SAFETY', 'MINING OPERATION', 'MAINTENANCE', 'HUMAN RESOURCES']
+POSITIONS = ['STAFF', 'Non Staff', 'Operator', 'Supervisor']
+CONTROLLERS = [f'FR-Gate {i:02d}-{5600 + i}' for i in range(1, 13)]
+COMPANIES = {'MTI': 'Merdeka Tsingshan Indonesia', '9038': 'Cahaya Berkah Morowali'}
+
+
+def _time_offsets(values):
+    """'HH:MM:SS' strings (or None) to timedelta64 offsets from midnight (NaT for None)."""
+    return pd.to_timedelta(pd.Series(values, dtype='object')).to_numpy()
+
+
+def generate_dataset(headcount, days=2, start_date=date(2026, 6, 1), seed=42, contractor_share=0.15, change_share=0.05):
+    """
+    Builds a dataset for headcount employees over days scan days starting at
+    start_date. Schedules cover D-1..D+1 around the scan window so overnight
+    shifts that started the day before are resolvable. A contractor_share of the
+    staff get the 9038 prefix; change_share of them get ScheduleChangeLog rows.
+    """
+    rng = np.random.default_rng(seed)
+    n_contract = int(headcount * contractor_share)
+    staff_nos = [f'MTI{240000 + i:06d}' for i in range(headcount - n_contract)]
+    staff_nos += [f'9038{i:05d}' for i in range(n_contract)]
+    staff = np.array(staff_nos, dtype=object)
+    card_nos = np.array([str(3000000000 + i * 7919) for i in range(headcount)], dtype=object)
+    departments = np.array(DEPARTMENTS, dtype=object)[rng.integers(0, len(DEPARTMENTS), headcount)]
+    positions = np.array(POSITIONS, dtype=object)[rng.integers(0, len(POSITIONS), headcount)]
+    companies = np.array([COMPANIES['9038'] if s.startswith('9038') else COMPANIES['MTI'] for s in staff_nos], dtype=object)
+
+    # ---------------------------------------------------------------- schedules
+    base_pattern = rng.choice(len(SHIFT_PATTERNS) - 1, size=headcount, p=np.array(PATTERN_WEIGHTS[:-1]) / sum(PATTERN_WEIGHTS[:-1]))
+    shift_dates = [start_date + timedelta(days=d) for d in range(-1, days + 1)]
+    n_dates = len(shift_dates)
+    pattern = np.repeat(base_pattern[:, None], n_dates, axis=1)
+    # A rotating third of the workforce changes shift every day; some days are off.
+    rotating = rng.random(headcount) < 0.33
+    pattern[rotating] = rng.integers(0, len(SHIFT_PATTERNS) - 1, size=(int(rotating.sum()), n_dates))
+    pattern[rng.random((headcount, n_dates)) < 0.08] = OFF_PATTERN
+
+    staff_idx = np.repeat(np.arange(headcount), n_dates)
+    date_idx = np.tile(np.arange(n_dates), headcount)
+    pat = pattern.ravel()
+    pattern_rows = [SHIFT_PATTERNS[p] for p in pat]
+    schedules = pd.DataFrame({
+        'StaffNo': staff[staff_idx],
+        'ShiftDate': [shift_dates[d].strftime('%Y-%m-%d') for d in date_idx],
+        'TimeIn': [p[0] for p in pattern_rows],
+        'TimeOut': [p[1] for p in pattern_rows],
+        'NextDay': [p[2] for p in pattern_rows],
+        'DayType': [p[3] for p in pattern_rows],
+        'Description': [p[4] for p in pattern_rows],
+    })
+
+    employees = pd.DataFrame({
+        'employee_id': staff,
+        'employee_name': [f'EMPLOYEE {i}' for i in range(headcount)],
+        'gender': np.where(rng.random(headcount) < 0.8, 'M', 'F'),
+        'division': 'OPERATION',
+        'department': departments,
+        'section': departments,
+        'supervisor_id': staff[rng.integers(0, headcount, headcount)],
+        'supervisor_name': 'SUPERVISOR',
+        'position_title': positions,
+        'grade_interval': 'G3',
+        'phone': [f'0812{i:08d}' for i in range(headcount)],
+        'day_type': [SHIFT_PATTERNS[p][3] for p in base_pattern],
+        'description': [SHIFT_PATTERNS[p][4] for p in base_pattern],
+        'time_in': [SHIFT_PATTERNS[p][0] for p in base_pattern],
+        'time_out': [SHIFT_PATTERNS[p][1] for p in base_pattern],
+        'next_day': [SHIFT_PATTERNS[p][2] for p in base_pattern],
+    })
+
+    # ---------------------------------------------------------------- changelog
+    window_start = np.datetime64(datetime.combine(shift_dates[0], datetime.min.time()))
+    window_seconds = n_dates * 86400
+    changed = np.flatnonzero(rng.random(headcount) < change_share)
+    n_changes = rng.integers(1, 4, size=len(changed))
+    change_staff = np.repeat(changed, n_changes)
+    change_pat = rng.integers(0, len(SHIFT_PATTERNS) - 1, size=len(change_staff))
+    changelog = pd.DataFrame({
+        'StaffNo': staff[change_staff],
+        'ChangedAt': window_start + rng.integers(0, window_seconds, size=len(change_staff)).astype('timedelta64[s]'),
+        'TimeInNew': [SHIFT_PATTERNS[p][0] for p in change_pat],
+        'TimeOutNew': [SHIFT_PATTERNS[p][1] for p in change_pat],
+        'NextDayNew': [SHIFT_PATTERNS[p][2] for p in change_pat],
+    }).sort_values(['StaffNo', 'ChangedAt'], kind='stable').reset_index(drop=True)
+
+    # ---------------------------------------------------------------- scans
+    working = pat != OFF_PATTERN
+    w_staff = staff_idx[working]
+    w_date = np.array([np.datetime64(d) for d in shift_dates], dtype='datetime64[s]')[date_idx[working]]
+    w_in = w_date + _time_offsets(schedules['TimeIn'].to_numpy()[working]).astype('timedelta64[s]')
+    w_out = w_date + _time_offsets(schedules['TimeOut'].to_numpy()[working]).astype('timedelta64[s]')
+    w_out = w_out + (schedules['NextDay'].to_numpy()[working] == 1).astype('timedelta64[D]').astype('timedelta64[s]')
+    n_shifts = len(w_staff)
+
+    def _jitter(lo_min, hi_min, size):
+        return rng.integers(lo_min * 60, hi_min * 60, size=size).astype('timedelta64[s]')
+
+    scan_staff = [w_staff]
+    scan_time = [w_in + _jitter(-60, 15, n_shifts)]
+    has_out = rng.random(n_shifts) < 0.93
+    scan_staff.append(w_staff[has_out])
+    scan_time.append(w_out[has_out] + _jitter(-5, 90, int(has_out.sum())))
+    dup = rng.random(n_shifts) < 0.1
+    scan_staff.append(w_staff[dup])
+    scan_time.append(scan_time[0][dup] + rng.integers(2, 40, size=int(dup.sum())).astype('timedelta64[s]'))
+    n_mid = rng.poisson(0.7, size=n_shifts)
+    mid_idx = np.repeat(np.arange(n_shifts), n_mid)
+    span = (w_out - w_in)[mid_idx].astype('int64')
+    scan_staff.append(w_staff[mid_idx])
+    scan_time.append(w_in[mid_idx] + (rng.random(len(mid_idx)) * span).astype('int64').astype('timedelta64[s]'))
+    # Stray scans on days off end up as No Shift Data / Outside Range.
+    off_idx = np.flatnonzero(pat == OFF_PATTERN)
+    off_idx = off_idx[rng.random(len(off_idx)) < 0.3]
+    off_dates = np.array([np.datetime64(d) for d in shift_dates], dtype='datetime64[s]')[date_idx[off_idx]]
+    scan_staff.append(staff_idx[off_idx])
+    scan_time.append(off_dates + _jitter(6 * 60, 20 * 60, len(off_idx)))
+
+    s_idx = np.concatenate(scan_staff)
+    s_time = np.concatenate(scan_time)
+    window_lo = np.datetime64(datetime.combine(start_date, datetime.min.time()))
+    window_hi = window_lo + np.timedelta64(days * 86400, 's')
+    keep = (s_time >= window_lo) & (s_time < window_hi)
+    s_idx = s_idx[keep]
+    s_time = s_time[keep]
+    n_scans = len(s_idx)
+
+    tr_datetime = pd.to_datetime(s_time)
+    controller = rng.integers(0, len(CONTROLLERS), size=n_scans)
+    transactions = pd.DataFrame({
+        'CardNo': card_nos[s_idx],
+        'Name': employees['employee_name'].to_numpy()[s_idx],
+        'Title': 'Mr',
+        'Position': positions[s_idx],
+        'Department': departments[s_idx],
+        'CardType': 'Normal',
+        'Company': companies[s_idx],
+        'StaffNo': staff[s_idx],
+        'TrDateTime': tr_datetime,
+        'TrDate': tr_datetime.date,
+        'dtTransaction': 'Valid Entry Access',
+        'TrController': np.array(CONTROLLERS, dtype=object)[controller],
+        'UnitNo': [f'{c + 1:04d}' for c in controller],
+        'InsertDate': tr_datetime + pd.Timedelta(minutes=10),
+    })
+    transactions = transactions.sort_values(by=['TrDateTime', 'CardNo'], kind='stable').reset_index(drop=True)
+
+    return {
+        'headcount': headcount,
+        'start_date': start_date,
+        'end_datetime': datetime.combine(start_date + timedelta(days=days), datetime.min.time()) - timedelta(seconds=1),
+        'employees': employees,
+        'schedules': schedules,
+        'changelog': changelog,
+        'transactions': transactions,
+    }
@@ -0,0 +1,327 @@
+"""
+Materializes ORANGE day types into dbo.OrangeScheduleDaily for a horizon of
+past and future days, so the attendance classifier finds every (StaffNo,
+ShiftDate) it needs locally instead of falling back to MTIUsers.
+
+Per date, employee ids are resolved in chunks with one OUTER APPLY over
+sp_it_get_day_type. Rows whose SourceHash matches the stored one are skipped;
+the rest are staged and applied with one MERGE per chunk. The MERGE keeps the
+rule of the Node upsert (routes/scheduling.ts): an all-empty ORANGE result
+never overwrites a schedule that is already held.
+
+    python materialize_schedule_daily.py --days-back 1 --days-forward 7
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time as time_mod
+from datetime import date, datetime, timedelta
+
+import pymssql
+
+from sync_schedule import EMPLOYEEWORKFLOW_CONFIG, ORANGE_CONFIG
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+CHUNK_SIZE = 1000
+_TIME_RE = re.compile(r"^(\d{1,2}):(\d{2})")
+
+
+def _env(name, default):
+    raw = os.getenv(name)
+    return str(raw).strip() if raw is not None and str(raw).strip() != "" else default
+
+
+def _env_days(name, default):
+    try:
+        return max(0, int(_env(name, str(default))))
+    except ValueError:
+        return default
+
+
+def company_prefix_map():
+    """ORANGE_COMPANY_ID_PREFIX_MAP ('9038:CBM,...') as (prefix, company_id), longest prefix first."""
+    seen = set()
+    out = []
+    for pair in _env("ORANGE_COMPANY_ID_PREFIX_MAP", "").split(","):
+        prefix, sep, company_id = pair.strip().partition(":")
+        prefix, company_id = prefix.strip(), company_id.strip()
+        # The prefix is interpolated into a LIKE pattern, so keep it alphanumeric.
+        if not sep or not prefix or not company_id or not prefix.isalnum() or prefix in seen:
+            continue
+        seen.add(prefix)
+        out.append((prefix, company_id))
+    return sorted(out, key=lambda m: len(m[0]), reverse=True)
+
+
+def day_type_batch_sql():
+    """The OUTER APPLY sp_it_get_day_type query of fetchOrangeDayTypeBatch, with its parameters after the ids/date."""
+    schema = _env("ORANGE_PROC_SCHEMA", "dbo")
+    proc = _env("ORANGE_DAY_TYPE_PROC", "sp_it_get_day_type")
+    site = _env("ORANGE_SITE_CODE", "MTI")
+    params = [_env("ORANGE_COMPANY_ID_MTIBJ", "MTIB")]
+    cases = ["WHEN ids.employee_id LIKE 'MTIBJ%%' THEN %s"]
+    for prefix, company_id in company_prefix_map():
+        cases.append("WHEN ids.employee_id LIKE %s THEN %s")
+        params += [f"{prefix}%", company_id]
+    params.append(_env("ORANGE_COMPANY_ID_DEFAULT", site))
+    sql = f"""
+        SELECT
+            ids.employee_id,
+            dt.day_type,
+            dt.description,
+            dt.time_in,
+            dt.time_out,
+            dt.next_day
+        FROM (
+            SELECT DISTINCT LTRIM(RTRIM(value)) AS employee_id
+            FROM STRING_SPLIT(%s, ',')
+            WHERE LTRIM(RTRIM(value)) <> ''
+        ) AS ids
+        OUTER APPLY (
+            SELECT TOP 1 day_type, description, time_in, time_out, next_day
+            FROM [{schema}].[{proc}](
+                CASE
+                    {' '.join(cases)}
+                    ELSE %s
+                END,
+                ids.employee_id,
+                %s
+            )
+        ) AS dt
+    """
+    return sql, params
+
+
+def fetch_day_types(conn_orange, shift_date, employee_ids):
+    sql, company_params = day_type_batch_sql()
+    with conn_orange.cursor(as_dict=True) as cursor:
+        cursor.execute(sql, tuple([",".join(employee_ids)] + company_params + [shift_date.isoformat()]))
+        return cursor.fetchall()
+
+
+def _hhmm(value):
+    if value is None:
+        return ""
+    if hasattr(value, "hour") and hasattr(value, "minute"):
+        return f"{value.hour:02d}:{value.minute:02d}"
+    match = _TIME_RE.match(str(value).strip())
+    return f"{int(match.group(1)):02d}:{match.group(2)}" if match else ""
+
+
+def _next_day(value):
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    return str(value).strip().lower() in ("y", "yes", "true", "1")
+
+
+def schedule_row(employee_id, shift_date, row):
+    """An OrangeScheduleDaily row for one ORANGE result, hashed as makeScheduleRow does in the Node service."""
+    shift_date_str = shift_date.isoformat()
+    time_in = f"{_hhmm(row.get('time_in'))}:00" if _hhmm(row.get("time_in")) else None
+    time_out = f"{_hhmm(row.get('time_out'))}:00" if _hhmm(row.get("time_out")) else None
+    day_type = "" if row.get("day_type") is None else str(row["day_type"])
+    description = "" if row.get("description") is None else str(row["description"])
+    next_day = _next_day(row.get("next_day"))
+    source_hash = hashlib.sha256(
+        "|".join([employee_id, shift_date_str, day_type, description, time_in or "", time_out or "", "1" if next_day else "0"]).encode("utf-8")
+    ).hexdigest()
+    return {
+        "staffNo": employee_id,
+        "shiftDate": shift_date_str,
+        "timeIn": time_in,
+        "timeOut": time_out,
+        "nextDay": next_day,
+        "dayType": day_type,
+        "description": description,
+        "fetchedAt": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        "sourceHash": source_hash,
+    }
+
+
+def ensure_orange_schedule_daily_table(conn_employee):
+    with conn_employee.cursor() as cursor:
+        cursor.execute(
+            """
+            IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'OrangeScheduleDaily')
+            BEGIN
+              CREATE TABLE dbo.OrangeScheduleDaily (
+                StaffNo      NVARCHAR(50)  NOT NULL,
+                ShiftDate    DATE          NOT NULL,
+                TimeIn       TIME(0)       NULL,
+                TimeOut      TIME(0)       NULL,
+                NextDay      BIT           NOT NULL DEFAULT(0),
+                DayType      NVARCHAR(50)  NULL,
+                Description  NVARCHAR(255) NULL,
+                FetchedAt    DATETIME      NOT NULL DEFAULT(GETDATE()),
+                SourceHash   NVARCHAR(64)  NULL,
+                CONSTRAINT PK_OrangeScheduleDaily PRIMARY KEY (StaffNo, ShiftDate),
+                CONSTRAINT CK_OrangeScheduleDaily_Overnight CHECK (TimeIn IS NULL OR TimeOut IS NULL OR TimeOut > TimeIn OR NextDay = 1)
+              );
+            END;
+            """
+        )
+    conn_employee.commit()
+
+
+def fetch_stored_hashes(conn_employee, shift_date):
+    with conn_employee.cursor() as cursor:
+        cursor.execute(
+            "SELECT StaffNo, SourceHash FROM dbo.OrangeScheduleDaily WHERE ShiftDate = %s",
+            (shift_date.isoformat(),),
+        )
+        return {str(staff_no): source_hash for staff_no, source_hash in cursor.fetchall()}
+
+
+def upsert_schedule_daily(conn_employee, rows):
+    """One MERGE of rows into OrangeScheduleDaily. Returns (inserted, updated)."""
+    if not rows:
+        return 0, 0
+    with conn_employee.cursor() as cursor:
+        cursor.execute(
+            """
+            SET NOCOUNT ON;
+            DECLARE @out TABLE (action NVARCHAR(10) NOT NULL);
+
+            WITH src AS (
+                SELECT staffNo, shiftDate, timeIn, timeOut, nextDay, dayType, description, fetchedAt, sourceHash
+                FROM OPENJSON(%s)
+                WITH (
+                    staffNo NVARCHAR(50) '$.staffNo',
+                    shiftDate DATE '$.shiftDate',
+                    timeIn TIME(0) '$.timeIn',
+                    timeOut TIME(0) '$.timeOut',
+                    nextDay BIT '$.nextDay',
+                    dayType NVARCHAR(50) '$.dayType',
+                    description NVARCHAR(255) '$.description',
+                    fetchedAt DATETIME2 '$.fetchedAt',
+                    sourceHash NVARCHAR(64) '$.sourceHash'
+                )
+            )
+            MERGE dbo.OrangeScheduleDaily AS t
+            USING src AS s
+                ON t.StaffNo = s.staffNo AND t.ShiftDate = s.shiftDate
+            WHEN MATCHED
+                -- An all-empty ORANGE result also comes from a transient outage;
+                -- never let it overwrite a schedule that is already held.
+                AND NOT (
+                    NULLIF(s.dayType, '') IS NULL
+                    AND NULLIF(s.description, '') IS NULL
+                    AND s.timeIn IS NULL
+                    AND s.timeOut IS NULL
+                    AND (t.TimeIn IS NOT NULL OR t.TimeOut IS NOT NULL OR t.DayType IS NOT NULL)
+                )
+            THEN
+                UPDATE SET
+                    TimeIn = s.timeIn,
+                    TimeOut = s.timeOut,
+                    NextDay = s.nextDay,
+                    DayType = NULLIF(s.dayType, ''),
+                    Description = NULLIF(s.description, ''),
+                    FetchedAt = s.fetchedAt,
+                    SourceHash = s.sourceHash
+            WHEN NOT MATCHED THEN
+                INSERT (StaffNo, ShiftDate, TimeIn, TimeOut, NextDay, DayType, Description, FetchedAt, SourceHash)
+                VALUES (s.staffNo, s.shiftDate, s.timeIn, s.timeOut, s.nextDay, NULLIF(s.dayType, ''), NULLIF(s.description, ''), s.fetchedAt, s.sourceHash)
+            OUTPUT $action INTO @out;
+
+            SELECT
+                SUM(CASE WHEN action = 'INSERT' THEN 1 ELSE 0 END) AS inserted,
+                SUM(CASE WHEN action = 'UPDATE' THEN 1 ELSE 0 END) AS updated
+            FROM @out;
+            """,
+            (json.dumps(rows),),
+        )
+        row = cursor.fetchone()
+    return (int(row[0] or 0), int(row[1] or 0)) if row else (0, 0)
+
+
+def fetch_orange_employee_ids(conn_orange):
+    schema = _env("ORANGE_SCHEMA", "dbo")
+    table = _env("ORANGE_EMPLOYEE_TABLE", "it_mti_employee_database_tbl")
+    with conn_orange.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT LTRIM(RTRIM(employee_id)) FROM [{schema}].[{table}] WHERE employee_id IS NOT NULL")
+        return sorted({str(row[0]) for row in cursor.fetchall() if row[0]})
+
+
+def today_wib():
+    if ZoneInfo is None:
+        return date.today()
+    return datetime.now(ZoneInfo("Asia/Jakarta")).date()
+
+
+def horizon_dates(days_back, days_forward, base_date=None):
+    base_date = base_date or today_wib()
+    return [base_date + timedelta(days=d) for d in range(-days_back, days_forward + 1)]
+
+
+def materialize_schedule_daily(dates, employee_ids=None, chunk_size=CHUNK_SIZE):
+    """
+    Fetches and upserts every (employee, date) in dates. Returns a summary dict
+    with fetched/unchanged/inserted/updated counts and the duration.
+    """
+    started = time_mod.perf_counter()
+    summary = {"dates": [d.isoformat() for d in dates], "employees": 0, "fetched": 0, "unchanged": 0, "inserted": 0, "updated": 0}
+    conn_orange = pymssql.connect(**ORANGE_CONFIG)
+    conn_employee = pymssql.connect(**EMPLOYEEWORKFLOW_CONFIG)
+    try:
+        employee_ids = sorted({str(e).strip() for e in employee_ids if str(e).strip()}) if employee_ids else fetch_orange_employee_ids(conn_orange)
+        summary["employees"] = len(employee_ids)
+        ensure_orange_schedule_daily_table(conn_employee)
+        for shift_date in dates:
+            stored = fetch_stored_hashes(conn_employee, shift_date)
+            for i in range(0, len(employee_ids), chunk_size):
+                chunk = employee_ids[i:i + chunk_size]
+                fetched = fetch_day_types(conn_orange, shift_date, chunk)
+                summary["fetched"] += len(fetched)
+                changed = []
+                for r in fetched:
+                    row = schedule_row(str(r["employee_id"]).strip(), shift_date, r)
+                    if stored.get(row["staffNo"]) == row["sourceHash"]:
+                        summary["unchanged"] += 1
+                        continue
+                    changed.append(row)
+                inserted, updated = upsert_schedule_daily(conn_employee, changed)
+                conn_employee.commit()
+                summary["inserted"] += inserted
+                summary["updated"] += updated
+            print(f"{shift_date.isoformat()}: inserted={summary['inserted']} updated={summary['updated']} unchanged={summary['unchanged']}")
+    finally:
+        conn_orange.close()
+        conn_employee.close()
+    summary["durationMs"] = int((time_mod.perf_counter() - started) * 1000)
+    return summary
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Materialize ORANGE day types into dbo.OrangeScheduleDaily for a horizon of days.")
+    parser.add_argument("--days-back", type=int, default=_env_days("ORANGE_SCHEDULE_PREFETCH_DAYS_BACK", 1),
+                        help="Days before today (Asia/Jakarta) to materialize (default ORANGE_SCHEDULE_PREFETCH_DAYS_BACK or 1)")
+    parser.add_argument("--days-forward", type=int, default=_env_days("ORANGE_SCHEDULE_PREFETCH_DAYS_FORWARD", 1),
+                        help="Days after today to materialize (default ORANGE_SCHEDULE_PREFETCH_DAYS_FORWARD or 1)")
+    parser.add_argument("--base-date", help="Horizon centre instead of today (YYYY-MM-DD)")
+    parser.add_argument("--employee-ids", help="Comma-separated employee ids instead of every ORANGE employee")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help=f"Employees per sp_it_get_day_type batch (default {CHUNK_SIZE})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    base_date = datetime.strptime(args.base_date, "%Y-%m-%d").date() if args.base_date else None
+    dates = horizon_dates(max(0, args.days_back), max(0, args.days_forward), base_date)
+    employee_ids = args.employee_ids.split(",") if args.employee_ids else None
+    summary = materialize_schedule_daily(dates, employee_ids, max(1, args.chunk_size))
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -766,6 +766,7 @@ type AttendanceRunLog = {
   error?: string;
   stdout?: string;
   stderr?: string;
+  summary?: Record<string, unknown>;
 };
 
 let attLastRun: AttendanceRunLog | null = null;
@@ -796,31 +797,15 @@ function logRunner(event: string, payload: Record<string, unknown> = {}): void {
 }
 
 function parseRunnerSummary(stdout: string): Record<string, unknown> {
-  const out: Record<string, unknown> = {};
-  const mTotal = stdout.match(/Total transactions retrieved:\s*(\d+)/i);
-  const mProcessed = stdout.match(/Total transactions processed.*:\s*(\d+)/i);
-  const mValid = stdout.match(/Valid transactions.*:\s*(\d+)/i);
-  const mInvalid = stdout.match(/Invalid transactions.*:\s*(\d+)/i);
-  const mInsert = stdout.match(/Data insertion to tblAttendanceReport completed:\s*(\d+)\s+new,\s*(\d+)\s+skipped/i);
-  const mPush = stdout.match(/Pushed to mcg_clocking_tbl:\s*(\d+)\s+rows,\s*skipped:\s*(\d+)/i);
-  if (mTotal) out.totalRetrieved = Number(mTotal[1]);
-  if (mProcessed) out.totalProcessed = Number(mProcessed[1]);
-  if (mValid) out.valid = Number(mValid[1]);
-  if (mInvalid) out.invalid = Number(mInvalid[1]);
-  if (mInsert) {
-    out.newInserted = Number(mInsert[1]);
-    out.insertSkipped = Number(mInsert[2]);
-  }
-  if (mPush) {
-    out.pushed = Number(mPush[1]);
-    out.pushSkipped = Number(mPush[2]);
+  const lines = stdout.split(/\r?\n/).map((line) => line.trim()).filter((line) => line.length > 0);
+  const last = lines[lines.length - 1];
+  if (!last) return {};
+  try {
+    const parsed = JSON.parse(last) as unknown;
+    return parsed && typeof parsed === "object" && !Array.isArray(parsed) ? (parsed as Record<string, unknown>) : {};
+  } catch {
+    return {};
   }
-  return out;
-}
-
-function extractExportedCsvName(stdout: string): string | null {
-  const m = stdout.match(/Data exported to\s+(.+?)\s+successfully\./i);
-  return m ? m[1].trim() : null;
 }
 
 function parseCsvRow(line: string): string[] {
@@ -979,15 +964,24 @@ function runAttendancePythonWithArgs(args: string[], envOverride?: Record<string
     });
     child.on("close", (code) => {
       const finishedAt = new Date();
+      const summary = parseRunnerSummary(out);
+      const summaryErrors = Array.isArray(summary.errors) ? summary.errors.map(String) : [];
       resolveOnce({
         startedAt,
         finishedAt,
         durationMs: finishedAt.getTime() - startedAt.getTime(),
         success: code === 0 && !timedOut,
         exitCode: typeof code === "number" ? code : null,
-        error: timedOut ? `Timed out after ${attRunTimeoutMs}ms` : code === 0 ? undefined : `Exited with code ${String(code)}`,
+        error: timedOut
+          ? `Timed out after ${attRunTimeoutMs}ms`
+          : code === 0
+            ? undefined
+            : summaryErrors.length > 0
+              ? summaryErrors.join("; ")
+              : `Exited with code ${String(code)}`,
         stdout: out,
         stderr: err,
+        summary,
       });
     });
   });
@@ -1077,7 +1071,8 @@ async function saveAttendanceRunnerLog(log: AttendanceRunLog): Promise<void> {
   req.input("success", log.success ? 1 : 0);
   req.input("exitCode", sql.Int, log.exitCode === null ? null : log.exitCode);
   req.input("error", log.error ?? null);
-  req.input("stdout", log.stdout ? clampText(log.stdout, 20000) : null);
+  const hasSummary = !!log.summary && Object.keys(log.summary).length > 0;
+  req.input("stdout", hasSummary ? JSON.stringify(log.summary) : log.stdout ? clampText(log.stdout, 20000) : null);
   req.input("stderr", log.stderr ? clampText(log.stderr, 20000) : null);
   await req.query(
     "INSERT INTO dbo.AttendanceRunnerLogs (durationMs, success, exitCode, error, stdout, stderr) VALUES (@durationMs, @success, @exitCode, @error, @stdout, @stderr)"
@@ -1089,6 +1084,7 @@ async function runAttendancePython(): Promise<AttendanceRunLog> {
   const args: string[] = [
     scriptAbs,
     "--run-10min",
+    "--summary-json",
     "--job-name",
     attJobName,
     "--push-limit",
@@ -1122,7 +1118,7 @@ async function runAttendanceNow(): Promise<void> {
     const log = await runAttendancePython();
     attLastRun = log;
     await saveAttendanceRunnerLog(log);
-    const summary = parseRunnerSummary(log.stdout ?? "");
+    const summary = log.summary ?? {};
     logRunner("run_end", {
       runId,
       success: log.success,
@@ -1222,7 +1218,7 @@ attendanceRouter.post("/runner/dry-run", async (req: Request, res: Response) =>
   }
 
   const scriptAbs = path.resolve(process.cwd(), attScriptRel);
-  const args: string[] = [scriptAbs, "--dry-run"];
+  const args: string[] = [scriptAbs, "--dry-run", "--summary-json"];
   if (date) args.push("--date", date);
   if (startDate) args.push("--start-date", startDate);
   if (endDate) args.push("--end-date", endDate);
@@ -1234,8 +1230,8 @@ attendanceRouter.post("/runner/dry-run", async (req: Request, res: Response) =>
     const log = await runAttendancePythonWithArgs(args, { ATTENDANCE_WAID: "" });
     attLastRun = log;
     await saveAttendanceRunnerLog(log);
-    const summary = parseRunnerSummary(log.stdout ?? "");
-    const csvName = extractExportedCsvName(log.stdout ?? "");
+    const summary = log.summary ?? {};
+    const csvName = typeof summary.exportedCsv === "string" && summary.exportedCsv ? summary.exportedCsv : null;
     let csvPreview: Awaited<ReturnType<typeof readCsvPreview>> | null = null;
     let csvError: string | null = null;
     if (csvName) {
@@ -1287,7 +1283,7 @@ attendanceRouter.post("/push-now", async (req: Request, res: Response) => {
 
   const pushLimit = Math.floor(pushLimitRaw);
   const scriptAbs = path.resolve(process.cwd(), attScriptRel);
-  const args: string[] = [scriptAbs, "--push-now-report", "--push-limit", String(pushLimit)];
+  const args: string[] = [scriptAbs, "--push-now-report", "--summary-json", "--push-limit", String(pushLimit)];
   if (dryRun) args.push("--dry-run");
   if (waidOverride) args.push("--waid", waidOverride);
   else if (attWaid) args.push("--waid", attWaid);
@@ -1298,7 +1294,7 @@ attendanceRouter.post("/push-now", async (req: Request, res: Response) => {
     const log = await runAttendancePythonWithArgs(args);
     attLastRun = log;
     await saveAttendanceRunnerLog(log);
-    const summary = parseRunnerSummary(log.stdout ?? "");
+    const summary = log.summary ?? {};
     res.status(log.success ? 200 : 500).json({
       mode: "push-now",
       dryRun,
@@ -295,13 +295,21 @@ operationsRouter.post("/attendance/backfill", async (req: Request, res: Response
     const ids = parseEmployeeIds(body);
     if ((!ids || body.replace === true) && body.confirm !== true) throw new Error("confirm=true is required for scope=all or replace=true");
     if (ids && ids.length > 1) throw new Error("Attendance backfill supports one employeeId or scope=all");
-    const args = ["--insert-att", "--no-report", "--start-date", dates[0], "--end-date", dates[dates.length - 1]];
+    const workers = Math.min(8, Math.max(1, Math.floor(Number(body.workers ?? 4)) || 4));
+    const args = ["--backfill", "--backfill-workers", String(workers), "--insert-att", "--no-report", "--summary-json", "--start-date", dates[0], "--end-date", dates[dates.length - 1]];
     if (ids?.[0]) args.push("--staff-no", ids[0]);
     if (body.replace === true) args.push("--force-replace");
-    const params = { from: dates[0], to: dates[dates.length - 1], employeeId: ids?.[0] ?? null, scope: ids ? "selected" : "all", replace: body.replace === true };
+    if (body.restart === true) args.push("--backfill-restart");
+    const params = { from: dates[0], to: dates[dates.length - 1], employeeId: ids?.[0] ?? null, scope: ids ? "selected" : "all", replace: body.replace === true, workers, restart: body.restart === true };
     const job = await enqueue("attendance_backfill", params, async (update) => {
-      await update({ phase: "processing" });
-      return await runPython(args, { ATTENDANCE_WAID: "" });
+      await update({ phase: "processing", days: dates.length, workers });
+      const result = await runPython(args, { ATTENDANCE_WAID: "" });
+      const lines = String(result.stdout ?? "").trim().split(/\r?\n/);
+      try {
+        return { ...result, summary: JSON.parse(lines[lines.length - 1]) };
+      } catch {
+        return result;
+      }
     });
     res.status(202).json(publicJob(job));
   } catch (err) {
@@ -0,0 +1,16 @@
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'AttendanceBackfillProgress')
+BEGIN
+  CREATE TABLE dbo.AttendanceBackfillProgress (
+    BackfillKey    NVARCHAR(200) NOT NULL,
+    WorkDate       DATE          NOT NULL,
+    Status         NVARCHAR(20)  NOT NULL,
+    Attempts       INT           NOT NULL DEFAULT(0),
+    StartedAt      DATETIME      NULL,
+    FinishedAt     DATETIME      NULL,
+    TotalRetrieved INT           NULL,
+    NewInserted    INT           NULL,
+    InsertSkipped  INT           NULL,
+    LastError      NVARCHAR(MAX) NULL,
+    CONSTRAINT PK_AttendanceBackfillProgress PRIMARY KEY (BackfillKey, WorkDate)
+  );
+END;
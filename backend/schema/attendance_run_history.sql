@@ -0,0 +1,22 @@
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'AttendanceRunHistory')
+BEGIN
+  CREATE TABLE dbo.AttendanceRunHistory (
+    Id             BIGINT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+    JobName        NVARCHAR(100) NOT NULL,
+    StartedAt      DATETIME      NOT NULL,
+    FinishedAt     DATETIME      NULL,
+    DurationMs     INT           NULL,
+    Success        BIT           NOT NULL,
+    TotalRetrieved INT           NULL,
+    NewInserted    INT           NULL,
+    Pushed         INT           NULL,
+    QueryCount     INT           NULL,
+    RowsFetched    INT           NULL,
+    DbMs           INT           NULL,
+    PeakMemoryMb   DECIMAL(10,1) NULL,
+    PhasesJson     NVARCHAR(MAX) NULL,
+    TopSqlJson     NVARCHAR(MAX) NULL,
+    Errors         NVARCHAR(MAX) NULL
+  );
+  CREATE INDEX IX_AttendanceRunHistory_Job_Started ON dbo.AttendanceRunHistory (JobName, StartedAt);
+END;
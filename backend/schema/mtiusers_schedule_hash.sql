@@ -0,0 +1,30 @@
+IF COL_LENGTH('dbo.MTIUsers', 'schedule_hash') IS NULL
+BEGIN
+  ALTER TABLE dbo.MTIUsers ADD schedule_hash CHAR(64) NULL;
+END;
+
+-- Writers that change the hashed columns without setting schedule_hash
+-- (Node sync, scripts, ad-hoc SQL) leave the row for sync_schedule.py to rehash.
+IF NOT EXISTS (SELECT 1 FROM sys.triggers WHERE name = 'TR_MTIUsers_ClearScheduleHash' AND parent_id = OBJECT_ID('dbo.MTIUsers'))
+BEGIN
+  EXEC(
+    'CREATE TRIGGER dbo.TR_MTIUsers_ClearScheduleHash
+     ON dbo.MTIUsers
+     AFTER UPDATE
+     AS
+     BEGIN
+       SET NOCOUNT ON;
+       IF TRIGGER_NESTLEVEL() > 1 RETURN;
+       IF UPDATE(schedule_hash) RETURN;
+       IF NOT (UPDATE(employee_name) OR UPDATE(gender) OR UPDATE(division) OR UPDATE(department) OR UPDATE(section)
+               OR UPDATE(supervisor_id) OR UPDATE(supervisor_name) OR UPDATE(position_title) OR UPDATE(grade_interval)
+               OR UPDATE(phone) OR UPDATE(day_type) OR UPDATE(description) OR UPDATE(time_in) OR UPDATE(time_out)
+               OR UPDATE(next_day)) RETURN;
+       UPDATE u
+       SET schedule_hash = NULL
+       FROM dbo.MTIUsers u
+       INNER JOIN inserted i ON u.employee_id = i.employee_id
+       WHERE u.schedule_hash IS NOT NULL;
+     END'
+  );
+END;
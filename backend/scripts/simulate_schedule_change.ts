@@ -181,6 +181,12 @@ async function applyChange(
     await upd.query(
       "UPDATE dbo.MTIUsers SET time_in=@time_in, time_out=@time_out, next_day=CASE WHEN LOWER(LTRIM(RTRIM(@next_day))) IN ('y','yes','true','1') THEN 1 ELSE 0 END WHERE employee_id=@employee_id"
     );
+    // sync_schedule.py diffs on MTIUsers.schedule_hash; clear it so that sync rehashes this row.
+    const clearHash = tx.request();
+    clearHash.input("employee_id", sql.NVarChar, existing.employee_id);
+    await clearHash.query(
+      "IF COL_LENGTH('dbo.MTIUsers', 'schedule_hash') IS NOT NULL EXEC sp_executesql N'UPDATE dbo.MTIUsers SET schedule_hash = NULL WHERE employee_id = @id', N'@id NVARCHAR(255)', @id = @employee_id"
+    );
 
     if (!opts.skipLog) {
       const logReq = tx.request();
@@ -243,6 +243,12 @@ export async function runScheduleSync(): Promise<SyncResult> {
         r2.input("time_out", sql.NVarChar, s(row.time_out));
         r2.input("next_day", sql.NVarChar, s(row.next_day));
         await r2.query(q);
+        // sync_schedule.py diffs on MTIUsers.schedule_hash; clear it so that sync rehashes this row.
+        const r3 = tx.request();
+        r3.input("employee_id", sql.NVarChar, row.employee_id);
+        await r3.query(
+          "IF COL_LENGTH('dbo.MTIUsers', 'schedule_hash') IS NOT NULL EXEC sp_executesql N'UPDATE dbo.MTIUsers SET schedule_hash = NULL WHERE employee_id = @id', N'@id NVARCHAR(255)', @id = @employee_id"
+        );
         const logReq = tx.request();
         logReq.input("StaffNo", sql.NVarChar, row.employee_id);
         logReq.input("TimeInNew", sql.NVarChar, s(row.time_in));
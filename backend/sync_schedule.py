@@ -1,5 +1,10 @@
+import argparse
 import hashlib
+import json
+import queue
+import threading
 import pymssql
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 
@@ -44,101 +49,257 @@ def compute_schedule_hash(
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
+ORANGE_SCHEDULE_SQL = """
+    SELECT
+        e.employee_id,
+        e.employee_name,
+        e.gender,
+        e.division,
+        e.department,
+        e.section,
+        e.supervisor_id,
+        e.supervisor_name,
+        e.position_title,
+        e.grade_interval,
+        e.phone,
+        dt.day_type,
+        dt.description,
+        dt.time_in,
+        dt.time_out,
+        dt.next_day
+    FROM dbo.it_mti_employee_database_tbl AS e
+    CROSS APPLY dbo.sp_it_get_day_type(
+        'MTI',
+        e.employee_id,
+        GETDATE()
+    ) AS dt
+"""
+
+ORANGE_SHARDS = 8
+ORANGE_WORKERS = 4
+ORANGE_FETCH_ROWS = 500
+
+
 def fetch_orange_employees_with_schedule():
     conn = pymssql.connect(**ORANGE_CONFIG)
     try:
-        sql = """
-        SELECT
-            e.employee_id,
-            e.employee_name,
-            e.gender,
-            e.division,
-            e.department,
-            e.section,
-            e.supervisor_id,
-            e.supervisor_name,
-            e.position_title,
-            e.grade_interval,
-            e.phone,
-            dt.day_type,
-            dt.description,
-            dt.time_in,
-            dt.time_out,
-            dt.next_day
-        FROM dbo.it_mti_employee_database_tbl AS e
-        CROSS APPLY dbo.sp_it_get_day_type(
-            'MTI',
-            e.employee_id,
-            GETDATE()
-        ) AS dt
-        """
         with conn.cursor(as_dict=True) as cursor:
-            cursor.execute(sql)
+            cursor.execute(ORANGE_SCHEDULE_SQL)
             return cursor.fetchall()
     finally:
         conn.close()
 
 
-def fetch_existing_schedule_hashes(conn_employee):
-    mapping = {}
-    with conn_employee.cursor(as_dict=True) as cursor:
+def orange_employee_id_ranges(shards):
+    """Splits the ORANGE employee ids into up to shards contiguous (low, high) ranges."""
+    conn = pymssql.connect(**ORANGE_CONFIG)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT employee_id FROM dbo.it_mti_employee_database_tbl ORDER BY employee_id")
+            ids = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    if not ids:
+        return []
+    shards = max(1, min(int(shards), len(ids)))
+    size = -(-len(ids) // shards)
+    return [(ids[i], ids[min(i + size, len(ids)) - 1]) for i in range(0, len(ids), size)]
+
+
+def _put_until_stopped(batches, item, stop):
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=1)
+            return
+        except queue.Full:
+            continue
+
+
+class _ConnectionPool:
+    """One ORANGE connection per worker thread, reused across that thread's shards."""
+
+    def __init__(self, config):
+        self._config = config
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = pymssql.connect(**self._config)
+            self._local.conn = conn
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    def close(self):
+        with self._lock:
+            for conn in self._opened:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._opened = []
+
+
+def _fetch_orange_shard(pool, id_range, batches, stop, fetch_rows):
+    # Always ends with a None marker so the consumer can count finished shards.
+    try:
+        with pool.get().cursor(as_dict=True) as cursor:
+            cursor.execute(ORANGE_SCHEDULE_SQL + " WHERE e.employee_id BETWEEN %s AND %s", id_range)
+            while not stop.is_set():
+                rows = cursor.fetchmany(fetch_rows)
+                if not rows:
+                    break
+                _put_until_stopped(batches, rows, stop)
+    finally:
+        _put_until_stopped(batches, None, stop)
+
+
+def iter_orange_employees_with_schedule(shards=ORANGE_SHARDS, workers=ORANGE_WORKERS, fetch_rows=ORANGE_FETCH_ROWS):
+    """
+    Streams the same rows as fetch_orange_employees_with_schedule. The employee
+    ids are split into shards id ranges that run over workers ORANGE connections
+    in parallel, each reading with fetchmany(fetch_rows) into a bounded queue, so
+    only a few batches are held in memory at a time. Row order is not preserved.
+    """
+    id_ranges = orange_employee_id_ranges(shards)
+    if not id_ranges:
+        return
+    workers = max(1, min(int(workers), len(id_ranges)))
+    batches = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+    connections = _ConnectionPool(ORANGE_CONFIG)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_fetch_orange_shard, connections, r, batches, stop, fetch_rows) for r in id_ranges]
+            try:
+                finished = 0
+                while finished < len(futures):
+                    rows = batches.get()
+                    if rows is None:
+                        finished += 1
+                        continue
+                    yield from rows
+                for f in futures:
+                    f.result()
+            finally:
+                stop.set()
+    finally:
+        connections.close()
+
+
+def ensure_schedule_hash_column(conn_employee):
+    with conn_employee.cursor() as cursor:
         cursor.execute(
             """
-            SELECT
-                employee_id,
-                employee_name,
-                gender,
-                division,
-                department,
-                section,
-                supervisor_id,
-                supervisor_name,
-                position_title,
-                grade_interval,
-                phone,
-                day_type,
-                description,
-                time_in,
-                time_out,
-                next_day
-            FROM MTIUsers
+            IF COL_LENGTH('dbo.MTIUsers', 'schedule_hash') IS NULL
+            BEGIN
+              ALTER TABLE dbo.MTIUsers ADD schedule_hash CHAR(64) NULL;
+            END;
             """
         )
-        rows = cursor.fetchall()
-        for row in rows:
-            employee_name = "" if row["employee_name"] is None else str(row["employee_name"])
-            gender = "" if row["gender"] is None else str(row["gender"])
-            division = "" if row["division"] is None else str(row["division"])
-            department = "" if row["department"] is None else str(row["department"])
-            section = "" if row["section"] is None else str(row["section"])
-            supervisor_id = "" if row["supervisor_id"] is None else str(row["supervisor_id"])
-            supervisor_name = "" if row["supervisor_name"] is None else str(row["supervisor_name"])
-            position_title = "" if row["position_title"] is None else str(row["position_title"])
-            grade_interval = "" if row["grade_interval"] is None else str(row["grade_interval"])
-            phone = "" if row["phone"] is None else str(row["phone"])
-            day_type = "" if row["day_type"] is None else str(row["day_type"])
-            description = "" if row["description"] is None else str(row["description"])
-            time_in = "" if row["time_in"] is None else str(row["time_in"])
-            time_out = "" if row["time_out"] is None else str(row["time_out"])
-            next_day = "" if row["next_day"] is None else str(row["next_day"])
-            mapping[row["employee_id"]] = compute_schedule_hash(
-                employee_name,
-                gender,
-                division,
-                department,
-                section,
-                supervisor_id,
-                supervisor_name,
-                position_title,
-                grade_interval,
-                phone,
-                day_type,
-                description,
-                time_in,
-                time_out,
-                next_day,
+        # Any other writer that changes a hashed column without setting the hash
+        # clears it, so the next sync compares that row's columns again.
+        cursor.execute(
+            """
+            IF NOT EXISTS (SELECT 1 FROM sys.triggers WHERE name = 'TR_MTIUsers_ClearScheduleHash' AND parent_id = OBJECT_ID('dbo.MTIUsers'))
+            BEGIN
+              EXEC(
+                'CREATE TRIGGER dbo.TR_MTIUsers_ClearScheduleHash
+                 ON dbo.MTIUsers
+                 AFTER UPDATE
+                 AS
+                 BEGIN
+                   SET NOCOUNT ON;
+                   IF TRIGGER_NESTLEVEL() > 1 RETURN;
+                   IF UPDATE(schedule_hash) RETURN;
+                   IF NOT (UPDATE(employee_name) OR UPDATE(gender) OR UPDATE(division) OR UPDATE(department) OR UPDATE(section)
+                           OR UPDATE(supervisor_id) OR UPDATE(supervisor_name) OR UPDATE(position_title) OR UPDATE(grade_interval)
+                           OR UPDATE(phone) OR UPDATE(day_type) OR UPDATE(description) OR UPDATE(time_in) OR UPDATE(time_out)
+                           OR UPDATE(next_day)) RETURN;
+                   UPDATE u
+                   SET schedule_hash = NULL
+                   FROM dbo.MTIUsers u
+                   INNER JOIN inserted i ON u.employee_id = i.employee_id
+                   WHERE u.schedule_hash IS NOT NULL;
+                 END'
+              );
+            END;
+            """
+        )
+    conn_employee.commit()
+
+
+def _normalize(value):
+    return "" if value is None else str(value)
+
+
+def _id_key(employee_id):
+    # MTIUsers.employee_id compares case-insensitively and ignores trailing spaces.
+    return str(employee_id).rstrip().upper()
+
+
+def _hash_mtiusers_row(row):
+    return compute_schedule_hash(
+        _normalize(row["employee_name"]),
+        _normalize(row["gender"]),
+        _normalize(row["division"]),
+        _normalize(row["department"]),
+        _normalize(row["section"]),
+        _normalize(row["supervisor_id"]),
+        _normalize(row["supervisor_name"]),
+        _normalize(row["position_title"]),
+        _normalize(row["grade_interval"]),
+        _normalize(row["phone"]),
+        _normalize(row["day_type"]),
+        _normalize(row["description"]),
+        _normalize(row["time_in"]),
+        _normalize(row["time_out"]),
+        _normalize(row["next_day"]),
+    )
+
+
+def fetch_existing_schedule_hashes(conn_employee):
+    # Rows without a stored hash (older rows, or rows another writer changed and
+    # TR_MTIUsers_ClearScheduleHash cleared) are hashed from their columns and
+    # also returned in unhashed, so an unchanged row just gets its hash stored.
+    mapping = {}
+    with conn_employee.cursor() as cursor:
+        cursor.execute("SELECT employee_id, schedule_hash FROM MTIUsers")
+        for employee_id, schedule_hash in cursor.fetchall():
+            mapping[_id_key(employee_id)] = None if schedule_hash is None else str(schedule_hash).strip()
+    unhashed = {}
+    if any(h is None for h in mapping.values()):
+        with conn_employee.cursor(as_dict=True) as cursor:
+            cursor.execute(
+                """
+                SELECT
+                    employee_id,
+                    employee_name,
+                    gender,
+                    division,
+                    department,
+                    section,
+                    supervisor_id,
+                    supervisor_name,
+                    position_title,
+                    grade_interval,
+                    phone,
+                    day_type,
+                    description,
+                    time_in,
+                    time_out,
+                    next_day
+                FROM MTIUsers
+                WHERE schedule_hash IS NULL
+                """
             )
-    return mapping
+            for row in cursor.fetchall():
+                unhashed[_id_key(row["employee_id"])] = _hash_mtiusers_row(row)
+        mapping.update(unhashed)
+    return mapping, unhashed
 
 
 def get_phone_max_length(conn_employee):
@@ -160,38 +321,132 @@ def get_phone_max_length(conn_employee):
             return 0
 
 
-def sync_orange_to_mtiusers():
-    orange_rows = fetch_orange_employees_with_schedule()
-    conn_employee = pymssql.connect(**EMPLOYEEWORKFLOW_CONFIG)
-    try:
-        existing_hashes = fetch_existing_schedule_hashes(conn_employee)
-        phone_max_len = get_phone_max_length(conn_employee)
-        updated_count = 0
-        inserted_count = 0
-        updated_details = []
-        inserted_details = []
-        timestamp = datetime.now()
-        with conn_employee.cursor() as cursor:
-            for row in orange_rows:
-                employee_id = row["employee_id"]
-                employee_name = "" if row["employee_name"] is None else str(row["employee_name"])
-                gender = "" if row["gender"] is None else str(row["gender"])
-                division = "" if row["division"] is None else str(row["division"])
-                department = "" if row["department"] is None else str(row["department"])
-                section = "" if row["section"] is None else str(row["section"])
-                supervisor_id = "" if row["supervisor_id"] is None else str(row["supervisor_id"])
-                supervisor_name = "" if row["supervisor_name"] is None else str(row["supervisor_name"])
-                position_title = "" if row["position_title"] is None else str(row["position_title"])
-                grade_interval = "" if row["grade_interval"] is None else str(row["grade_interval"])
-                phone = "" if row["phone"] is None else str(row["phone"])
-                if phone_max_len > 0 and len(phone) > phone_max_len:
-                    phone = phone[:phone_max_len]
-                day_type = "" if row["day_type"] is None else str(row["day_type"])
-                description = "" if row["description"] is None else str(row["description"])
-                time_in = "" if row["time_in"] is None else str(row["time_in"])
-                time_out = "" if row["time_out"] is None else str(row["time_out"])
-                next_day = "" if row["next_day"] is None else str(row["next_day"])
-                new_hash = compute_schedule_hash(
+MTIUSERS_COLUMNS = [
+    "employee_id",
+    "employee_name",
+    "gender",
+    "division",
+    "department",
+    "section",
+    "supervisor_id",
+    "supervisor_name",
+    "position_title",
+    "grade_interval",
+    "phone",
+    "day_type",
+    "description",
+    "time_in",
+    "time_out",
+    "next_day",
+]
+
+STAGE_CHUNK_ROWS = 1000
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def upsert_mtiusers(conn_employee, staged_rows):
+    """
+    Applies the staged rows (MTIUsers columns plus schedule_hash and hash_only)
+    with one MERGE: hash_only rows only get their schedule_hash stored, the
+    others are updated or inserted. Returns (inserted_ids, updated_ids).
+    """
+    inserted_ids = []
+    updated_ids = []
+    if not staged_rows:
+        return inserted_ids, updated_ids
+    with conn_employee.cursor() as cursor:
+        cursor.execute(
+            """
+            IF OBJECT_ID('tempdb..#MTIUsersStage') IS NOT NULL DROP TABLE #MTIUsersStage;
+            CREATE TABLE #MTIUsersStage (
+                employee_id NVARCHAR(255) NOT NULL PRIMARY KEY,
+                employee_name NVARCHAR(MAX) NULL,
+                gender NVARCHAR(MAX) NULL,
+                division NVARCHAR(MAX) NULL,
+                department NVARCHAR(MAX) NULL,
+                section NVARCHAR(MAX) NULL,
+                supervisor_id NVARCHAR(MAX) NULL,
+                supervisor_name NVARCHAR(MAX) NULL,
+                position_title NVARCHAR(MAX) NULL,
+                grade_interval NVARCHAR(MAX) NULL,
+                phone NVARCHAR(MAX) NULL,
+                day_type NVARCHAR(MAX) NULL,
+                description NVARCHAR(MAX) NULL,
+                time_in NVARCHAR(MAX) NULL,
+                time_out NVARCHAR(MAX) NULL,
+                next_day NVARCHAR(MAX) NULL,
+                schedule_hash CHAR(64) NOT NULL,
+                hash_only BIT NOT NULL
+            );
+            """
+        )
+        for i in range(0, len(staged_rows), STAGE_CHUNK_ROWS):
+            chunk = staged_rows[i:i + STAGE_CHUNK_ROWS]
+            cursor.execute(
+                """
+                INSERT INTO #MTIUsersStage
+                SELECT *
+                FROM OPENJSON(%s)
+                WITH (
+                    employee_id NVARCHAR(255) '$.employee_id',
+                    employee_name NVARCHAR(MAX) '$.employee_name',
+                    gender NVARCHAR(MAX) '$.gender',
+                    division NVARCHAR(MAX) '$.division',
+                    department NVARCHAR(MAX) '$.department',
+                    section NVARCHAR(MAX) '$.section',
+                    supervisor_id NVARCHAR(MAX) '$.supervisor_id',
+                    supervisor_name NVARCHAR(MAX) '$.supervisor_name',
+                    position_title NVARCHAR(MAX) '$.position_title',
+                    grade_interval NVARCHAR(MAX) '$.grade_interval',
+                    phone NVARCHAR(MAX) '$.phone',
+                    day_type NVARCHAR(MAX) '$.day_type',
+                    description NVARCHAR(MAX) '$.description',
+                    time_in NVARCHAR(MAX) '$.time_in',
+                    time_out NVARCHAR(MAX) '$.time_out',
+                    next_day NVARCHAR(MAX) '$.next_day',
+                    schedule_hash CHAR(64) '$.schedule_hash',
+                    hash_only BIT '$.hash_only'
+                );
+                """,
+                (json.dumps([{k: _json_value(v) for k, v in r.items()} for r in chunk]),),
+            )
+        # MTIUsers has an update trigger, so the MERGE output goes through a table variable.
+        cursor.execute(
+            """
+            SET NOCOUNT ON;
+            DECLARE @out TABLE (action NVARCHAR(10) NOT NULL, employee_id NVARCHAR(255) NOT NULL, hash_only BIT NOT NULL);
+
+            MERGE MTIUsers AS t
+            USING #MTIUsersStage AS s
+                ON t.employee_id = s.employee_id
+            WHEN MATCHED AND s.hash_only = 1 THEN
+                UPDATE SET schedule_hash = s.schedule_hash
+            WHEN MATCHED THEN
+                UPDATE SET
+                    employee_name = s.employee_name,
+                    gender = s.gender,
+                    division = s.division,
+                    department = s.department,
+                    section = s.section,
+                    supervisor_id = s.supervisor_id,
+                    supervisor_name = s.supervisor_name,
+                    position_title = s.position_title,
+                    grade_interval = s.grade_interval,
+                    phone = s.phone,
+                    day_type = s.day_type,
+                    description = s.description,
+                    time_in = s.time_in,
+                    time_out = s.time_out,
+                    next_day = s.next_day,
+                    schedule_hash = s.schedule_hash
+            WHEN NOT MATCHED BY TARGET AND s.hash_only = 0 THEN
+                INSERT (
+                    employee_id,
                     employee_name,
                     gender,
                     division,
@@ -207,125 +462,121 @@ def sync_orange_to_mtiusers():
                     time_in,
                     time_out,
                     next_day,
+                    schedule_hash
+                )
+                VALUES (
+                    s.employee_id,
+                    s.employee_name,
+                    s.gender,
+                    s.division,
+                    s.department,
+                    s.section,
+                    s.supervisor_id,
+                    s.supervisor_name,
+                    s.position_title,
+                    s.grade_interval,
+                    s.phone,
+                    s.day_type,
+                    s.description,
+                    s.time_in,
+                    s.time_out,
+                    s.next_day,
+                    s.schedule_hash
+                )
+            OUTPUT $action, s.employee_id, s.hash_only INTO @out;
+
+            SELECT action, employee_id FROM @out WHERE hash_only = 0;
+
+            DROP TABLE #MTIUsersStage;
+            """
+        )
+        for action, employee_id in cursor.fetchall():
+            if action == "INSERT":
+                inserted_ids.append(employee_id)
+            else:
+                updated_ids.append(employee_id)
+    return inserted_ids, updated_ids
+
+
+def _apply_staged(conn_employee, staged, details, inserted_keys, updated_keys):
+    """Upserts and commits one chunk of staged rows, printing and recording the changed ids."""
+    inserted_ids, updated_ids = upsert_mtiusers(conn_employee, list(staged.values()))
+    conn_employee.commit()
+    for employee_id in updated_ids:
+        key = _id_key(employee_id)
+        if key not in inserted_keys:
+            updated_keys.add(key)
+        print(f"  updated {details[key]}")
+    for employee_id in inserted_ids:
+        inserted_keys.add(_id_key(employee_id))
+        print(f"  inserted {details[_id_key(employee_id)]}")
+    staged.clear()
+    details.clear()
+
+
+def sync_orange_to_mtiusers(shards=ORANGE_SHARDS, workers=ORANGE_WORKERS, fetch_rows=ORANGE_FETCH_ROWS):
+    if shards > 1 or workers > 1:
+        orange_rows = iter_orange_employees_with_schedule(shards, workers, fetch_rows)
+    else:
+        orange_rows = fetch_orange_employees_with_schedule()
+    conn_employee = pymssql.connect(**EMPLOYEEWORKFLOW_CONFIG)
+    try:
+        ensure_schedule_hash_column(conn_employee)
+        existing_hashes, unhashed = fetch_existing_schedule_hashes(conn_employee)
+        phone_max_len = get_phone_max_length(conn_employee)
+        timestamp = datetime.now()
+        # Changed rows are applied every STAGE_CHUNK_ROWS, so only the pending
+        # chunk and the changed ids are held. Keyed by _id_key(employee_id): a
+        # repeated id in the ORANGE result (also one differing only in case or
+        # trailing spaces) keeps its last row.
+        staged = {}
+        details = {}
+        inserted_keys = set()
+        updated_keys = set()
+        total = 0
+        for row in orange_rows:
+            total += 1
+            employee_id = row["employee_id"]
+            key = _id_key(employee_id)
+            phone = _normalize(row["phone"])
+            if phone_max_len > 0 and len(phone) > phone_max_len:
+                phone = phone[:phone_max_len]
+            new_hash = _hash_mtiusers_row(dict(row, phone=phone))
+            old_hash = existing_hashes.get(key)
+            if old_hash == new_hash:
+                if key in unhashed:
+                    staged[key] = {"employee_id": employee_id, "schedule_hash": new_hash, "hash_only": 1}
+                    details.pop(key, None)
+            else:
+                staged[key] = dict(
+                    {c: row[c] for c in MTIUSERS_COLUMNS},
+                    phone=phone,
+                    schedule_hash=new_hash,
+                    hash_only=0,
                 )
-                old_hash = existing_hashes.get(employee_id)
-                if old_hash == new_hash:
-                    continue
-                cursor.execute(
-                    "SELECT COUNT(1) FROM MTIUsers WHERE employee_id = %s",
-                    (employee_id,),
+                details[key] = (
+                    f"{employee_id} | {row['employee_name']} | {_normalize(row['day_type'])} | "
+                    f"{_normalize(row['time_in'])}-{_normalize(row['time_out'])} | {_normalize(row['next_day'])}"
                 )
-                exists_row = cursor.fetchone()
-                exists = exists_row[0] > 0 if exists_row is not None else False
-                if exists:
-                    cursor.execute(
-                        """
-                        UPDATE MTIUsers
-                        SET
-                            employee_name = %s,
-                            gender = %s,
-                            division = %s,
-                            department = %s,
-                            section = %s,
-                            supervisor_id = %s,
-                            supervisor_name = %s,
-                            position_title = %s,
-                            grade_interval = %s,
-                            phone = %s,
-                            day_type = %s,
-                            description = %s,
-                            time_in = %s,
-                            time_out = %s,
-                            next_day = %s
-                        WHERE employee_id = %s
-                        """,
-                        (
-                            row["employee_name"],
-                            row["gender"],
-                            row["division"],
-                            row["department"],
-                            row["section"],
-                            row["supervisor_id"],
-                            row["supervisor_name"],
-                            row["position_title"],
-                            row["grade_interval"],
-                            phone,
-                            row["day_type"],
-                            row["description"],
-                            row["time_in"],
-                            row["time_out"],
-                            row["next_day"],
-                            employee_id,
-                        ),
-                    )
-                    updated_count += 1
-                    updated_details.append(
-                        f"{employee_id} | {row['employee_name']} | {day_type} | {time_in}-{time_out} | {next_day}"
-                    )
-                else:
-                    cursor.execute(
-                        """
-                        INSERT INTO MTIUsers (
-                            employee_id,
-                            employee_name,
-                            gender,
-                            division,
-                            department,
-                            section,
-                            supervisor_id,
-                            supervisor_name,
-                            position_title,
-                            grade_interval,
-                            phone,
-                            day_type,
-                            description,
-                            time_in,
-                            time_out,
-                            next_day
-                        )
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            employee_id,
-                            row["employee_name"],
-                            row["gender"],
-                            row["division"],
-                            row["department"],
-                            row["section"],
-                            row["supervisor_id"],
-                            row["supervisor_name"],
-                            row["position_title"],
-                            row["grade_interval"],
-                            phone,
-                            row["day_type"],
-                            row["description"],
-                            row["time_in"],
-                            row["time_out"],
-                            row["next_day"],
-                        ),
-                    )
-                    inserted_count += 1
-                    inserted_details.append(
-                        f"{employee_id} | {row['employee_name']} | {day_type} | {time_in}-{time_out} | {next_day}"
-                    )
-        conn_employee.commit()
-        total = len(orange_rows)
+            if len(staged) >= STAGE_CHUNK_ROWS:
+                _apply_staged(conn_employee, staged, details, inserted_keys, updated_keys)
+        if staged:
+            _apply_staged(conn_employee, staged, details, inserted_keys, updated_keys)
+        updated_count = len(updated_keys)
+        inserted_count = len(inserted_keys)
         unchanged = total - updated_count - inserted_count
         print(
             f"Sync completed at {timestamp.isoformat(timespec='seconds')} "
             f"total={total} updated={updated_count} inserted={inserted_count} unchanged={unchanged}"
         )
-        if updated_details:
-            print("Updated employees:")
-            for item in updated_details:
-                print(f"  {item}")
-        if inserted_details:
-            print("Inserted employees:")
-            for item in inserted_details:
-                print(f"  {item}")
     finally:
         conn_employee.close()
 
 
 if __name__ == "__main__":
-    sync_orange_to_mtiusers()
+    parser = argparse.ArgumentParser(description="Sync ORANGE employee schedules into MTIUsers.")
+    parser.add_argument("--shards", type=int, default=ORANGE_SHARDS, help=f"ORANGE employee id ranges fetched separately (default {ORANGE_SHARDS}; 1 with --workers 1 = one query)")
+    parser.add_argument("--workers", type=int, default=ORANGE_WORKERS, help=f"Parallel ORANGE connections (default {ORANGE_WORKERS})")
+    parser.add_argument("--fetch-rows", type=int, default=ORANGE_FETCH_ROWS, help=f"Rows per fetchmany batch (default {ORANGE_FETCH_ROWS})")
+    args = parser.parse_args()
+    sync_orange_to_mtiusers(args.shards, args.workers, args.fetch_rows)